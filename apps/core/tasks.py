@@ -46,7 +46,9 @@ class BaseTask(Task):
         """Override the task calling method to add logging and error handling"""
         try:
             logger.info(f"Task {self.name}[{self.request.id}] started with args={args}, kwargs={kwargs}")
-            return super().__call__(*args, **kwargs)
+            # The worker has already pushed the request context; Task.__call__
+            # would push a second, empty one and hide request.id/retries
+            return self.run(*args, **kwargs)
         except Exception as exc:
             # Log exception details
             logger.error(
@@ -0,0 +1,218 @@
+"""
+Headless browser pool for scraping jobs.
+This module provides a per-process pool of Chrome WebDriver instances that handles:
+- Resolving the chromedriver binary once per process
+- Reusing browsers between jobs instead of launching one per job
+- Health checks before a browser is leased
+- Recycling browsers after a number of page loads
+- Resetting tabs, cookies and storage between leases
+"""
+import functools
+import logging
+import threading
+from typing import Dict, List, Optional
+from django.conf import settings
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+
+logger = logging.getLogger(__name__)
+
+class BrowserPoolError(Exception):
+    """Exception for browsers that cannot be started or leased"""
+    pass
+
+@functools.lru_cache(maxsize=None)
+def get_chromedriver_path() -> str:
+    """
+    Resolve the chromedriver binary once per process
+
+    ChromeDriverManager().install() checks the installed Chrome version and
+    may hit the network, so it must not run for every browser.
+    """
+    path = ChromeDriverManager().install()
+    logger.info(f"Using chromedriver at {path}")
+    return path
+
+def _chrome_options() -> Options:
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    return options
+
+class PooledBrowser:
+    """A WebDriver owned by the pool, with the number of pages it has loaded"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+    def get(self, url: str):
+        """Load a page, counting it towards recycling"""
+        self.pages += 1
+        self.driver.get(url)
+
+    def is_healthy(self) -> bool:
+        """Check that the browser process still answers"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def reset(self) -> bool:
+        """
+        Isolate the next lease from the previous one
+
+        Closes extra tabs, clears cookies and web storage and leaves the
+        browser on about:blank.
+
+        Returns:
+            bool: False if the browser broke and should be discarded
+        """
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+            self.driver.delete_all_cookies()
+            try:
+                self.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except WebDriverException:
+                # Pages without an origin (about:blank, data:) have no storage
+                pass
+            self.driver.get("about:blank")
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Failed to reset browser: {str(e)}")
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException as e:
+            logger.warning(f"Failed to quit browser: {str(e)}")
+
+class BrowserPool:
+    """Singleton bounded pool of headless Chrome browsers"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BrowserPool, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Read pool settings; browsers are started lazily or by warm()"""
+        self.max_size = getattr(settings, 'BROWSER_POOL_SIZE', 2)
+        self.recycle_pages = getattr(settings, 'BROWSER_POOL_RECYCLE_PAGES', 200)
+        self.lease_timeout = getattr(settings, 'BROWSER_POOL_LEASE_TIMEOUT', 120)
+
+        self._lock = threading.Lock()
+        # Leased plus idle browsers never exceed max_size: a browser is only
+        # started by a caller holding one of these slots
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle: List[PooledBrowser] = []
+        self._stats = {'started': 0, 'leased': 0, 'recycled': 0, 'discarded': 0}
+
+    def _start(self) -> PooledBrowser:
+        try:
+            driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=_chrome_options())
+        except Exception as e:
+            logger.error(f"Failed to start Chrome: {str(e)}")
+            raise BrowserPoolError(f"Could not start browser: {str(e)}")
+        with self._lock:
+            self._stats['started'] += 1
+        return PooledBrowser(driver)
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledBrowser:
+        """
+        Lease a browser, starting one if no healthy idle browser is available
+
+        Args:
+            timeout: Seconds to wait when all browsers are leased
+
+        Returns:
+            PooledBrowser: A browser for the exclusive use of the caller
+        """
+        if not self._slots.acquire(timeout=self.lease_timeout if timeout is None else timeout):
+            raise BrowserPoolError(f"No browser available within {self.lease_timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    browser = self._idle.pop() if self._idle else None
+                if browser is None:
+                    browser = self._start()
+                elif not browser.is_healthy():
+                    logger.warning("Discarding unresponsive browser")
+                    browser.quit()
+                    with self._lock:
+                        self._stats['discarded'] += 1
+                    continue
+                with self._lock:
+                    self._stats['leased'] += 1
+                return browser
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, browser: PooledBrowser, discard: bool = False):
+        """
+        Return a leased browser to the pool
+
+        Args:
+            browser: Browser returned by acquire()
+            discard: Quit the browser instead of keeping it
+        """
+        try:
+            if browser.pages >= self.recycle_pages:
+                browser.quit()
+                with self._lock:
+                    self._stats['recycled'] += 1
+            elif discard or not browser.reset():
+                browser.quit()
+                with self._lock:
+                    self._stats['discarded'] += 1
+            else:
+                with self._lock:
+                    self._idle.append(browser)
+        finally:
+            self._slots.release()
+
+    def warm(self, size: Optional[int] = None):
+        """Start idle browsers ahead of the first job"""
+        size = min(size or self.max_size, self.max_size)
+        browsers = []
+        try:
+            for _ in range(size):
+                browsers.append(self.acquire(timeout=0))
+        except BrowserPoolError as e:
+            logger.warning(f"Browser pool warm-up stopped: {str(e)}")
+        for browser in browsers:
+            self.release(browser)
+        logger.info(f"Browser pool warmed with {len(browsers)} browser(s)")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Counters of started, leased, recycled and discarded browsers"""
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle))
+
+    def close(self):
+        """Quit all idle browsers"""
+        with self._lock:
+            browsers, self._idle = self._idle, []
+        for browser in browsers:
+            browser.quit()
+        if browsers:
+            logger.info(f"Browser pool closed ({len(browsers)} browser(s))")
+
+# Global singleton instance, one per worker process
+browser_pool = BrowserPool()
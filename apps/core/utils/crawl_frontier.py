@@ -0,0 +1,330 @@
+"""
+Crawl frontier for multi-page and multi-worker scraping.
+This module provides a Redis-backed frontier that handles:
+- A queue of URLs to visit with their metadata
+- A seen-set of normalised URLs, so no page is queued twice
+- Pages in flight, so a paused or interrupted crawl can be resumed
+- Per-host concurrency and rate limits shared by all workers of a crawl
+- Crawl state and counters
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from django.conf import settings
+
+from .redis_connection import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+                   'gclid', 'yclid', 'fbclid', '_openstat')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Delay between checks while waiting for a host slot or for work
+POLL_INTERVAL = 0.1
+
+# Crawl states
+CRAWL_STATUS_RUNNING = 'running'
+CRAWL_STATUS_PAUSED = 'paused'
+CRAWL_STATUS_FINISHED = 'finished'
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the query and replaces an empty path with /.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+class CrawlFrontier:
+    """
+    Redis-backed frontier of one crawl, shared by all workers taking part in it
+
+    Every URL passes the seen-set once, so pages discovered by several
+    workers or on several pages are visited once. Taken entries stay in an
+    in-flight list until done(); resume() puts entries of workers that were
+    stopped mid-page back into the queue.
+    """
+
+    def __init__(self, crawl_id: str, max_concurrent: int = 4, min_interval: float = 0.0):
+        """
+        Args:
+            crawl_id: ID of the crawl; workers using the same ID share the frontier
+            max_concurrent: Requests to one host in flight across all workers
+            min_interval: Minimum delay between request starts to one host in seconds
+        """
+        self.crawl_id = crawl_id
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.ttl = getattr(settings, 'CRAWL_FRONTIER_TTL', 7 * 24 * 3600)
+        self.idle_timeout = getattr(settings, 'CRAWL_FRONTIER_IDLE_TIMEOUT', 300)
+        self.lease_timeout = getattr(settings, 'CRAWL_FRONTIER_LEASE_TIMEOUT', 600)
+
+        self._client = get_redis_client()
+        prefix = f"crawl:{crawl_id}"
+        self._prefix = prefix
+        self.queue_key = f"{prefix}:queue"
+        self.in_flight_key = f"{prefix}:in_flight"
+        self.seen_key = f"{prefix}:seen"
+        self.state_key = f"{prefix}:state"
+
+        # Host slots held by this worker: host key -> lease tokens
+        self._leases = {}
+        self._leases_lock = threading.Lock()
+
+    def _touch(self, pipe):
+        for key in (self.queue_key, self.in_flight_key, self.seen_key, self.state_key):
+            pipe.expire(key, self.ttl)
+
+    def exists(self) -> bool:
+        """Whether the crawl has been started and has not expired"""
+        return bool(self._client.exists(self.state_key))
+
+    def start(self, **meta):
+        """
+        Mark the crawl as running and store its metadata
+
+        Args:
+            **meta: String fields kept with the crawl state (e.g. start URL)
+        """
+        pipe = self._client.pipeline()
+        pipe.hsetnx(self.state_key, "created_at", datetime.now().isoformat())
+        pipe.hset(self.state_key, mapping=dict(meta, status=CRAWL_STATUS_RUNNING))
+        self._touch(pipe)
+        pipe.execute()
+
+    def get(self, field: str) -> Optional[str]:
+        """A field of the crawl state"""
+        value = self._client.hget(self.state_key, field)
+        return value.decode() if value is not None else None
+
+    def set(self, field: str, value: str):
+        self._client.hset(self.state_key, field, value)
+
+    def mark_seen(self, url: str) -> bool:
+        """
+        Add a URL to the seen-set without queueing it
+
+        Returns:
+            bool: False if the URL had already been seen in this crawl
+        """
+        return bool(self._client.sadd(self.seen_key, normalize_url(url)))
+
+    def add(self, url: str, **meta) -> bool:
+        """
+        Queue a URL unless it has already been seen
+
+        Args:
+            url: URL to visit
+            **meta: JSON-serialisable data returned with the entry by pop()
+
+        Returns:
+            bool: True if the URL was queued
+        """
+        return bool(self.add_many([(url, meta)]))
+
+    def add_many(self, entries: Iterable[Tuple[str, dict]]) -> int:
+        """
+        Queue several URLs, skipping those already seen
+
+        Args:
+            entries: Pairs of a URL and its metadata
+
+        Returns:
+            int: Number of URLs queued
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+
+        pipe = self._client.pipeline()
+        for url, _ in entries:
+            pipe.sadd(self.seen_key, normalize_url(url))
+        added = pipe.execute()
+
+        # SADD is atomic, so of several workers adding the same URL only one queues it
+        queued = [
+            json.dumps(dict(meta, url=url), sort_keys=True)
+            for (url, meta), is_new in zip(entries, added) if is_new
+        ]
+        if queued:
+            pipe = self._client.pipeline()
+            pipe.rpush(self.queue_key, *queued)
+            pipe.hincrby(self.state_key, "queued", len(queued))
+            self._touch(pipe)
+            pipe.execute()
+        return len(queued)
+
+    def is_paused(self) -> bool:
+        return self.get("status") == CRAWL_STATUS_PAUSED
+
+    def pop(self) -> Optional[dict]:
+        """
+        Take the next entry to visit
+
+        When the queue is empty but other workers still have pages in
+        flight, waits up to idle_timeout for the URLs they may discover.
+
+        Returns:
+            dict | None: Entry with 'url' and the metadata given to add();
+                None when the crawl is paused or there is nothing left to visit
+        """
+        deadline = time.monotonic() + self.idle_timeout
+        while not self.is_paused():
+            raw = self._client.lmove(self.queue_key, self.in_flight_key, 'LEFT', 'RIGHT')
+            if raw is not None:
+                entry = json.loads(raw)
+                entry['_raw'] = raw
+                return entry
+            if not self._client.llen(self.in_flight_key) or time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+        return None
+
+    def done(self, entry: dict, failed: bool = False):
+        """Remove an entry returned by pop() from the pages in flight"""
+        pipe = self._client.pipeline()
+        pipe.lrem(self.in_flight_key, 1, entry['_raw'])
+        pipe.hincrby(self.state_key, "failed" if failed else "done", 1)
+        pipe.execute()
+
+    def count(self, field: str, amount: int = 1):
+        """Increment a counter of the crawl state"""
+        self._client.hincrby(self.state_key, field, amount)
+
+    def pause(self):
+        """
+        Ask the workers to stop
+
+        Workers finish the page they are on and stop taking new ones; the
+        queue and the seen-set are kept for resume().
+        """
+        self.set("status", CRAWL_STATUS_PAUSED)
+
+    def resume(self) -> int:
+        """
+        Put entries left in flight back into the queue and mark the crawl as running
+
+        Must only be called when no worker of the crawl is running. Requeued
+        entries are marked with 'retry', since part of their page may
+        already have been processed.
+
+        Returns:
+            int: Number of requeued entries
+        """
+        requeued = 0
+        while True:
+            raw = self._client.lpop(self.in_flight_key)
+            if raw is None:
+                break
+            entry = json.loads(raw)
+            entry['retry'] = True
+            self._client.lpush(self.queue_key, json.dumps(entry, sort_keys=True))
+            requeued += 1
+
+        if requeued:
+            logger.info(f"Crawl {self.crawl_id}: {requeued} interrupted page(s) requeued")
+        self.start()
+        return requeued
+
+    def finish(self):
+        """Mark the crawl as finished; its state is kept until it expires"""
+        self.set("status", CRAWL_STATUS_FINISHED)
+
+    def get_stats(self) -> Dict[str, object]:
+        """
+        State and counters of the crawl
+
+        Returns:
+            dict: status, pending (queued now), in_flight, seen, queued (ever),
+                done, failed and other counters
+        """
+        pipe = self._client.pipeline()
+        pipe.hgetall(self.state_key)
+        pipe.llen(self.queue_key)
+        pipe.llen(self.in_flight_key)
+        pipe.scard(self.seen_key)
+        state, pending, in_flight, seen = pipe.execute()
+
+        stats = {key.decode(): value.decode() for key, value in state.items()}
+        for key in ('queued', 'done', 'failed', 'duplicates'):
+            stats[key] = int(stats.get(key, 0))
+        stats.update(pending=pending, in_flight=in_flight, seen=seen)
+        return stats
+
+    def _host_keys(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        return f"{self._prefix}:active:{host}", f"{self._prefix}:rate:{host}"
+
+    def acquire(self, url: str):
+        """
+        Wait until a request to the host of the URL is allowed
+
+        At most max_concurrent requests to one host are in flight and their
+        starts are at least min_interval apart, across all workers of the
+        crawl. Every acquire() must be followed by release().
+
+        Each slot is a lease in a sorted set scored by its deadline. Leases
+        past their deadline are dropped before counting, so a worker killed
+        between acquire and release frees its slot after lease_timeout.
+        """
+        active_key, rate_key = self._host_keys(url)
+        token = uuid.uuid4().hex
+
+        while True:
+            now = time.time()
+            pipe = self._client.pipeline()
+            pipe.zremrangebyscore(active_key, '-inf', now)
+            pipe.zadd(active_key, {token: now + self.lease_timeout})
+            pipe.zcard(active_key)
+            pipe.expire(active_key, self.lease_timeout)
+            active = pipe.execute()[2]
+            if active <= self.max_concurrent:
+                break
+            self._client.zrem(active_key, token)
+            time.sleep(POLL_INTERVAL)
+
+        with self._leases_lock:
+            self._leases.setdefault(active_key, []).append(token)
+
+        interval_ms = int(self.min_interval * 1000)
+        if interval_ms > 0:
+            # Whoever sets the key may start; the key expires after min_interval
+            while not self._client.set(rate_key, 1, nx=True, px=interval_ms):
+                wait_ms = self._client.pttl(rate_key)
+                time.sleep(wait_ms / 1000 if wait_ms > 0 else POLL_INTERVAL)
+
+    def release(self, url: str):
+        """Free a slot of the host of the URL taken by acquire()"""
+        active_key, _ = self._host_keys(url)
+        with self._leases_lock:
+            tokens = self._leases.get(active_key)
+            if not tokens:
+                return
+            token = tokens.pop()
+        # An expired lease is already gone, so the slot is never freed twice
+        self._client.zrem(active_key, token)
+
+    def clear(self):
+        """Remove the crawl from Redis"""
+        keys = [self.queue_key, self.in_flight_key, self.seen_key, self.state_key]
+        keys.extend(self._client.scan_iter(match=f"{self._prefix}:active:*"))
+        self._client.delete(*keys)
@@ -0,0 +1,147 @@
+"""
+HTTP session utility for outgoing requests to supplier APIs and sites.
+This module provides a singleton session manager that handles:
+- One pooled keep-alive session per host
+- Retry with exponential backoff on 429 and 5xx responses
+- Compressed responses
+- No cookies kept between requests, since sessions are shared by all callers
+- Connection pool hit/miss metrics
+"""
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict
+from urllib.parse import urlsplit
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class HTTPSessionManager:
+    """Singleton manager of pooled per-host HTTP sessions"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(HTTPSessionManager, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Read pool and retry settings"""
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self.pool_size = getattr(settings, 'HTTP_POOL_MAXSIZE', 10)
+        self.retry_total = getattr(settings, 'HTTP_RETRY_TOTAL', 3)
+        self.retry_backoff_factor = getattr(settings, 'HTTP_RETRY_BACKOFF_FACTOR', 0.5)
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _build_session(self) -> requests.Session:
+        """Create a session with a retrying, pooled adapter"""
+        retry = Retry(
+            total=self.retry_total,
+            backoff_factor=self.retry_backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            # Return the last response so raise_for_status() reports the real status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        # Cookies set by one caller's responses must not be sent with another's requests
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get_session(self, url: str) -> requests.Session:
+        """
+        Get the shared session for the host of a URL
+
+        Sessions are safe to share between threads. Per-request data such as
+        authorization headers must be passed to each request, not set on the
+        session, because every caller talking to the host uses the same one.
+        For the same reason the session rejects cookies from responses;
+        cookies a caller needs are passed with its requests.
+
+        Args:
+            url: Any URL on the host
+
+        Returns:
+            requests.Session: A session with a keep-alive connection pool
+        """
+        key = self._host_key(url)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[key] = session
+                    logger.debug(f"HTTP session created for {key}")
+        return session
+
+    def get_metrics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Connection pool metrics per host
+
+        A request served over an already open connection is a pool hit, a
+        request that had to open a new connection is a miss. Retries count
+        as requests.
+
+        Returns:
+            dict: {host: {'requests', 'hits', 'misses'}}
+        """
+        metrics = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+
+        for key, session in sessions:
+            requests_count = misses = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is None:
+                        continue
+                    requests_count += pool.num_requests
+                    misses += pool.num_connections
+            metrics[key] = {
+                'requests': requests_count,
+                'hits': max(requests_count - misses, 0),
+                'misses': misses,
+            }
+        return metrics
+
+    def close(self):
+        """Close all sessions and their connections"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        logger.info("HTTP sessions closed")
+
+# Global singleton instance
+http_session_manager = HTTPSessionManager()
+
+# Helper function to get a session
+def get_http_session(url: str) -> requests.Session:
+    """
+    Get a pooled session for the host of a URL
+
+    Returns:
+        requests.Session: A shared session
+    """
+    return http_session_manager.get_session(url)
@@ -1 +1,16 @@
- 
\ No newline at end of file
+"""
+Logging helpers shared by the project apps.
+"""
+import logging
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger for the given module name
+    
+    Args:
+        name: Logger name, usually __name__
+        
+    Returns:
+        logging.Logger: The configured logger
+    """
+    return logging.getLogger(name)
@@ -0,0 +1,153 @@
+"""
+Progress reporting for long-running tasks.
+
+Progress is published into the same task_status:{task_id} Redis hash that
+holds the task status, so clients can poll it without touching the database.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+from django.conf import settings
+import redis
+
+from .redis_connection import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+class TaskProgress:
+    """
+    Throttled, pipelined progress reporter for a task status hash.
+
+    Counters are sent as increments (HINCRBY) of what this reporter has not
+    published yet, so several workers of one parallel task (import chunks,
+    export shards) can report into the hash of the parent task. Writes are
+    limited to TASK_PROGRESS_UPDATES_PER_SECOND per reporter; intermediate
+    updates only change local counters.
+
+    Published fields:
+        processed, errors: Rows handled so far and how many of them failed
+        total_rows: Expected number of rows, when known
+        percent: Completion percentage (from rows or from bytes read)
+        rows_per_sec: Average throughput since started_at
+        eta_seconds: Estimated time to completion
+        updated_at: Time of the last progress write
+    """
+
+    def __init__(self, task_id: str, total: Optional[int] = None, total_bytes: Optional[int] = None,
+                 min_interval: Optional[float] = None):
+        """
+        Args:
+            task_id: ID of the task whose status hash receives the progress
+            total: Expected number of rows, if known
+            total_bytes: Size of the input, used with update(position=...) when
+                the number of rows is not known in advance
+            min_interval: Minimum delay between two writes in seconds
+        """
+        self.key = f"task_status:{task_id}"
+        self.total = total
+        self.total_bytes = total_bytes
+        if min_interval is None:
+            min_interval = 1.0 / getattr(settings, 'TASK_PROGRESS_UPDATES_PER_SECOND', 2)
+        self.min_interval = min_interval
+
+        self._client = get_redis_client()
+        self._processed = 0
+        self._errors = 0
+        self._position = None
+        self._published_processed = 0
+        self._published_errors = 0
+        self._last_publish = None
+
+    def update(self, processed: int, errors: int = 0, position: Optional[int] = None, force: bool = False):
+        """
+        Record progress and publish it if the throttle interval has passed
+
+        Args:
+            processed: Rows handled by this reporter so far
+            errors: Failed rows among them
+            position: Bytes of input consumed so far
+            force: Publish regardless of the throttle interval
+        """
+        self._processed = processed
+        self._errors = errors
+        if position is not None:
+            self._position = position
+
+        now = time.monotonic()
+        if force or self._last_publish is None or now - self._last_publish >= self.min_interval:
+            self._last_publish = now
+            self._publish()
+
+    def finish(self):
+        """Publish whatever has not been published yet"""
+        self.update(self._processed, self._errors, force=True)
+
+    def rollback(self):
+        """
+        Withdraw the counters this reporter has published
+
+        Called before a task is retried over the same rows, so that a
+        retried chunk does not count its rows twice in the parent hash.
+        """
+        self._processed = 0
+        self._errors = 0
+        if not self._published_processed and not self._published_errors:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.hincrby(self.key, "processed", -self._published_processed)
+            pipe.hincrby(self.key, "errors", -self._published_errors)
+            pipe.execute()
+            self._published_processed = 0
+            self._published_errors = 0
+        except redis.RedisError as e:
+            logger.warning(f"Failed to roll back progress of {self.key}: {str(e)}")
+
+    def _publish(self):
+        processed_delta = self._processed - self._published_processed
+        errors_delta = self._errors - self._published_errors
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.hincrby(self.key, "processed", processed_delta)
+            pipe.hincrby(self.key, "errors", errors_delta)
+            pipe.hmget(self.key, "started_at", "total_rows")
+            if self.total is not None:
+                pipe.hset(self.key, "total_rows", str(self.total))
+            processed, errors, (started_at, total_rows) = pipe.execute()[:3]
+
+            self._published_processed = self._processed
+            self._published_errors = self._errors
+
+            total = self.total if self.total is not None else int(total_rows) if total_rows else None
+            self._client.hset(self.key, mapping=self._derived_fields(processed, started_at, total))
+        except redis.RedisError as e:
+            # Progress is best effort and must never fail the task itself
+            logger.warning(f"Failed to publish progress to {self.key}: {str(e)}")
+
+    def _derived_fields(self, processed, started_at, total):
+        """Percent, throughput and ETA from the shared counters"""
+        fields = {"updated_at": datetime.now().isoformat()}
+
+        elapsed = None
+        if started_at:
+            started = datetime.fromisoformat(started_at.decode() if isinstance(started_at, bytes) else started_at)
+            elapsed = (datetime.now() - started).total_seconds()
+
+        fraction = None
+        if total:
+            fraction = processed / total
+        elif self.total_bytes and self._position is not None:
+            fraction = self._position / self.total_bytes
+
+        if fraction is not None:
+            fraction = min(fraction, 1.0)
+            fields["percent"] = f"{fraction * 100:.1f}"
+
+        if elapsed and elapsed > 0:
+            fields["rows_per_sec"] = f"{processed / elapsed:.1f}"
+            if fraction:
+                fields["eta_seconds"] = str(int(elapsed * (1 - fraction) / fraction))
+
+        return fields
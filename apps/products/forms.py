@@ -6,8 +6,10 @@ class ProductImportForm(forms.Form):
     FILE_FORMATS = (
         ('csv', 'CSV'),
         ('json', 'JSON'),
+        ('ndjson', 'NDJSON (JSON Lines)'),
         ('xml', 'XML'),
         ('yaml', 'YAML'),
+        ('parquet', 'Parquet'),
     )
     
     file_format = forms.ChoiceField(
@@ -21,6 +23,20 @@ class ProductImportForm(forms.Form):
         widget=forms.FileInput(attrs={'class': 'form-control'})
     )
     
+    delta = forms.BooleanField(
+        label='Записывать только изменившиеся товары',
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    fast = forms.BooleanField(
+        label='Быстрая загрузка',
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
     def clean_file(self):
         file = self.cleaned_data['file']
         file_format = self.cleaned_data['file_format']
@@ -30,10 +46,14 @@ class ProductImportForm(forms.Form):
             raise forms.ValidationError('Файл должен иметь расширение .csv')
         elif file_format == 'json' and not file.name.endswith('.json'):
             raise forms.ValidationError('Файл должен иметь расширение .json')
+        elif file_format == 'ndjson' and not (file.name.endswith('.ndjson') or file.name.endswith('.jsonl')):
+            raise forms.ValidationError('Файл должен иметь расширение .ndjson или .jsonl')
         elif file_format == 'xml' and not file.name.endswith('.xml'):
             raise forms.ValidationError('Файл должен иметь расширение .xml')
         elif file_format == 'yaml' and not (file.name.endswith('.yaml') or file.name.endswith('.yml')):
             raise forms.ValidationError('Файл должен иметь расширение .yaml или .yml')
+        elif file_format == 'parquet' and not file.name.endswith('.parquet'):
+            raise forms.ValidationError('Файл должен иметь расширение .parquet')
             
         return file
 
@@ -42,7 +62,9 @@ class ProductExportForm(forms.Form):
     FILE_FORMATS = (
         ('csv', 'CSV'),
         ('json', 'JSON'),
+        ('ndjson', 'NDJSON (JSON Lines)'),
         ('xml', 'XML'),
+        ('parquet', 'Parquet'),
     )
     
     file_format = forms.ChoiceField(
@@ -118,6 +140,35 @@ class ProductAPIImportForm(forms.Form):
         })
     )
     
+    PAGINATION_CHOICES = (
+        ('auto', 'Автоопределение (ссылка next или курсор)'),
+        ('none', 'Без пагинации'),
+        ('offset', 'offset/limit'),
+        ('page', 'Номер страницы (page/per_page)'),
+        ('cursor', 'Курсор'),
+        ('link', 'Ссылка на следующую страницу'),
+    )
+    pagination_type = forms.ChoiceField(
+        label='Пагинация',
+        choices=PAGINATION_CHOICES,
+        initial='auto',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
+    page_size = forms.IntegerField(
+        label='Размер страницы',
+        required=False,
+        min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '100'})
+    )
+    
+    ignore_cache = forms.BooleanField(
+        label='Загрузить заново, даже если данные API не изменились',
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
     def clean_params(self):
         params = self.cleaned_data.get('params')
         if not params:
@@ -150,6 +201,13 @@ class ProductAPIImportForm(forms.Form):
             return json.loads(data)
         except json.JSONDecodeError:
             raise forms.ValidationError('Данные должны быть в формате JSON')
+    
+    def get_pagination(self):
+        """Настройки пагинации для import_products_from_api"""
+        pagination = {'type': self.cleaned_data['pagination_type']}
+        if self.cleaned_data.get('page_size'):
+            pagination['page_size'] = self.cleaned_data['page_size']
+        return pagination
 
 class ProductScrapingForm(forms.Form):
     """Форма для импорта товаров через веб-скрапинг"""
@@ -274,6 +332,34 @@ class ProductScrapingForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control'})
     )
     
+    RENDER_MODE_CHOICES = (
+        ('auto', 'Автоматически (браузер только если без него товары не найдены)'),
+        ('static', 'Только HTML (без браузера)'),
+        ('browser', 'Только браузер (страницы строятся JavaScript)'),
+    )
+    render_mode = forms.ChoiceField(
+        label='Способ загрузки страниц',
+        choices=RENDER_MODE_CHOICES,
+        initial='auto',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
+    ignore_cache = forms.BooleanField(
+        label='Обработать все страницы, даже если они не изменились',
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    crawl_workers = forms.IntegerField(
+        label='Параллельных воркеров',
+        min_value=1,
+        max_value=16,
+        initial=1,
+        required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    
     def clean(self):
         cleaned_data = super().clean()
         use_pagination = cleaned_data.get('use_pagination')
@@ -308,6 +394,7 @@ class ProductScrapingForm(forms.Form):
             'price_selector': self.cleaned_data['price_selector'],
             'default_category': self.cleaned_data['default_category'],
             'delay_between_pages': self.cleaned_data['delay_between_pages'],
+            'render_mode': self.cleaned_data['render_mode'],
         }
         
         # Добавляем опциональные селекторы
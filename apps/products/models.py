@@ -152,6 +152,13 @@ class Product(BaseModel):
         unique=True,
         verbose_name=_('SKU')
     )
+    content_hash = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name=_('Content Hash')
+    )
 
     class Meta:
         verbose_name = _('Product')
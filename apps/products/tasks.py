@@ -2,6 +2,8 @@
 Asynchronous tasks for handling product operations like import/export and data processing.
 """
 import os
+import json
+import shutil
 import logging
 import tempfile
 from datetime import datetime, timedelta
@@ -10,24 +12,91 @@ from django.core.mail import send_mail
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 from celery.utils.log import get_task_logger
-from celery import shared_task
+from celery import shared_task, chord
+import redis
 
 from apps.core.tasks import BaseTask, atomic_task, long_running_task
 from apps.core.utils.redis_connection import get_redis_client
+from apps.core.utils.progress import TaskProgress
 from .utils import (
     export_products_to_csv, export_products_to_json, export_products_to_xml,
-    import_products_from_csv, import_products_from_json, import_products_from_xml
+    export_products_to_ndjson, export_products_to_parquet,
+    split_id_ranges, export_products_part, concatenate_export_parts,
+    import_products_from_csv, import_products_from_json, import_products_from_ndjson,
+    import_products_from_xml, import_products_from_parquet,
+    FILE_IMPORT_FORMATS, write_import_chunks, import_products_from_chunk,
+    import_products_from_api, import_products_via_scraping, scraping_frontier
 )
 from .models import Product, Category
 
 User = get_user_model()
 logger = get_task_logger(__name__)
 
+# Formats supported by export tasks
+EXPORT_FORMATS = ('csv', 'json', 'ndjson', 'xml', 'parquet')
+
 # Task status constants
 TASK_STATUS_PENDING = 'pending'
 TASK_STATUS_PROCESSING = 'processing'
 TASK_STATUS_COMPLETE = 'complete'
 TASK_STATUS_FAILED = 'failed'
+TASK_STATUS_PAUSED = 'paused'
+
+# Import checkpoints outlive any realistic retry schedule, then expire
+CHECKPOINT_TTL = 60 * 60 * 24 * 7
+
+# Maximum number of error messages carried over in a checkpoint
+MAX_CHECKPOINT_ERRORS = 100
+
+class ImportCheckpoint:
+    """
+    Redis checkpoint of a file import, keyed by task ID.
+    
+    ProductBulkWriter calls save() after every committed batch with the
+    number of the last source row it covers and the results so far. A
+    retried or redelivered task (acks_late / reject_on_worker_lost keep the
+    task ID) loads the checkpoint and bulk_import_products skips the rows
+    up to offset instead of importing the whole file again.
+    
+    The checkpoint is written right after the database commit, so a worker
+    lost between the two replays at most one batch; upserts are keyed by
+    SKU, which makes the replay harmless.
+    """
+    
+    def __init__(self, task_id):
+        self.key = f"import_checkpoint:{task_id}"
+        self.redis_client = get_redis_client()
+        
+        try:
+            data = self.redis_client.hgetall(self.key)
+        except redis.RedisError as e:
+            # Without the checkpoint the import simply starts from the first row
+            logger.warning(f"Failed to load import checkpoint {self.key}: {str(e)}")
+            data = {}
+        self.offset = int(data.get(b'offset', 0))
+        self.results = json.loads(data[b'results']) if b'results' in data else None
+    
+    def save(self, offset, results):
+        """Record that all rows up to offset are committed"""
+        stored = dict(results, errors=results['errors'][:MAX_CHECKPOINT_ERRORS])
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hset(self.key, mapping={"offset": str(offset), "results": json.dumps(stored)})
+            pipe.expire(self.key, CHECKPOINT_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            # A missing checkpoint only costs a longer replay after a failure
+            logger.warning(f"Failed to save import checkpoint {self.key}: {str(e)}")
+            return
+        self.offset = offset
+    
+    def clear(self):
+        """Remove the checkpoint once the import no longer needs resuming"""
+        try:
+            self.redis_client.delete(self.key)
+        except redis.RedisError as e:
+            # The checkpoint expires after CHECKPOINT_TTL anyway
+            logger.warning(f"Failed to clear import checkpoint {self.key}: {str(e)}")
 
 class ProductImportTask(BaseTask):
     """Base task for product import operations with enhanced error handling"""
@@ -47,6 +116,9 @@ class ProductImportTask(BaseTask):
         redis_client = get_redis_client()
         redis_client.hset(f"task_status:{task_id}", "status", TASK_STATUS_FAILED)
         
+        # The task will not be retried anymore, nothing left to resume
+        ImportCheckpoint(task_id).clear()
+        
         # Notify user if possible
         user_id = kwargs.get('user_id')
         if user_id:
@@ -65,18 +137,63 @@ class ProductImportTask(BaseTask):
             except Exception as e:
                 logger.error(f"Failed to send failure notification: {e}")
 
+def notify_import_complete(user_id, results):
+    """Send the import summary to the user who started the import"""
+    try:
+        user = User.objects.get(id=user_id)
+        if user.email:
+            send_mail(
+                _('Product Import Complete'),
+                _(f'Your product import has been completed.\n\n'
+                  f'Total: {results.get("total", 0)}\n'
+                  f'Created: {results.get("created", 0)}\n'
+                  f'Updated: {results.get("updated", 0)}\n'
+                  f'Unchanged: {results.get("unchanged", 0)}\n'
+                  f'Failed: {results.get("failed", 0)}'),
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+                fail_silently=True,
+            )
+    except User.DoesNotExist:
+        logger.error(f"User with ID {user_id} not found for notification")
+    except Exception as e:
+        logger.error(f"Failed to send completion notification: {e}")
+
+def import_progress_callback(progress, file=None):
+    """
+    Adapt ProductBulkWriter results to TaskProgress.update.
+    
+    Args:
+        progress: TaskProgress of the task
+        file: Binary file being imported; its position drives percent and ETA
+            when the number of rows is not known in advance
+    """
+    def on_progress(results):
+        progress.update(
+            results['created'] + results['updated'] + results['unchanged'] + results['failed'],
+            results['failed'],
+            position=file.tell() if file is not None else None,
+        )
+    return on_progress
+
 @shared_task(base=ProductImportTask, bind=True)
-def process_product_import(self, file_path, file_format, user_id=None):
+def process_product_import(self, file_path, file_format, user_id=None, delta=False, fast=False):
     """
     Process product import from a file asynchronously.
     
+    Committed batches are checkpointed in Redis (see ImportCheckpoint), so a
+    retry or a redelivery after worker loss resumes after the last committed
+    batch instead of starting from the first row.
+    
     Args:
         file_path: Path to the file to import
-        file_format: Format of the file (csv, json, xml)
+        file_format: Format of the file (csv, json, ndjson, xml, parquet)
         user_id: ID of the user who initiated the import
+        delta: Only write products whose content fingerprint changed
+        fast: Bulk load through a staging table (COPY on PostgreSQL)
         
     Returns:
-        dict: Import results with counts of products created/updated/failed
+        dict: Import results with counts of products created/updated/unchanged/failed
     """
     task_id = self.request.id
     redis_client = get_redis_client()
@@ -87,6 +204,8 @@ def process_product_import(self, file_path, file_format, user_id=None):
         "file_format": file_format,
         "started_at": datetime.now().isoformat(),
         "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
     })
     
     try:
@@ -95,49 +214,66 @@ def process_product_import(self, file_path, file_format, user_id=None):
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Import file not found: {file_path}")
         
+        checkpoint = ImportCheckpoint(task_id)
+        if checkpoint.offset:
+            logger.info(f"Resuming import {task_id} after row {checkpoint.offset}")
+            redis_client.hset(f"task_status:{task_id}", "resumed_from", str(checkpoint.offset))
+            # Error of the interrupted attempt no longer describes the task
+            redis_client.hdel(f"task_status:{task_id}", "error", "completed_at")
+        
+        progress = TaskProgress(task_id, total_bytes=os.path.getsize(file_path))
+        
         # Process the file based on format
         if file_format == 'csv':
             with open(file_path, 'rb') as f:
-                results = import_products_from_csv(f)
+                results = import_products_from_csv(
+                    f, on_progress=import_progress_callback(progress, f),
+                    checkpoint=checkpoint, delta=delta, fast=fast
+                )
         elif file_format == 'json':
             with open(file_path, 'rb') as f:
-                results = import_products_from_json(f)
+                results = import_products_from_json(
+                    f, on_progress=import_progress_callback(progress, f),
+                    checkpoint=checkpoint, delta=delta, fast=fast
+                )
+        elif file_format == 'ndjson':
+            with open(file_path, 'rb') as f:
+                results = import_products_from_ndjson(
+                    f, on_progress=import_progress_callback(progress, f),
+                    checkpoint=checkpoint, delta=delta, fast=fast
+                )
         elif file_format == 'xml':
             with open(file_path, 'rb') as f:
-                results = import_products_from_xml(f)
+                results = import_products_from_xml(
+                    f, on_progress=import_progress_callback(progress, f),
+                    checkpoint=checkpoint, delta=delta, fast=fast
+                )
+        elif file_format == 'parquet':
+            with open(file_path, 'rb') as f:
+                results = import_products_from_parquet(
+                    f, on_progress=import_progress_callback(progress, f),
+                    checkpoint=checkpoint, delta=delta, fast=fast
+                )
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
         
+        progress.finish()
+        checkpoint.clear()
+        
         # Store results in Redis (for later retrieval)
         redis_client.hset(f"task_status:{task_id}", mapping={
             "status": TASK_STATUS_COMPLETE,
             "completed_at": datetime.now().isoformat(),
             "created": str(results.get('created', 0)),
             "updated": str(results.get('updated', 0)),
+            "unchanged": str(results.get('unchanged', 0)),
             "failed": str(results.get('failed', 0)),
             "total": str(results.get('total', 0)),
         })
         
         # Send notification email if user_id is provided
         if user_id:
-            try:
-                user = User.objects.get(id=user_id)
-                if user.email:
-                    send_mail(
-                        _('Product Import Complete'),
-                        _(f'Your product import has been completed.\n\n'
-                          f'Total: {results.get("total", 0)}\n'
-                          f'Created: {results.get("created", 0)}\n'
-                          f'Updated: {results.get("updated", 0)}\n'
-                          f'Failed: {results.get("failed", 0)}'),
-                        settings.DEFAULT_FROM_EMAIL,
-                        [user.email],
-                        fail_silently=True,
-                    )
-            except User.DoesNotExist:
-                logger.error(f"User with ID {user_id} not found for notification")
-            except Exception as e:
-                logger.error(f"Failed to send completion notification: {e}")
+            notify_import_complete(user_id, results)
         
         # Clean up temporary file
         try:
@@ -162,6 +298,517 @@ def process_product_import(self, file_path, file_format, user_id=None):
         # Re-raise for retry handling by Celery
         raise
 
+# Maximum number of error messages a chunk task reports back to the chord
+MAX_CHUNK_ERRORS = 100
+
+@shared_task(base=ProductImportTask, bind=True)
+def process_product_import_parallel(self, file_path, file_format, user_id=None, chunk_rows=None, delta=False,
+                                    fast=False):
+    """
+    Coordinate a product import fanned out across Celery workers.
+    
+    The file is split into row-range chunks which are imported by a group
+    of import_product_chunk tasks; finalize_product_import aggregates their
+    results into the task_status hash of this task once all chunks are done.
+    
+    Args:
+        file_path: Path to the file to import
+        file_format: Format of the file (csv, json, ndjson, xml, yaml, parquet)
+        user_id: ID of the user who initiated the import
+        chunk_rows: Number of records per chunk
+        delta: Only write products whose content fingerprint changed
+        fast: Bulk load through a staging table (COPY on PostgreSQL)
+        
+    Returns:
+        dict: Number of dispatched chunks
+    """
+    task_id = self.request.id
+    redis_client = get_redis_client()
+    
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PROCESSING,
+        "mode": "parallel",
+        "file_format": file_format,
+        "started_at": datetime.now().isoformat(),
+        "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
+    })
+    
+    try:
+        logger.info(f"Splitting {file_format} import file into chunks: {file_path}")
+        
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Import file not found: {file_path}")
+        if file_format not in FILE_IMPORT_FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        
+        chunk_rows = chunk_rows or settings.PRODUCT_IMPORT_CHUNK_ROWS
+        chunks_dir = tempfile.mkdtemp(prefix=f"product_import_{task_id}_")
+        with open(file_path, 'rb') as f:
+            chunk_paths = write_import_chunks(f, file_format, chunks_dir, chunk_rows=chunk_rows)
+        
+        row_label = FILE_IMPORT_FORMATS[file_format][2]
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "chunks": str(len(chunk_paths)),
+            "total_rows": str(count_chunk_rows(chunk_paths, chunk_rows)),
+        })
+        
+        chord([
+            import_product_chunk.s(chunk_path, row_label, parent_task_id=task_id, delta=delta, fast=fast,
+                                   chunks_dir=chunks_dir)
+            for chunk_path in chunk_paths
+        ])(finalize_product_import.s(task_id=task_id, user_id=user_id, chunks_dir=chunks_dir))
+        
+        try:
+            os.unlink(file_path)
+            logger.info(f"Temporary file removed: {file_path}")
+        except OSError as e:
+            logger.error(f"Failed to remove temporary file {file_path}: {e}")
+        
+        logger.info(f"Dispatched {len(chunk_paths)} import chunks for task {task_id}")
+        return {'chunks': len(chunk_paths)}
+        
+    except Exception as e:
+        logger.error(f"Parallel product import failed: {str(e)}", exc_info=True)
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_FAILED,
+            "error": str(e),
+            "completed_at": datetime.now().isoformat(),
+        })
+        raise
+
+def count_chunk_rows(chunk_paths, chunk_rows):
+    """Rows in chunks written by write_import_chunks: all but the last one are full"""
+    if not chunk_paths:
+        return 0
+    with open(chunk_paths[-1], 'rb') as f:
+        last_rows = sum(1 for _ in f)
+    return (len(chunk_paths) - 1) * chunk_rows + last_rows
+
+class ProductImportChunkTask(BaseTask):
+    """Base task for a single chunk of a parallel product import"""
+    name = 'products.import_chunk'
+    
+    def cleanup_on_failure(self, task_id, args, kwargs):
+        """
+        Mark the parent import as failed and remove its chunk files;
+        the chord callback will never run
+        """
+        parent_task_id = kwargs.get('parent_task_id')
+        if parent_task_id:
+            redis_client = get_redis_client()
+            redis_client.hset(f"task_status:{parent_task_id}", mapping={
+                "status": TASK_STATUS_FAILED,
+                "error": f"Import chunk {task_id} failed",
+                "completed_at": datetime.now().isoformat(),
+            })
+        chunks_dir = kwargs.get('chunks_dir')
+        if chunks_dir:
+            shutil.rmtree(chunks_dir, ignore_errors=True)
+
+@shared_task(base=ProductImportChunkTask, bind=True)
+def import_product_chunk(self, chunk_path, row_label, parent_task_id=None, delta=False, fast=False,
+                         chunks_dir=None):
+    """
+    Import one chunk written by write_import_chunks.
+    
+    Upserts are keyed by SKU, so a retried chunk simply rewrites the same rows;
+    its progress is rolled back before the retry, so the rows are not counted
+    twice in the parent status. chunks_dir is removed if the chunk fails for
+    good, since the chord callback that normally removes it will never run.
+    
+    Returns:
+        dict: Chunk results with at most MAX_CHUNK_ERRORS error messages
+    """
+    progress = TaskProgress(parent_task_id) if parent_task_id else None
+    try:
+        results = import_products_from_chunk(
+            chunk_path, row_label=row_label,
+            on_progress=import_progress_callback(progress) if progress else None,
+            delta=delta,
+            fast=fast,
+        )
+    except Exception:
+        # A retry imports the chunk from its first row and reports it again
+        if progress:
+            progress.rollback()
+        raise
+    if progress:
+        progress.finish()
+    results['errors'] = results['errors'][:MAX_CHUNK_ERRORS]
+    
+    try:
+        os.unlink(chunk_path)
+    except OSError as e:
+        logger.error(f"Failed to remove import chunk {chunk_path}: {e}")
+    
+    return results
+
+def aggregate_import_results(chunk_results):
+    """Sum the results of the tasks of a parallel import"""
+    results = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 0, 'errors': []}
+    for chunk in chunk_results:
+        for key in ('created', 'updated', 'unchanged', 'failed', 'total'):
+            results[key] += chunk.get(key, 0)
+        results['errors'].extend(chunk.get('errors', []))
+    return results
+
+@shared_task(bind=True)
+def finalize_product_import(self, chunk_results, task_id, user_id=None, chunks_dir=None):
+    """
+    Chord callback: aggregate chunk results of a parallel import.
+    
+    Args:
+        chunk_results: List of results returned by import_product_chunk
+        task_id: ID of the coordinating process_product_import_parallel task
+        user_id: ID of the user who initiated the import
+        chunks_dir: Directory with chunk files to remove
+        
+    Returns:
+        dict: Aggregated import results
+    """
+    results = aggregate_import_results(chunk_results)
+    
+    redis_client = get_redis_client()
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_COMPLETE,
+        "completed_at": datetime.now().isoformat(),
+        "created": str(results['created']),
+        "updated": str(results['updated']),
+        "unchanged": str(results['unchanged']),
+        "failed": str(results['failed']),
+        "total": str(results['total']),
+    })
+    
+    if user_id:
+        notify_import_complete(user_id, results)
+    
+    if chunks_dir:
+        shutil.rmtree(chunks_dir, ignore_errors=True)
+    
+    logger.info(
+        f"Parallel product import {task_id} completed: total={results['total']}, "
+        f"created={results['created']}, updated={results['updated']}, "
+        f"unchanged={results['unchanged']}, failed={results['failed']}"
+    )
+    return results
+
+@shared_task(base=ProductImportTask, bind=True)
+def process_api_import(self, api_url, api_key=None, method='GET', params=None, headers=None, data=None,
+                       pagination=None, use_cache=True, user_id=None):
+    """
+    Import products from a supplier API asynchronously.
+    
+    Args:
+        api_url: URL of the API endpoint
+        api_key: API key sent as a bearer token
+        method: HTTP method
+        params: Query parameters
+        headers: HTTP headers
+        data: JSON request body
+        pagination: Pagination settings (see utils.iter_api_products)
+        use_cache: Send conditional requests and skip pages that did not change
+        user_id: ID of the user who initiated the import
+        
+    Returns:
+        dict: Import results with counts of products created/updated/failed
+    """
+    task_id = self.request.id
+    redis_client = get_redis_client()
+    
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PROCESSING,
+        "source": "api",
+        "api_url": api_url,
+        "started_at": datetime.now().isoformat(),
+        "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
+    })
+    
+    try:
+        logger.info(f"Starting product import from API: {api_url}")
+        
+        progress = TaskProgress(task_id)
+        results = import_products_from_api(
+            api_url, api_key=api_key, method=method, params=params, headers=headers, data=data,
+            pagination=pagination, use_cache=use_cache, on_progress=import_progress_callback(progress)
+        )
+        progress.finish()
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_COMPLETE,
+            "completed_at": datetime.now().isoformat(),
+            "created": str(results.get('created', 0)),
+            "updated": str(results.get('updated', 0)),
+            "unchanged": str(results.get('unchanged', 0)),
+            "failed": str(results.get('failed', 0)),
+            "total": str(results.get('total', 0)),
+            "not_modified": "1" if results.get('not_modified') else "0",
+        })
+        
+        if user_id:
+            notify_import_complete(user_id, results)
+        
+        logger.info(f"API product import completed: {results}")
+        return results
+        
+    except Exception as e:
+        logger.error(f"API product import failed: {str(e)}", exc_info=True)
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_FAILED,
+            "error": str(e),
+            "completed_at": datetime.now().isoformat(),
+        })
+        
+        # Re-raise for retry handling by Celery
+        raise
+
+# A scraping run can take long and loads the target site, so it gets an
+# extended time limit and is retried only once
+@shared_task(base=ProductImportTask, bind=True, time_limit=3600, soft_time_limit=3300,
+             retry_kwargs={'max_retries': 1})
+def process_scraping_import(self, url, config, use_cache=True, user_id=None):
+    """
+    Import products by scraping a website asynchronously.
+    
+    Args:
+        url: URL of the first page to scrape
+        config: Scraping configuration (see ProductScrapingForm.get_config)
+        use_cache: Skip pages and products that did not change since the last import
+        user_id: ID of the user who initiated the import
+        
+    Returns:
+        dict: Import results with counts of products created/updated/failed
+    """
+    task_id = self.request.id
+    redis_client = get_redis_client()
+    
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PROCESSING,
+        "source": "scraping",
+        "url": url,
+        "started_at": datetime.now().isoformat(),
+        "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
+    })
+    
+    try:
+        logger.info(f"Starting product import by scraping: {url}")
+        
+        progress = TaskProgress(task_id)
+        results = import_products_via_scraping(
+            url, config, on_progress=import_progress_callback(progress), use_cache=use_cache
+        )
+        progress.finish()
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_COMPLETE,
+            "completed_at": datetime.now().isoformat(),
+            "created": str(results.get('created', 0)),
+            "updated": str(results.get('updated', 0)),
+            "unchanged": str(results.get('unchanged', 0)),
+            "failed": str(results.get('failed', 0)),
+            "total": str(results.get('total', 0)),
+            "pages_unchanged": str(results.get('pages_unchanged', 0)),
+            "not_modified": "1" if results.get('not_modified') else "0",
+        })
+        
+        if user_id:
+            notify_import_complete(user_id, results)
+        
+        logger.info(f"Scraping product import completed: {results}")
+        return results
+        
+    except Exception as e:
+        logger.error(f"Scraping product import failed: {str(e)}", exc_info=True)
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_FAILED,
+            "error": str(e),
+            "completed_at": datetime.now().isoformat(),
+        })
+        
+        # Re-raise for retry handling by Celery
+        raise
+
+@shared_task(base=ProductImportTask, bind=True)
+def process_scraping_crawl(self, url, config, user_id=None, workers=2, crawl_id=None, use_cache=True):
+    """
+    Coordinate a scraping import crawled by several Celery workers.
+    
+    The crawl frontier (see CrawlFrontier) lives in Redis under crawl_id:
+    workers take listing pages from its queue and add the pages they
+    discover, so each page is visited once and per-host limits hold across
+    workers. finalize_scraping_crawl aggregates their results once all of
+    them have stopped.
+    
+    Args:
+        url: URL of the first page to scrape
+        config: Scraping configuration (see ProductScrapingForm.get_config)
+        user_id: ID of the user who initiated the import
+        workers: Number of scrape_crawl_pages tasks
+        crawl_id: ID of a paused crawl to resume; a new crawl uses the task ID
+        use_cache: Skip pages and products that did not change since the last import
+        
+    Returns:
+        dict: Crawl ID and number of dispatched workers
+    """
+    task_id = self.request.id
+    crawl_id = crawl_id or task_id
+    redis_client = get_redis_client()
+    
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PROCESSING,
+        "source": "scraping",
+        "mode": "crawl",
+        "url": url,
+        "crawl_id": crawl_id,
+        "workers": str(workers),
+        "started_at": datetime.now().isoformat(),
+        "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
+    })
+    
+    try:
+        frontier = scraping_frontier(crawl_id)
+        if frontier.exists():
+            requeued = frontier.resume()
+            logger.info(f"Resuming crawl {crawl_id} ({requeued} interrupted page(s) requeued)")
+        frontier.start(
+            url=url, config=json.dumps(config), workers=str(workers), task_id=task_id,
+            user_id=str(user_id) if user_id else "unknown", use_cache="1" if use_cache else "0",
+        )
+        
+        chord([
+            scrape_crawl_pages.s(crawl_id, url, config, parent_task_id=task_id, use_cache=use_cache)
+            for _ in range(workers)
+        ])(finalize_scraping_crawl.s(task_id=task_id, crawl_id=crawl_id, user_id=user_id))
+        
+        logger.info(f"Dispatched {workers} scraping workers for crawl {crawl_id}")
+        return {'crawl_id': crawl_id, 'workers': workers}
+        
+    except Exception as e:
+        logger.error(f"Scraping crawl failed: {str(e)}", exc_info=True)
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_FAILED,
+            "error": str(e),
+            "completed_at": datetime.now().isoformat(),
+        })
+        raise
+
+class ScrapeCrawlWorkerTask(BaseTask):
+    """Base task for a single worker of a scraping crawl"""
+    name = 'products.scrape_crawl_worker'
+    
+    def cleanup_on_failure(self, task_id, args, kwargs):
+        """
+        Mark the parent crawl as failed and pause the crawl; the chord
+        callback will never run, but the crawl can be resumed by its ID
+        """
+        parent_task_id = kwargs.get('parent_task_id')
+        if parent_task_id:
+            redis_client = get_redis_client()
+            redis_client.hset(f"task_status:{parent_task_id}", mapping={
+                "status": TASK_STATUS_FAILED,
+                "error": f"Scraping crawl worker {task_id} failed",
+                "completed_at": datetime.now().isoformat(),
+            })
+        crawl_id = kwargs.get('crawl_id') or (args[0] if args else None)
+        if crawl_id:
+            # The other workers finish their current page and stop
+            scraping_frontier(crawl_id).pause()
+
+@shared_task(base=ScrapeCrawlWorkerTask, bind=True, time_limit=3600, soft_time_limit=3300,
+             retry_kwargs={'max_retries': 1})
+def scrape_crawl_pages(self, crawl_id, url, config, parent_task_id=None, use_cache=True):
+    """
+    Scrape listing pages from the crawl frontier until it is empty or paused.
+    
+    Rows of a failed attempt are not part of its results, so its progress
+    is rolled back before the retry continues from the frontier.
+    
+    Returns:
+        dict: Worker results with at most MAX_CHUNK_ERRORS error messages
+    """
+    progress = TaskProgress(parent_task_id) if parent_task_id else None
+    try:
+        results = import_products_via_scraping(
+            url, config,
+            on_progress=import_progress_callback(progress) if progress else None,
+            frontier=scraping_frontier(crawl_id),
+            use_cache=use_cache,
+        )
+    except Exception:
+        if progress:
+            progress.rollback()
+        raise
+    if progress:
+        progress.finish()
+    results['errors'] = results['errors'][:MAX_CHUNK_ERRORS]
+    return results
+
+@shared_task(bind=True)
+def finalize_scraping_crawl(self, worker_results, task_id, crawl_id, user_id=None):
+    """
+    Chord callback: aggregate worker results of a scraping crawl.
+    
+    A crawl that was paused, or whose workers stopped with pages still in
+    the frontier, is reported as paused and can be resumed with the same
+    crawl_id; otherwise it is complete.
+    
+    Args:
+        worker_results: List of results returned by scrape_crawl_pages
+        task_id: ID of the coordinating process_scraping_crawl task
+        crawl_id: ID of the crawl frontier
+        user_id: ID of the user who initiated the import
+        
+    Returns:
+        dict: Aggregated import results
+    """
+    results = aggregate_import_results(worker_results)
+    pages_unchanged = sum(worker.get('pages_unchanged', 0) for worker in worker_results)
+    
+    frontier = scraping_frontier(crawl_id)
+    stats = frontier.get_stats()
+    paused = frontier.is_paused() or stats['pending'] > 0 or stats['in_flight'] > 0
+    if paused:
+        frontier.pause()
+    else:
+        frontier.finish()
+    
+    redis_client = get_redis_client()
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PAUSED if paused else TASK_STATUS_COMPLETE,
+        "completed_at": datetime.now().isoformat(),
+        "created": str(results['created']),
+        "updated": str(results['updated']),
+        "unchanged": str(results['unchanged']),
+        "failed": str(results['failed']),
+        "total": str(results['total']),
+        "pages_done": str(stats['done']),
+        "pages_failed": str(stats['failed']),
+        "pages_pending": str(stats['pending'] + stats['in_flight']),
+        "duplicates": str(stats['duplicates']),
+        "pages_unchanged": str(pages_unchanged),
+    })
+    
+    if user_id and not paused:
+        notify_import_complete(user_id, results)
+    
+    logger.info(
+        f"Scraping crawl {crawl_id} {'paused' if paused else 'completed'}: pages={stats['done']}, "
+        f"total={results['total']}, created={results['created']}, updated={results['updated']}, "
+        f"failed={results['failed']}, duplicates={stats['duplicates']}"
+    )
+    return results
+
 class ProductExportTask(BaseTask):
     """Base task for product export operations with enhanced error handling"""
     name = 'products.export'
@@ -199,6 +846,46 @@ class ProductExportTask(BaseTask):
             except Exception as e:
                 logger.error(f"Failed to send failure notification: {e}")
 
+def get_export_products(category_id=None):
+    """
+    Active products to export, optionally filtered by category.
+    
+    Returns:
+        tuple: (QuerySet of products, category display name)
+    """
+    products = Product.objects.filter(is_active=True)
+    
+    if category_id:
+        try:
+            category = Category.objects.get(id=category_id)
+            return products.filter(category=category), category.name
+        except Category.DoesNotExist:
+            logger.warning(f"Category with ID {category_id} not found, exporting all products")
+    
+    return products, "All Categories"
+
+def notify_export_complete(user_id, category_name, file_format, count, download_url):
+    """Send the download link to the user who started the export"""
+    try:
+        user = User.objects.get(id=user_id)
+        if user.email:
+            send_mail(
+                _('Product Export Complete'),
+                _(f'Your product export has been completed.\n\n'
+                  f'Category: {category_name}\n'
+                  f'Format: {file_format}\n'
+                  f'Products: {count}\n\n'
+                  f'Download: {download_url}\n\n'
+                  f'The download link will be available for 7 days.'),
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+                fail_silently=True,
+            )
+    except User.DoesNotExist:
+        logger.error(f"User with ID {user_id} not found for notification")
+    except Exception as e:
+        logger.error(f"Failed to send completion notification: {e}")
+
 @shared_task(base=ProductExportTask, bind=True)
 def process_product_export(self, category_id=None, file_format='csv', user_id=None):
     """
@@ -206,7 +893,7 @@ def process_product_export(self, category_id=None, file_format='csv', user_id=No
     
     Args:
         category_id: Optional category ID to filter products
-        file_format: Format for the export (csv, json, xml)
+        file_format: Format for the export (csv, json, ndjson, xml, parquet)
         user_id: ID of the user who initiated the export
         
     Returns:
@@ -230,40 +917,36 @@ def process_product_export(self, category_id=None, file_format='csv', user_id=No
         "file_format": file_format,
         "started_at": datetime.now().isoformat(),
         "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
     })
     
     try:
         # Get products, optionally filtered by category
-        products = Product.objects.filter(is_active=True)
-        
-        if category_id:
-            try:
-                category = Category.objects.get(id=category_id)
-                products = products.filter(category=category)
-                category_name = category.name
-            except Category.DoesNotExist:
-                logger.warning(f"Category with ID {category_id} not found, exporting all products")
-                category_name = "All Categories"
-        else:
-            category_name = "All Categories"
+        products, category_name = get_export_products(category_id)
         
         # Count of products to export
         count = products.count()
         logger.info(f"Exporting {count} products from {category_name} in {file_format} format")
         
+        progress = TaskProgress(task_id, total=count)
+        
         # Export based on format
         if file_format == 'csv':
-            with open(export_path, 'wb') as f:
-                export_products_to_csv(products, f)
+            export_products_to_csv(products, export_path, on_progress=progress.update)
         elif file_format == 'json':
-            with open(export_path, 'wb') as f:
-                export_products_to_json(products, f)
+            export_products_to_json(products, export_path, on_progress=progress.update)
+        elif file_format == 'ndjson':
+            export_products_to_ndjson(products, export_path, on_progress=progress.update)
         elif file_format == 'xml':
-            with open(export_path, 'wb') as f:
-                export_products_to_xml(products, f)
+            export_products_to_xml(products, export_path, on_progress=progress.update)
+        elif file_format == 'parquet':
+            export_products_to_parquet(products, export_path, on_progress=progress.update)
         else:
             raise ValueError(f"Unsupported export format: {file_format}")
         
+        progress.finish()
+        
         # Generate download URL
         download_url = f"{settings.BASE_URL}{settings.MEDIA_URL}exports/{filename}"
         
@@ -281,25 +964,7 @@ def process_product_export(self, category_id=None, file_format='csv', user_id=No
         
         # Send notification email
         if user_id:
-            try:
-                user = User.objects.get(id=user_id)
-                if user.email:
-                    send_mail(
-                        _('Product Export Complete'),
-                        _(f'Your product export has been completed.\n\n'
-                          f'Category: {category_name}\n'
-                          f'Format: {file_format}\n'
-                          f'Products: {count}\n\n'
-                          f'Download: {download_url}\n\n'
-                          f'The download link will be available for 7 days.'),
-                        settings.DEFAULT_FROM_EMAIL,
-                        [user.email],
-                        fail_silently=True,
-                    )
-            except User.DoesNotExist:
-                logger.error(f"User with ID {user_id} not found for notification")
-            except Exception as e:
-                logger.error(f"Failed to send completion notification: {e}")
+            notify_export_complete(user_id, category_name, file_format, count, download_url)
         
         results = {
             'count': count,
@@ -332,6 +997,186 @@ def process_product_export(self, category_id=None, file_format='csv', user_id=No
         # Re-raise for retry handling
         raise
 
+@shared_task(base=ProductExportTask, bind=True)
+def process_product_export_sharded(self, category_id=None, file_format='csv', user_id=None, shard_size=None):
+    """
+    Coordinate a product export split into primary-key range shards.
+    
+    Each shard is written to a part file by export_product_shard in
+    parallel; finalize_product_export concatenates the parts into the
+    requested format and publishes the download link.
+    
+    Args:
+        category_id: Optional category ID to filter products
+        file_format: Format for the export (csv, json, ndjson, xml, parquet)
+        user_id: ID of the user who initiated the export
+        shard_size: Approximate number of products per shard
+        
+    Returns:
+        dict: Number of dispatched shards and the target filename
+    """
+    task_id = self.request.id
+    redis_client = get_redis_client()
+    
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_PROCESSING,
+        "mode": "sharded",
+        "file_format": file_format,
+        "started_at": datetime.now().isoformat(),
+        "user_id": str(user_id) if user_id else "unknown",
+        "processed": "0",
+        "errors": "0",
+    })
+    
+    try:
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        
+        products, category_name = get_export_products(category_id)
+        id_ranges = split_id_ranges(products, shard_size or settings.PRODUCT_EXPORT_SHARD_SIZE)
+        
+        exports_dir = os.path.join(settings.MEDIA_ROOT, 'exports')
+        parts_dir = os.path.join(exports_dir, 'parts', task_id)
+        os.makedirs(parts_dir, exist_ok=True)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"products_export_{timestamp}.{file_format}"
+        part_paths = [
+            os.path.join(parts_dir, f"part_{index:05d}.{file_format}")
+            for index in range(len(id_ranges))
+        ]
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "shards": str(len(id_ranges)),
+            "total_rows": str(products.count()),
+        })
+        logger.info(f"Exporting {category_name} in {len(id_ranges)} shards as {file_format}")
+        
+        chord([
+            export_product_shard.s(
+                category_id, file_format, start_id, end_id, part_path, parent_task_id=task_id
+            )
+            for (start_id, end_id), part_path in zip(id_ranges, part_paths)
+        ])(finalize_product_export.s(
+            task_id=task_id,
+            file_format=file_format,
+            filename=filename,
+            part_paths=part_paths,
+            parts_dir=parts_dir,
+            category_name=category_name,
+            user_id=user_id,
+        ))
+        
+        return {'shards': len(id_ranges), 'filename': filename}
+        
+    except Exception as e:
+        logger.error(f"Sharded product export failed: {str(e)}", exc_info=True)
+        
+        redis_client.hset(f"task_status:{task_id}", mapping={
+            "status": TASK_STATUS_FAILED,
+            "error": str(e),
+            "completed_at": datetime.now().isoformat(),
+        })
+        raise
+
+class ProductExportShardTask(BaseTask):
+    """Base task for a single shard of a sharded product export"""
+    name = 'products.export_shard'
+    
+    def cleanup_on_failure(self, task_id, args, kwargs):
+        """Mark the parent export as failed; the chord callback will never run"""
+        parent_task_id = kwargs.get('parent_task_id')
+        if parent_task_id:
+            redis_client = get_redis_client()
+            redis_client.hset(f"task_status:{parent_task_id}", mapping={
+                "status": TASK_STATUS_FAILED,
+                "error": f"Export shard {task_id} failed",
+                "completed_at": datetime.now().isoformat(),
+            })
+
+@shared_task(base=ProductExportShardTask, bind=True)
+def export_product_shard(self, category_id, file_format, start_id, end_id, part_path, parent_task_id=None):
+    """
+    Export products with start_id <= id < end_id to a part file.
+    
+    A retry writes the part from the first row again, so a failed attempt
+    removes its partial file and rolls back its progress first.
+    
+    Returns:
+        int: Number of exported products
+    """
+    products, _category_name = get_export_products(category_id)
+    products = products.filter(id__gte=start_id, id__lt=end_id).order_by('id')
+    
+    progress = TaskProgress(parent_task_id) if parent_task_id else None
+    try:
+        export_products_part(
+            products, file_format, part_path,
+            on_progress=progress.update if progress else None,
+        )
+    except Exception:
+        if progress:
+            progress.rollback()
+        try:
+            os.unlink(part_path)
+        except OSError:
+            pass
+        raise
+    if progress:
+        progress.finish()
+    return products.count()
+
+@shared_task(bind=True)
+def finalize_product_export(self, shard_counts, task_id, file_format, filename, part_paths,
+                            parts_dir=None, category_name=None, user_id=None):
+    """
+    Chord callback: concatenate shard parts into the final export file.
+    
+    Args:
+        shard_counts: Product counts returned by export_product_shard
+        task_id: ID of the coordinating process_product_export_sharded task
+        file_format: Export format
+        filename: Name of the final file in the exports directory
+        part_paths: Part files in primary-key order
+        parts_dir: Directory with part files to remove
+        category_name: Category display name for the notification
+        user_id: ID of the user who initiated the export
+        
+    Returns:
+        dict: Export results with counts and download URL
+    """
+    export_path = os.path.join(settings.MEDIA_ROOT, 'exports', filename)
+    concatenate_export_parts(part_paths, file_format, export_path)
+    
+    if parts_dir:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    
+    count = sum(shard_counts)
+    download_url = f"{settings.BASE_URL}{settings.MEDIA_URL}exports/{filename}"
+    
+    redis_client = get_redis_client()
+    redis_client.hset(f"task_status:{task_id}", mapping={
+        "status": TASK_STATUS_COMPLETE,
+        "completed_at": datetime.now().isoformat(),
+        "count": str(count),
+        "download_url": download_url,
+        "filename": filename,
+    })
+    redis_client.expire(f"task_status:{task_id}", 60 * 60 * 24 * 7)
+    
+    if user_id:
+        notify_export_complete(user_id, category_name, file_format, count, download_url)
+    
+    results = {
+        'count': count,
+        'category': category_name,
+        'format': file_format,
+        'download_url': download_url,
+        'filename': filename,
+    }
+    logger.info(f"Sharded product export completed: {results}")
+    return results
+
 @shared_task
 def clean_old_export_files():
     """
@@ -365,5 +1210,14 @@ def clean_old_export_files():
             except OSError as e:
                 logger.error(f"Failed to delete old export file {filename}: {e}")
     
+    # Remove part directories left behind by failed sharded exports
+    parts_dir = os.path.join(exports_dir, 'parts')
+    if os.path.isdir(parts_dir):
+        for dirname in os.listdir(parts_dir):
+            dir_path = os.path.join(parts_dir, dirname)
+            if datetime.fromtimestamp(os.path.getmtime(dir_path)) < cutoff_date:
+                shutil.rmtree(dir_path, ignore_errors=True)
+                logger.info(f"Deleted stale export parts: {dirname}")
+    
     logger.info(f"Cleaned up {deleted_count} old export files")
     return {'deleted_count': deleted_count} 
\ No newline at end of file
@@ -0,0 +1,1198 @@
+import gc
+import hashlib
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import redis
+from django.core.exceptions import ValidationError
+from django.db import DataError, connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from requests.exceptions import HTTPError
+from selenium.common.exceptions import WebDriverException
+
+from config import celery_app
+
+from . import tasks, utils
+from .models import Category, Attribute, AttributeValue, Product, ProductImage, ProductAttribute
+
+# Порция чтения в тестах: несколько порций на небольшом числе товаров
+CHUNK_SIZE = 5
+
+class FakeRedis:
+    """Redis в памяти для тестов: только команды, которые использует импорт"""
+
+    def __init__(self):
+        self.data = {}
+
+    @staticmethod
+    def _bytes(value):
+        return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        mapping = dict(mapping or {})
+        if field is not None:
+            mapping[field] = value
+        fields = self.data.setdefault(key, {})
+        for name, item in mapping.items():
+            fields[self._bytes(name)] = self._bytes(item)
+        return len(mapping)
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(self._bytes(field))
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hmget(self, key, *fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hdel(self, key, *fields):
+        return sum(self.data.get(key, {}).pop(self._bytes(field), None) is not None for field in fields)
+
+    def hincrby(self, key, field, amount=1):
+        value = int(self.hget(key, field) or 0) + amount
+        self.hset(key, field, value)
+        return value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = self._bytes(value)
+        return True
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+class FakeRedisMixin:
+    """Подменяет Redis задач, прогресса и кешей импорта на FakeRedis"""
+    redis_targets = (
+        'apps.products.tasks.get_redis_client',
+        'apps.products.utils.get_redis_client',
+        'apps.core.utils.progress.get_redis_client',
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.redis = self.make_redis()
+        for target in self.redis_targets:
+            patcher = mock.patch(target, return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_redis(self):
+        return FakeRedis()
+
+    def task_status(self, task_id):
+        return {key.decode(): value.decode() for key, value in self.redis.hgetall(f'task_status:{task_id}').items()}
+
+class ExportQueryCountTests(TestCase):
+    """
+    Число запросов экспорта зависит от числа порций, а не товаров
+
+    На порцию приходится один запрос атрибутов (со значениями и их
+    атрибутами) и один запрос изображений, плюс один запрос самих товаров.
+    Обращение к связям товара внутри цикла экспорта (N+1) ломает тест.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Export', slug='export')
+        color = Attribute.objects.create(name='Color', slug='color')
+        size = Attribute.objects.create(name='Size', slug='size')
+        cls.values = [
+            AttributeValue.objects.create(attribute=color, value='red'),
+            AttributeValue.objects.create(attribute=size, value='L'),
+        ]
+
+    def create_products(self, count):
+        for number in range(Product.objects.count(), Product.objects.count() + count):
+            product = Product.objects.create(
+                name=f'Product {number}', slug=f'product-{number}', description='Description',
+                price='10.00', category=self.category, sku=f'SKU-{number}'
+            )
+            for value in self.values:
+                ProductAttribute.objects.create(product=product, attribute_value=value)
+            ProductImage.objects.create(product=product, image=f'products/{number}.jpg', alt_text='Photo')
+            ProductImage.objects.create(product=product, image=f'products/{number}-back.jpg')
+
+    def expected_queries(self):
+        chunks = -(-Product.objects.count() // CHUNK_SIZE)
+        return 1 + 2 * chunks
+
+    def assert_export_queries(self, export):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+
+        expected = self.expected_queries()
+        with mock.patch.object(utils, 'EXPORT_CHUNK_SIZE', CHUNK_SIZE):
+            with self.assertNumQueries(expected):
+                export(Product.objects.all(), path)
+
+    def test_json_export_queries_per_chunk(self):
+        self.create_products(10)
+        self.assert_export_queries(utils.export_products_to_json)
+        self.create_products(10)
+        self.assert_export_queries(utils.export_products_to_json)
+
+    def test_xml_export_queries_per_chunk(self):
+        self.create_products(10)
+        self.assert_export_queries(utils.export_products_to_xml)
+        self.create_products(10)
+        self.assert_export_queries(utils.export_products_to_xml)
+
+    def test_export_includes_related_data(self):
+        self.create_products(3)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+
+        utils.export_products_to_json(Product.objects.all(), path)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.assertEqual(len(data), 3)
+        for item in data:
+            self.assertEqual(len(item['attributes']), 2)
+            self.assertEqual(len(item['images']), 2)
+
+
+def product_json(sku, **fields):
+    """Товар в формате export_products_to_json"""
+    data = {
+        'sku': sku, 'name': f'Product {sku}', 'description': '', 'price': 10, 'stock': 1,
+        'category': {'name': 'Imported', 'slug': 'imported'},
+    }
+    data.update(fields)
+    return data
+
+class JsonArrayParsingTests(SimpleTestCase):
+    """Инкрементальный разбор JSON-массива"""
+
+    def parse(self, text, chunk_size=7):
+        return list(utils.iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+
+    def test_items_across_chunk_boundaries(self):
+        items = [product_json('A-1', price=12345.5), product_json('Б-2', attributes=[{'name': 'Цвет', 'value': 'red'}]),
+                 [1, 2], 1234567890, 'строка']
+        text = json.dumps(items, ensure_ascii=False, indent=2)
+        for chunk_size in (1, 3, 7, len(text)):
+            self.assertEqual(self.parse(text, chunk_size), items)
+
+    def test_empty_array(self):
+        self.assertEqual(self.parse(' [ ] '), [])
+
+    def test_missing_comma_between_items(self):
+        with self.assertRaises(ValueError):
+            self.parse('[{"a": 1} {"a": 2}]')
+        with self.assertRaises(ValueError):
+            self.parse('[1 2]')
+
+    def test_misplaced_commas(self):
+        for text in ('[1, 2,]', '[, 1]', '[1,, 2]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.parse(text)
+
+    def test_not_an_array_or_truncated(self):
+        for text in ('{"a": 1}', '[{"a": 1}, {"a": ', '[1, 2'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.parse(text)
+
+class NdjsonImportTests(TestCase):
+    """Импорт NDJSON: пустые строки пропускаются, битая строка - ошибка только этой записи"""
+
+    def test_blank_and_bad_lines(self):
+        lines = [
+            json.dumps(product_json('N-1')),
+            '',
+            '   ',
+            '{"sku": "N-2", broken',
+            json.dumps(product_json('N-3')),
+        ]
+        results = utils.import_products_from_ndjson(io.BytesIO('\n'.join(lines).encode('utf-8')))
+
+        self.assertEqual(results['total'], 3)
+        self.assertEqual(results['created'], 2)
+        self.assertEqual(results['failed'], 1)
+        self.assertIn('записи 2', results['errors'][0])
+        self.assertEqual(set(Product.objects.values_list('sku', flat=True)), {'N-1', 'N-3'})
+
+def product_record(sku, name=None, **fields):
+    """Нормализованная запись товара для ProductBulkWriter"""
+    fields.setdefault('price', '10.00')
+    fields.setdefault('category', 'Imported')
+    return utils.build_product_record(sku=sku, name=name or f'Product {sku}', **fields)
+
+class ProductBulkWriterTests(TestCase):
+    """Пачечная запись товаров"""
+
+    def write(self, records, **kwargs):
+        writer = utils.ProductBulkWriter(**kwargs)
+        for number, record in enumerate(records, start=1):
+            writer.add(number, record)
+        return writer.close()
+
+    def test_created_and_updated_counts(self):
+        self.write([product_record('B-1'), product_record('B-2')])
+        results = self.write([
+            product_record('B-1', price='11.00'),
+            product_record('B-3', attributes=[('Color', 'red'), ('Color', 'red'), ('Size', 'L')]),
+        ])
+
+        self.assertEqual((results['created'], results['updated'], results['failed']), (1, 1, 0))
+        self.assertEqual(str(Product.objects.get(sku='B-1').price), '11.00')
+        self.assertEqual(Product.objects.get(sku='B-3').product_attributes.count(), 2)
+        self.assertEqual(Category.objects.filter(name='Imported').count(), 1)
+
+    def test_batch_queries_do_not_depend_on_batch_size(self):
+        def queries(prefix, count):
+            records = [product_record(f'{prefix}-{i}', attributes=[('Color', f'c{i % 3}')]) for i in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                self.write(records, batch_size=count)
+            return len(context.captured_queries)
+
+        # Первая пачка создает категорию и атрибуты, сравниваются следующие
+        queries('W', 5)
+        self.assertEqual(queries('S', 10), queries('L', 20))
+
+    def test_duplicate_sku_in_batch_flushes_previous_version(self):
+        writer = utils.ProductBulkWriter(batch_size=100)
+        writer.add(1, product_record('D-1', name='First'))
+        writer.add(2, product_record('D-2'))
+        self.assertFalse(Product.objects.exists())
+
+        writer.add(3, product_record('D-1', name='Second'))
+        # Первая версия D-1 записана до того, как вторая попала в пачку
+        self.assertEqual(Product.objects.get(sku='D-1').name, 'First')
+
+        results = writer.close()
+        self.assertEqual(Product.objects.get(sku='D-1').name, 'Second')
+        self.assertEqual((results['created'], results['updated'], results['total']), (2, 1, 3))
+
+    def test_integrity_error_retries_batch_row_by_row(self):
+        Product.objects.create(
+            name='Taken', slug='taken', description='', price='1.00', sku='OTHER',
+            category=Category.objects.create(name='Existing', slug='existing')
+        )
+        results = self.write([
+            product_record('I-1'),
+            product_record('I-2', slug='taken'),
+            product_record('I-3'),
+        ])
+
+        self.assertEqual((results['created'], results['updated'], results['failed']), (2, 0, 1))
+        self.assertIn('записи 2', results['errors'][0])
+        self.assertEqual(set(Product.objects.values_list('sku', flat=True)), {'OTHER', 'I-1', 'I-3'})
+
+    def test_data_error_retries_batch_row_by_row(self):
+        self.write([product_record('R-1')])
+        with mock.patch.object(utils.ProductBulkWriter, '_write_batch', side_effect=DataError('value too long')):
+            results = self.write([product_record('R-1', price='12.00'), product_record('R-2')])
+
+        self.assertEqual((results['created'], results['updated'], results['failed']), (1, 1, 0))
+        self.assertEqual(str(Product.objects.get(sku='R-1').price), '12.00')
+
+    def test_parse_errors_are_counted_per_row(self):
+        def parse(row):
+            return product_record(row['sku'], price=row['price'])
+
+        results = utils.bulk_import_products(
+            [{'sku': 'P-1', 'price': '1'}, {'sku': 'P-2', 'price': 'abc'}, {'sku': '', 'price': '1'}],
+            parse, row_label='строке'
+        )
+        self.assertEqual((results['created'], results['failed'], results['total']), (1, 2, 3))
+        self.assertEqual([error.split(':')[0] for error in results['errors']], ['Ошибка в строке 2', 'Ошибка в строке 3'])
+
+CSV_HEADER = 'sku,name,description,price,stock,category\n'
+
+class CsvImportTests(TestCase):
+    """Потоковое чтение CSV кусками"""
+
+    def csv_file(self, rows):
+        return io.BytesIO((CSV_HEADER + ''.join(rows)).encode('utf-8'))
+
+    def test_values_are_read_as_strings(self):
+        rows = list(utils.iter_csv_rows(self.csv_file([
+            '00123,Zero,,10,,Imported\n',
+            '1e5,NA,null,10.50,3,Imported\n',
+            '"0042",Quoted,"a, b",7,0,Imported\n',
+        ]), chunk_size=2))
+
+        self.assertEqual([row['sku'] for row in rows], ['00123', '1e5', '0042'])
+        self.assertEqual(rows[0]['description'], '')
+        self.assertEqual(rows[0]['stock'], '')
+        self.assertEqual((rows[1]['name'], rows[1]['description'], rows[1]['price']), ('NA', 'null', '10.50'))
+        self.assertEqual(rows[2]['description'], 'a, b')
+
+    def test_row_numbers_continue_across_chunks(self):
+        rows = [f'C-{i:03d},Product {i},,{i},1,Imported\n' for i in range(1, 8)]
+        rows[4] = 'C-005,Product 5,,abc,1,Imported\n'
+        rows[6] = ',Product 7,,7,1,Imported\n'
+
+        results = utils.import_products_from_csv(self.csv_file(rows), batch_size=2)
+
+        self.assertEqual((results['total'], results['created'], results['failed']), (7, 5, 2))
+        self.assertEqual([error.split(':')[0] for error in results['errors']],
+                         ['Ошибка в строке 5', 'Ошибка в строке 7'])
+        self.assertTrue(Product.objects.filter(sku='C-001').exists())
+        self.assertEqual(Product.objects.get(sku='C-003').description, '')
+
+PRODUCTS_XML = '''<?xml version='1.0' encoding='utf-8'?>
+<products>
+  <product>
+    <sku>X-1</sku><name>First</name><description>One</description><price>10.00</price><stock>1</stock>
+    <category><name>Imported</name><slug>imported</slug></category>
+    <attributes>
+      <attribute><name>Color</name><value>red</value></attribute>
+      <attribute><name>Size</name><value>L</value></attribute>
+    </attributes>
+    <images><image><url>/media/x1.jpg</url><alt_text>Front</alt_text></image></images>
+  </product>
+  <product>
+    <sku>X-2</sku><name>Second</name><description>Two</description><price>20.00</price><stock>2</stock>
+    <category><name>Imported</name><slug>imported</slug></category>
+    <attributes><attribute><name>Color</name><value>blue</value></attribute></attributes>
+    <images>
+      <image><url>/media/x2.jpg</url><alt_text>Front</alt_text></image>
+      <image><url>/media/x2-back.jpg</url><alt_text>Back</alt_text></image>
+    </images>
+    <related><product><sku>NESTED</sku></product></related>
+  </product>
+  <product>
+    <sku>X-3</sku><name>Third</name><description></description><price>30.00</price><stock>3</stock>
+    <category><name>Imported</name><slug>imported</slug></category>
+  </product>
+</products>'''
+
+class XmlImportTests(TestCase):
+    """Инкрементальный разбор XML"""
+
+    def test_nested_elements_survive_clearing(self):
+        parsed = []
+        for elem in utils.iter_xml_products(io.BytesIO(PRODUCTS_XML.encode('utf-8'))):
+            parsed.append({
+                'sku': elem.findtext('sku'),
+                'attributes': [(a.findtext('name'), a.findtext('value')) for a in elem.iter('attribute')],
+                'images': [image.findtext('url') for image in elem.iter('image')],
+            })
+
+        self.assertEqual(parsed, [
+            {'sku': 'X-1', 'attributes': [('Color', 'red'), ('Size', 'L')], 'images': ['/media/x1.jpg']},
+            {'sku': 'X-2', 'attributes': [('Color', 'blue')], 'images': ['/media/x2.jpg', '/media/x2-back.jpg']},
+            {'sku': 'X-3', 'attributes': [], 'images': []},
+        ])
+
+    def test_processed_products_are_released(self):
+        elems = []
+        sizes = []
+        for elem in utils.iter_xml_products(io.BytesIO(PRODUCTS_XML.encode('utf-8'))):
+            elems.append(elem)
+            sizes.append(len(elem))
+
+        # Товар полон, пока его обрабатывают, и очищен после перехода к следующему
+        self.assertTrue(all(sizes))
+        self.assertEqual([len(elem) for elem in elems], [0, 0, 0])
+
+    def test_import_keeps_attributes(self):
+        results = utils.import_products_from_xml(io.BytesIO(PRODUCTS_XML.encode('utf-8')), batch_size=2)
+
+        self.assertEqual((results['created'], results['failed']), (3, 0))
+        attributes = ProductAttribute.objects.filter(product__sku='X-1').values_list(
+            'attribute_value__attribute__name', 'attribute_value__value'
+        )
+        self.assertEqual(sorted(attributes), [('Color', 'red'), ('Size', 'L')])
+        self.assertEqual(Product.objects.get(sku='X-2').description, 'Two')
+
+def write_csv(rows):
+    """CSV-файл импорта во временном каталоге"""
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(CSV_HEADER + ''.join(rows))
+    return path
+
+def csv_rows(count, bad=()):
+    return [
+        f'T-{i},Product {i},,{"abc" if i in bad else i},1,Imported\n'
+        for i in range(1, count + 1)
+    ]
+
+class ParallelImportTests(FakeRedisMixin, TestCase):
+    """Импорт частями через chord и сборка результатов в finalize_product_import"""
+
+    def setUp(self):
+        super().setUp()
+        conf = celery_app.conf
+        saved = conf.task_always_eager, conf.task_eager_propagates
+        conf.task_always_eager = conf.task_eager_propagates = True
+        self.addCleanup(setattr, conf, 'task_always_eager', saved[0])
+        self.addCleanup(setattr, conf, 'task_eager_propagates', saved[1])
+
+    def test_write_import_chunks_keeps_row_numbers(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(write_csv(csv_rows(7, bad={5})), 'rb') as f:
+            paths = utils.write_import_chunks(f, 'csv', directory, chunk_rows=3)
+
+        chunks = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                chunks.append([json.loads(line) for line in f])
+        self.assertEqual([[item['number'] for item in chunk] for chunk in chunks], [[1, 2, 3], [4, 5, 6], [7]])
+        self.assertIn('error', chunks[1][1])
+        self.assertEqual(chunks[2][0]['record']['sku'], 'T-7')
+
+    def test_chunks_are_aggregated(self):
+        path = write_csv(csv_rows(7, bad={5}))
+        tasks.process_product_import_parallel.apply(
+            kwargs={'file_path': path, 'file_format': 'csv', 'chunk_rows': 3}, task_id='parallel'
+        )
+
+        status = self.task_status('parallel')
+        self.assertEqual(status['status'], tasks.TASK_STATUS_COMPLETE)
+        self.assertEqual((status['chunks'], status['total_rows']), ('3', '7'))
+        self.assertEqual((status['created'], status['failed'], status['total']), ('6', '1', '7'))
+        self.assertEqual((status['processed'], status['errors']), ('7', '1'))
+        self.assertEqual(Product.objects.count(), 6)
+        self.assertFalse(os.path.exists(path))
+
+    def test_failed_chunk_rolls_back_progress_and_removes_chunks(self):
+        directory = tempfile.mkdtemp(prefix='product_import_test_')
+        chunk_path = os.path.join(directory, 'part_00000.ndjson')
+        open(chunk_path, 'w').close()
+
+        def fail_midway(path, on_progress=None, **kwargs):
+            on_progress({'created': 2, 'updated': 0, 'unchanged': 0, 'failed': 1})
+            raise RuntimeError('worker lost its database connection')
+
+        with mock.patch.object(tasks, 'import_products_from_chunk', side_effect=fail_midway):
+            with self.assertRaises(RuntimeError):
+                tasks.import_product_chunk.run(chunk_path, 'строке', parent_task_id='parent', chunks_dir=directory)
+        # Повтор части посчитает ее строки заново
+        self.assertEqual((self.task_status('parent')['processed'], self.task_status('parent')['errors']), ('0', '0'))
+
+        tasks.import_product_chunk.cleanup_on_failure('chunk', (), {'parent_task_id': 'parent', 'chunks_dir': directory})
+        self.assertEqual(self.task_status('parent')['status'], tasks.TASK_STATUS_FAILED)
+        self.assertFalse(os.path.exists(directory))
+
+class UnreadableCheckpointRedis(FakeRedis):
+    def hgetall(self, key):
+        raise redis.ConnectionError('Redis is unavailable')
+
+class ImportCheckpointTests(FakeRedisMixin, TestCase):
+    """Возобновление импорта файла с контрольной точки"""
+
+    def import_csv(self, path, checkpoint, fail_on_batch=None):
+        write_batch = utils.ProductBulkWriter._write_batch
+        calls = []
+
+        def write(writer, records, existing=None):
+            calls.append([record['sku'] for record in records])
+            if len(calls) == fail_on_batch:
+                raise RuntimeError('worker lost')
+            return write_batch(writer, records, existing)
+
+        # Читатель прерванного импорта освобождается раньше, чем закрывается файл
+        f = open(path, 'rb')
+        self.addCleanup(f.close)
+        self.addCleanup(gc.collect)
+        with mock.patch.object(utils.ProductBulkWriter, '_write_batch', write):
+            results = utils.import_products_from_csv(f, batch_size=2, checkpoint=checkpoint)
+        return results, calls
+
+    def test_resume_after_last_committed_batch(self):
+        path = write_csv(csv_rows(5, bad={2}))
+        self.addCleanup(os.unlink, path)
+
+        with self.assertRaises(Exception):
+            self.import_csv(path, tasks.ImportCheckpoint('resume'), fail_on_batch=2)
+        checkpoint = tasks.ImportCheckpoint('resume')
+        # Первая пачка: строки 1-3 (строка 2 с ошибкой)
+        self.assertEqual(checkpoint.offset, 3)
+        self.assertEqual((checkpoint.results['created'], checkpoint.results['failed']), (2, 1))
+
+        results, calls = self.import_csv(path, checkpoint)
+
+        self.assertEqual(calls, [['T-4', 'T-5']])
+        self.assertEqual((results['created'], results['failed'], results['total']), (4, 1, 5))
+        self.assertEqual(Product.objects.count(), 4)
+
+    def test_task_resumes_and_clears_checkpoint(self):
+        path = write_csv(csv_rows(4))
+        checkpoint = tasks.ImportCheckpoint('task')
+        checkpoint.save(2, {'created': 2, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 2, 'errors': []})
+
+        results = tasks.process_product_import.apply(
+            kwargs={'file_path': path, 'file_format': 'csv'}, task_id='task'
+        ).get()
+
+        self.assertEqual((results['created'], results['total']), (4, 4))
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['T-3', 'T-4'])
+        self.assertEqual(self.task_status('task')['resumed_from'], '2')
+        self.assertEqual(self.redis.hgetall('import_checkpoint:task'), {})
+
+class UnreadableCheckpointTests(FakeRedisMixin, TestCase):
+    def make_redis(self):
+        return UnreadableCheckpointRedis()
+
+    def test_unreadable_checkpoint_restarts_from_first_row(self):
+        checkpoint = tasks.ImportCheckpoint('broken')
+        self.assertEqual((checkpoint.offset, checkpoint.results), (0, None))
+
+        path = write_csv(csv_rows(3))
+        results = tasks.process_product_import.apply(
+            kwargs={'file_path': path, 'file_format': 'csv'}, task_id='broken'
+        ).get()
+        self.assertEqual(results['created'], 3)
+
+class DeltaImportTests(TestCase):
+    """Режим delta: пишутся только новые и изменившиеся товары"""
+
+    def write(self, records, **kwargs):
+        writer = utils.ProductBulkWriter(delta=True, **kwargs)
+        for number, record in enumerate(records, start=1):
+            writer.add(number, record)
+        return writer.close()
+
+    def records(self, changes=None):
+        return [
+            product_record(f'H-{i}', **dict({'attributes': [('Color', 'red')]}, **(changes or {}).get(i, {})))
+            for i in range(1, 5)
+        ]
+
+    def test_unchanged_products_are_skipped(self):
+        self.write(self.records())
+        stored = dict(Product.objects.values_list('sku', 'updated_at'))
+
+        with CaptureQueriesContext(connection) as context:
+            results = self.write(self.records())
+        # Только выборка отпечатков, без записи
+        statements = [query['sql'].split()[0].upper() for query in context.captured_queries]
+        self.assertEqual([statement for statement in statements if statement in ('INSERT', 'UPDATE')], [])
+        self.assertEqual(statements.count('SELECT'), 1)
+
+        self.assertEqual((results['unchanged'], results['updated'], results['created']), (4, 0, 0))
+        self.assertEqual(dict(Product.objects.values_list('sku', 'updated_at')), stored)
+
+    def test_changed_products_are_updated(self):
+        self.write(self.records())
+        results = self.write(self.records({
+            1: {'price': '99.00'},
+            2: {'attributes': [('Color', 'blue')]},
+        }) + [product_record('H-5')])
+
+        self.assertEqual((results['created'], results['updated'], results['unchanged']), (1, 2, 2))
+        self.assertEqual(str(Product.objects.get(sku='H-1').price), '99.00')
+        self.assertIn('blue', Product.objects.get(sku='H-2').product_attributes.values_list(
+            'attribute_value__value', flat=True))
+
+    def test_fingerprint_ignores_attribute_order_and_repeats(self):
+        first = product_record('F-1', attributes=[('Color', 'red'), ('Size', 'L')])
+        second = product_record('F-1', attributes=[('Size', 'L'), ('Color', 'red'), ('Size', 'L')])
+        self.assertEqual(utils.product_record_fingerprint(first), utils.product_record_fingerprint(second))
+        self.assertNotEqual(utils.product_record_fingerprint(first),
+                            utils.product_record_fingerprint(product_record('F-1', description='new')))
+
+class ProductCopyWriterTests(TestCase):
+    """Быстрая загрузка через промежуточную таблицу (в SQLite - executemany)"""
+
+    def write(self, records, **kwargs):
+        writer = utils.ProductCopyWriter(**kwargs)
+        for number, record in enumerate(records, start=1):
+            writer.add(number, record)
+        return writer.close()
+
+    def test_staging_merge_creates_and_updates(self):
+        Category.objects.create(name='Existing', slug='existing')
+        self.write([product_record('M-1', category='Existing')])
+
+        results = self.write([
+            product_record('M-1', price='15.00', description='', category='Existing',
+                           attributes=[('Color', 'red')]),
+            product_record('M-2', category='New', attributes=[('Color', 'red'), ('Size', 'L'), ('Size', 'L')]),
+            product_record('M-3', category='New', is_active='false', featured='1'),
+        ], batch_size=10)
+
+        self.assertEqual((results['created'], results['updated'], results['failed']), (2, 1, 0))
+        first = Product.objects.get(sku='M-1')
+        self.assertEqual((str(first.price), first.description, first.category.name), ('15.00', '', 'Existing'))
+        self.assertEqual(Category.objects.filter(name='New').count(), 1)
+        self.assertEqual(Product.objects.get(sku='M-2').category.slug, 'new')
+        self.assertEqual(AttributeValue.objects.filter(attribute__name='Color', value='red').count(), 1)
+        self.assertEqual(sorted(ProductAttribute.objects.filter(product__sku='M-2').values_list(
+            'attribute_value__attribute__name', 'attribute_value__value')), [('Color', 'red'), ('Size', 'L')])
+        third = Product.objects.get(sku='M-3')
+        self.assertEqual((third.is_active, third.featured), (False, True))
+        self.assertEqual(third.content_hash, utils.product_record_fingerprint(product_record(
+            'M-3', category='New', is_active='false', featured='1')))
+
+    def test_rejected_batch_is_retried_row_by_row(self):
+        Product.objects.create(
+            name='Taken', slug='taken', description='', price='1.00', sku='OTHER',
+            category=Category.objects.create(name='Existing', slug='existing')
+        )
+        results = self.write([product_record('M-4'), product_record('M-5', slug='taken')])
+
+        self.assertEqual((results['created'], results['failed']), (1, 1))
+        self.assertIn('записи 2', results['errors'][0])
+
+    def test_fast_delta_import(self):
+        self.write([product_record('M-6'), product_record('M-7')])
+        results = self.write([product_record('M-6'), product_record('M-7', price='1.00')], delta=True)
+        self.assertEqual((results['unchanged'], results['updated']), (1, 1))
+
+API_URL = 'https://supplier.example/api/products'
+
+def api_products(count):
+    return [{'sku': f'A-{i}', 'name': f'Товар {i}', 'price': 10 + i, 'category': 'API'} for i in range(count)]
+
+class FakeResponse:
+    """Ответ requests: только то, что читают загрузчик страниц API и скрапер (HTML - строкой в payload)"""
+
+    def __init__(self, url, payload=None, status_code=200, headers=None, links=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.links = links or {}
+        self._payload = payload
+
+    @property
+    def text(self):
+        return self._payload
+
+    @property
+    def content(self):
+        return self._payload.encode('utf-8')
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f'{self.status_code} Server Error', response=self)
+
+class FakeSession:
+    """Сессия requests: отвечает через handler(url, params, headers) и запоминает запросы"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, headers=None, json=None, timeout=None):
+        with self._lock:
+            self.requests.append((url, dict(params or {}), dict(headers or {})))
+        return self.handler(url, params or {}, headers or {})
+
+    def get(self, url, headers=None, timeout=None):
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+class APIPaginationTests(SimpleTestCase):
+    """Загрузка всех страниц API: по номерам параллельно, по ссылкам - последовательно"""
+
+    def fetch_all(self, handler, pagination, concurrency=3):
+        session = FakeSession(handler)
+        with mock.patch('apps.products.utils.get_http_session', return_value=session):
+            fetcher = utils.APIPageFetcher(API_URL, concurrency=concurrency)
+            skus = [item['sku'] for item in utils.iter_api_products(fetcher, pagination)]
+        return skus, session
+
+    def test_offset_pages_keep_order(self):
+        products = api_products(23)
+
+        def handler(url, params, headers):
+            offset, limit = params['offset'], params['limit']
+            # Первые страницы отвечают дольше последних - порядок не должен зависеть от этого
+            time.sleep(0.01 * (4 - offset // 5))
+            return FakeResponse(url, {'items': products[offset:offset + limit], 'total': len(products)})
+
+        skus, session = self.fetch_all(handler, {'type': 'offset', 'page_size': 5})
+
+        self.assertEqual(skus, [product['sku'] for product in products])
+        self.assertEqual(sorted(params['offset'] for _, params, _ in session.requests), [0, 5, 10, 15, 20])
+
+    def test_offsets_follow_size_capped_by_server(self):
+        products = api_products(10)
+
+        def handler(url, params, headers):
+            offset, limit = params['offset'], min(params['limit'], 4)
+            return FakeResponse(url, {'items': products[offset:offset + limit], 'meta': {'total': 10}})
+
+        skus, session = self.fetch_all(handler, {'type': 'offset', 'page_size': 5})
+
+        self.assertEqual(skus, [product['sku'] for product in products])
+        self.assertEqual(sorted(params['offset'] for _, params, _ in session.requests), [0, 4, 8])
+
+    def test_page_numbers_without_total_stop_at_partial_page(self):
+        products = api_products(12)
+
+        def handler(url, params, headers):
+            start = (params['page'] - 1) * params['per_page']
+            return FakeResponse(url, products[start:start + params['per_page']])
+
+        skus, session = self.fetch_all(handler, {'type': 'page', 'page_size': 5}, concurrency=1)
+
+        self.assertEqual(skus, [product['sku'] for product in products])
+        self.assertEqual([params['page'] for _, params, _ in session.requests], [1, 2, 3])
+
+    def test_next_links_from_body_and_link_header(self):
+        products = api_products(6)
+        second, third = f'{API_URL}?page=2', f'{API_URL}?page=3'
+        responses = {
+            API_URL: lambda url: FakeResponse(url, {'results': products[:2], 'next': 'products?page=2'}),
+            second: lambda url: FakeResponse(url, {'results': products[2:4]}, links={'next': {'url': third}}),
+            third: lambda url: FakeResponse(url, {'results': products[4:]}),
+        }
+
+        skus, session = self.fetch_all(lambda url, params, headers: responses[url](url), {'type': 'auto'})
+
+        self.assertEqual(skus, [product['sku'] for product in products])
+        self.assertEqual([url for url, _, _ in session.requests], [API_URL, second, third])
+
+    def test_cursor_pagination_stops_on_repeated_cursor(self):
+        products = api_products(6)
+        pages = {None: (products[:2], 'c2'), 'c2': (products[2:4], 'c3'), 'c3': (products[4:], 'c2')}
+
+        def handler(url, params, headers):
+            items, cursor = pages[params.get('cursor')]
+            return FakeResponse(url, {'data': items, 'meta': {'next_cursor': cursor}})
+
+        skus, session = self.fetch_all(handler, {'type': 'auto'})
+
+        self.assertEqual(skus, [product['sku'] for product in products])
+        self.assertEqual([params.get('cursor') for _, params, _ in session.requests], [None, 'c2', 'c3'])
+
+class APIConditionalRequestTests(FakeRedisMixin, TestCase):
+    """Условные запросы импорта из API: 304 и сохранение валидаторов только после успеха"""
+
+    def setUp(self):
+        super().setUp()
+        self.products = api_products(5)
+        self.second = f'{API_URL}?page=2'
+        self.pages = {
+            API_URL: {'items': self.products[:3], 'next': self.second},
+            self.second: {'items': self.products[3:]},
+        }
+        self.versions = {API_URL: 1, self.second: 1}
+        self.failing = set()
+        self.session = FakeSession(self.serve)
+
+    def serve(self, url, params, headers):
+        if url in self.failing:
+            return FakeResponse(url, status_code=500)
+        etag = f'"v{self.versions[url]}"'
+        if headers.get('If-None-Match') == etag:
+            return FakeResponse(url, status_code=304, headers={'ETag': etag})
+        return FakeResponse(url, self.pages[url], headers={'ETag': etag})
+
+    def import_products(self, **kwargs):
+        self.session.requests.clear()
+        with mock.patch('apps.products.utils.get_http_session', return_value=self.session):
+            return utils.import_products_from_api(API_URL, api_key='secret', pagination={'type': 'link'}, **kwargs)
+
+    def sent_validators(self):
+        return [headers.get('If-None-Match') for _, _, headers in self.session.requests]
+
+    def cache_keys(self):
+        return [key for key in self.redis.data if key.startswith('api_cache:')]
+
+    def test_unchanged_pages_are_not_reimported(self):
+        first = self.import_products()
+        self.assertEqual((first['created'], first['not_modified']), (5, False))
+        self.assertEqual(len(self.cache_keys()), 2)
+
+        second = self.import_products()
+
+        self.assertTrue(second['not_modified'])
+        self.assertEqual((second['created'], second['updated'], second['unchanged']), (0, 0, 0))
+        # Ссылка на вторую страницу взята из кеша: ответ 304 пришел без тела
+        self.assertEqual([url for url, _, _ in self.session.requests], [API_URL, self.second])
+        self.assertEqual(self.sent_validators(), ['"v1"', '"v1"'])
+        self.assertTrue(all(headers['Authorization'] == 'Bearer secret' for _, _, headers in self.session.requests))
+
+    def test_changed_page_is_reloaded(self):
+        self.import_products()
+        self.pages[self.second]['items'][0]['price'] = 99
+        self.versions[self.second] = 2
+
+        results = self.import_products()
+
+        self.assertFalse(results['not_modified'])
+        self.assertEqual((results['created'], results['updated']), (0, 2))
+        self.assertEqual(str(Product.objects.get(sku='A-3').price), '99.00')
+        self.assertEqual(self.sent_validators(), ['"v1"', '"v1"'])
+
+    def test_cache_is_saved_only_after_success(self):
+        self.failing.add(self.second)
+        with self.assertRaises(ValidationError):
+            self.import_products()
+        self.assertEqual(self.cache_keys(), [])
+
+        self.failing.clear()
+        results = self.import_products()
+
+        # Первая страница загружена заново, а не пропущена по валидатору неудачного импорта
+        self.assertEqual(self.sent_validators(), [None, None])
+        self.assertFalse(results['not_modified'])
+        self.assertEqual(Product.objects.filter(sku__startswith='A-').count(), 5)
+        self.assertEqual(len(self.cache_keys()), 2)
+
+    def test_without_cache_requests_are_unconditional(self):
+        self.import_products()
+        results = self.import_products(use_cache=False)
+
+        self.assertEqual(self.sent_validators(), [None, None])
+        self.assertEqual((results['updated'], results['not_modified']), (5, False))
+        self.assertTrue(self.import_products()['not_modified'])
+
+SHOP_URL = 'https://shop.example/catalog'
+
+LISTING_HTML = '''<html><body>
+<div class="product"><h2 class="name">Kettle</h2><span class="price">1 299.00 ₽</span>
+    <a class="more" href="/items/kettle">Подробнее</a></div>
+<div class="product"><h2 class="name">Toaster</h2><span class="price">2 500 ₽</span><span class="sku">T-1</span>
+    <a class="more" href="/items/toaster">Подробнее</a></div>
+</body></html>'''
+
+DETAILS_HTML = '''<html><body><div class="text">{description}</div>
+<ul><li class="attr"><b>Цвет</b><i>белый</i></li><li class="attr"><b>Гарантия</b></li></ul>
+</body></html>'''
+
+SCRAPE_CONFIG = {
+    'render_mode': 'auto',
+    'product_selector': '.product',
+    'name_selector': '.name',
+    'price_selector': '.price',
+    'sku_selector': '.sku',
+    'delay_between_pages': 0,
+    'details_page': {
+        'link_selector': 'a.more',
+        'detailed_description_selector': '.text',
+        'attributes_selector': 'li.attr',
+        'attribute_name_selector': 'b',
+        'attribute_value_selector': 'i',
+    },
+}
+
+class ScrapingSiteMixin(FakeRedisMixin):
+    """Сайт из словаря {URL: HTML} за подмененной сессией; браузер запускать нельзя"""
+
+    def setUp(self):
+        super().setUp()
+        self.site = {
+            SHOP_URL: LISTING_HTML,
+            'https://shop.example/items/kettle': DETAILS_HTML.format(description='Описание чайника'),
+            'https://shop.example/items/toaster': DETAILS_HTML.format(description='Описание тостера'),
+        }
+        self.session = FakeSession(self.serve)
+        for target, value in (
+            ('apps.products.utils.get_http_session', mock.Mock(return_value=self.session)),
+            ('apps.products.utils.SCRAPE_HOST_DELAY', 0),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        browser = mock.patch('apps.products.utils.BrowserPageScraper')
+        self.browser_scraper = browser.start()
+        self.addCleanup(browser.stop)
+
+    def serve(self, url, params, headers):
+        if url not in self.site:
+            return FakeResponse(url, '', status_code=404)
+        return FakeResponse(url, self.site[url])
+
+    def scrape(self, config=SCRAPE_CONFIG, **kwargs):
+        self.session.requests.clear()
+        return utils.import_products_via_scraping(SHOP_URL, config, **kwargs)
+
+    def requested_urls(self):
+        return sorted(url for url, _, _ in self.session.requests)
+
+class StaticScrapingTests(ScrapingSiteMixin, TestCase):
+    """Скрапинг статического HTML через BeautifulSoup и запуск браузера только при необходимости"""
+
+    def test_static_html_is_parsed_without_browser(self):
+        results = self.scrape()
+
+        self.browser_scraper.assert_not_called()
+        self.assertEqual((results['created'], results['failed']), (2, 0))
+        toaster = Product.objects.get(sku='T-1')
+        self.assertEqual((toaster.name, str(toaster.price), toaster.description),
+                         ('Toaster', '2500.00', 'Описание тостера'))
+        kettle = Product.objects.get(name='Kettle')
+        self.assertEqual(str(kettle.price), '1299.00')
+        # Атрибут без значения пропускается
+        self.assertEqual(list(kettle.product_attributes.values_list(
+            'attribute_value__attribute__name', 'attribute_value__value')), [('Цвет', 'белый')])
+
+    def test_browser_is_used_when_static_html_has_no_products(self):
+        self.site[SHOP_URL] = '<html><body><div id="app"></div><script src="/app.js"></script></body></html>'
+
+        scraper = utils.open_scraper(SHOP_URL, SCRAPE_CONFIG)
+
+        self.assertIs(scraper, self.browser_scraper.return_value)
+        scraper.open.assert_called_once_with(SHOP_URL)
+
+    def test_browser_is_used_when_page_is_not_served(self):
+        del self.site[SHOP_URL]
+        self.assertIs(utils.open_scraper(SHOP_URL, SCRAPE_CONFIG), self.browser_scraper.return_value)
+
+    def test_static_mode_never_starts_browser(self):
+        self.site[SHOP_URL] = '<html><body></body></html>'
+
+        scraper = utils.open_scraper(SHOP_URL, {**SCRAPE_CONFIG, 'render_mode': 'static'})
+
+        self.assertIsInstance(scraper, utils.StaticPageScraper)
+        self.assertEqual(scraper.extract_products(), [])
+        self.browser_scraper.assert_not_called()
+
+    def test_javascript_next_button_needs_browser(self):
+        self.site[SHOP_URL] = LISTING_HTML.replace(
+            '</body>', '<button class="next" onclick="loadMore()">Дальше</button></body>')
+        config = {**SCRAPE_CONFIG, 'pagination': {'type': 'next_button', 'next_button_selector': '.next'}}
+
+        self.assertIs(utils.open_scraper(SHOP_URL, config), self.browser_scraper.return_value)
+
+    def test_generated_sku_is_md5_of_name_and_price(self):
+        record = utils._parse_scraped_product({'name': 'Kettle', 'price': '1 299.00 ₽', 'page': 1}, {})
+
+        digest = hashlib.md5('Kettle1299.0'.encode('utf-8')).hexdigest()[:16]
+        self.assertEqual(record['sku'], f'SCRAPE-{digest}')
+        # Тот же товар с другим форматом цены получает тот же артикул
+        self.assertEqual(utils._parse_scraped_product({'name': 'Kettle', 'price': '1299 ₽'}, {})['sku'],
+                         record['sku'])
+        self.assertNotEqual(utils._parse_scraped_product({'name': 'Kettle', 'price': '1300'}, {})['sku'],
+                            record['sku'])
+
+class HostThrottleTests(SimpleTestCase):
+    """Ограничения вежливости для детальных страниц: одновременные запросы и интервал для каждого хоста"""
+
+    def test_concurrent_requests_are_limited_per_host(self):
+        throttle = utils.HostThrottle(max_concurrent=2, min_interval=0)
+        first, other = 'https://shop.example/items/1', 'https://other.example/items/1'
+        throttle.acquire(first)
+        throttle.acquire(first)
+
+        waiting = threading.Thread(target=throttle.acquire, args=(first,))
+        waiting.start()
+        waiting.join(0.05)
+        self.assertTrue(waiting.is_alive())
+
+        # Другой хост не ждет, пока освободится первый
+        throttle.acquire(other)
+        throttle.release(other)
+
+        throttle.release(first)
+        waiting.join(1)
+        self.assertFalse(waiting.is_alive())
+
+    def test_requests_to_host_start_min_interval_apart(self):
+        throttle = utils.HostThrottle(max_concurrent=4, min_interval=0.05)
+        starts = []
+        for number in range(3):
+            throttle.acquire(f'https://shop.example/items/{number}')
+            starts.append(time.monotonic())
+        throttle.acquire('https://other.example/items/1')
+
+        self.assertTrue(all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:])))
+        self.assertLess(time.monotonic() - starts[-1], 0.045)
+
+class PageStateDriver:
+    """WebDriver, у которого есть только состояние страницы для wait_for_page"""
+
+    def __init__(self, states):
+        self.states = iter(states)
+        self.state = None
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        self.state = next(self.states, self.state)
+        return list(self.state)
+
+class WaitForPageTests(SimpleTestCase):
+    """Ожидание страницы по ее состоянию вместо фиксированных пауз"""
+
+    def test_waits_until_elements_appear_and_page_settles(self):
+        driver = PageStateDriver([('loading', 0, 0), ('complete', 2, 0), ('complete', 3, 2), ('complete', 4, 2)])
+
+        started = time.monotonic()
+        self.assertTrue(utils.wait_for_page(driver, '.product', timeout=2))
+
+        elapsed = time.monotonic() - started
+        self.assertGreaterEqual(elapsed, utils.SCRAPE_DOM_QUIET_PERIOD)
+        self.assertLess(elapsed, 1)
+
+    def test_gives_up_when_elements_never_appear(self):
+        driver = PageStateDriver([('complete', 2, 0)])
+        self.assertFalse(utils.wait_for_page(driver, '.product', timeout=0.5))
+
+    def test_gives_up_while_resources_keep_loading(self):
+        driver = PageStateDriver(('complete', resources, 2) for resources in itertools.count())
+        self.assertFalse(utils.wait_for_page(driver, timeout=0.5))
+        self.assertGreater(driver.calls, 3)
+
+class BrowserExtractionTests(SimpleTestCase):
+    """Извлечение товаров в браузере: один execute_script на страницу, браузеры из пула"""
+
+    def setUp(self):
+        super().setUp()
+        self.pool = mock.Mock(max_size=1)
+        self.details = {'description': None, 'attributes': [['Цвет', 'белый']]}
+        self.pool.acquire.side_effect = self.make_browser
+        for target, value in (
+            ('apps.products.utils.browser_pool', self.pool),
+            ('apps.products.utils.wait_for_page', mock.Mock(return_value=True)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_browser(self):
+        browser = mock.Mock()
+        browser.driver.execute_script.side_effect = self.execute_script
+        browser.driver.window_handles = ['list', 'details']
+        browser.driver.current_window_handle = 'list'
+        return browser
+
+    def execute_script(self, script, *args):
+        if script == utils.EXTRACT_DETAILS_SCRIPT:
+            return self.details
+        if script == utils.EXTRACT_PRODUCTS_SCRIPT:
+            return [{'name': 'Kettle', 'price': '10', 'sku': None, 'link': 'https://shop.example/items/kettle'}]
+        return None
+
+    def test_products_are_extracted_with_one_script_call(self):
+        scraper = utils.BrowserPageScraper(SCRAPE_CONFIG)
+
+        products = scraper.extract_products()
+
+        self.assertEqual(products[0]['name'], 'Kettle')
+        scraper.driver.execute_script.assert_called_once_with(
+            utils.EXTRACT_PRODUCTS_SCRIPT, '.product',
+            {'name': '.name', 'price': '.price', 'sku': '.sku'}, 'a.more'
+        )
+
+    def test_details_in_tab_of_listing_browser(self):
+        scraper = utils.BrowserPageScraper(SCRAPE_CONFIG)
+        self.assertEqual(scraper.detail_workers, 1)
+
+        details = scraper.extract_details('https://shop.example/items/kettle')
+
+        self.assertEqual(details, {'attributes': [('Цвет', 'белый')]})
+        scraper.browser.get.assert_called_once_with('https://shop.example/items/kettle')
+        scraper.driver.close.assert_called_once_with()
+        scraper.driver.switch_to.window.assert_called_with('list')
+        self.assertEqual(self.pool.acquire.call_count, 1)
+
+    def test_details_in_other_pool_browsers(self):
+        self.pool.max_size = 3
+        self.details = {'description': 'Описание', 'attributes': []}
+        scraper = utils.BrowserPageScraper(SCRAPE_CONFIG)
+
+        details = scraper.extract_details('https://shop.example/items/kettle')
+
+        self.assertEqual(details, {'description': 'Описание', 'attributes': []})
+        detail_browser = self.pool.release.call_args.args[0]
+        self.assertIsNot(detail_browser, scraper.browser)
+        self.pool.release.assert_called_once_with(detail_browser, discard=False)
+
+    def test_broken_detail_browser_is_discarded(self):
+        self.pool.max_size = 3
+        scraper = utils.BrowserPageScraper(SCRAPE_CONFIG)
+        detail_browser = self.make_browser()
+        detail_browser.get.side_effect = WebDriverException('chrome not reachable')
+        self.pool.acquire.side_effect = [detail_browser]
+
+        with self.assertRaises(WebDriverException):
+            scraper.extract_details('https://shop.example/items/kettle')
+        self.pool.release.assert_called_once_with(detail_browser, discard=True)
+
+class ScrapeCacheTests(ScrapingSiteMixin, TestCase):
+    """Кеш скрапинга: неизменившиеся страницы пропускаются, детальные страницы обновляются после details_ttl"""
+
+    def setUp(self):
+        super().setUp()
+        self.scrape()
+
+    def page_keys(self):
+        return [key for key in self.redis.data if key.startswith('scrape_cache:page:')]
+
+    def test_unchanged_listing_is_skipped(self):
+        results = self.scrape()
+
+        self.assertTrue(results['not_modified'])
+        self.assertEqual((results['pages_unchanged'], results['created'], results['updated']), (1, 0, 0))
+        self.assertEqual(self.requested_urls(), [SHOP_URL])
+
+    def test_details_come_from_cache_when_listing_changes(self):
+        self.site[SHOP_URL] = LISTING_HTML.replace('2 500 ₽', '2 700 ₽')
+
+        results = self.scrape()
+
+        self.assertEqual((results['not_modified'], results['updated'], results['unchanged']), (False, 1, 1))
+        self.assertEqual(str(Product.objects.get(sku='T-1').price), '2700.00')
+        self.assertEqual(self.requested_urls(), [SHOP_URL])
+
+    def test_details_are_refetched_after_details_ttl(self):
+        self.site['https://shop.example/items/toaster'] = DETAILS_HTML.format(description='Новое описание')
+        (key,) = self.page_keys()
+        self.redis.hset(key, 'details_checked_at', time.time() - utils.SCRAPE_DETAILS_CACHE_TTL - 1)
+
+        results = self.scrape()
+
+        self.assertFalse(results['not_modified'])
+        self.assertEqual(results['updated'], 1)
+        self.assertEqual(Product.objects.get(sku='T-1').description, 'Новое описание')
+        self.assertEqual(self.requested_urls(), [
+            SHOP_URL, 'https://shop.example/items/kettle', 'https://shop.example/items/toaster',
+        ])
+        # Время проверки обновлено: следующий импорт снова пропускает страницу
+        self.assertTrue(self.scrape()['not_modified'])
+
+    def test_failed_details_page_is_not_cached(self):
+        self.site[SHOP_URL] = LISTING_HTML.replace('2 500 ₽', '2 700 ₽')
+        del self.site['https://shop.example/items/toaster']
+        self.redis.data.clear()
+
+        results = self.scrape()
+
+        self.assertEqual(len(results['errors']), 1)
+        self.assertEqual(self.page_keys(), [])
+        self.assertFalse(self.scrape()['not_modified'])
+
+    def test_without_cache_everything_is_reloaded(self):
+        results = self.scrape(use_cache=False)
+
+        self.assertFalse(results['not_modified'])
+        self.assertEqual(len(self.requested_urls()), 3)
+        self.assertTrue(self.scrape()['not_modified'])
@@ -16,5 +16,8 @@ urlpatterns = [
     path('import/', views.import_products, name='import_products'),
     path('import/api/', views.import_api, name='import_api'),
     path('import/scraping/', views.import_scraping, name='import_scraping'),
+    path('import/scraping/<str:crawl_id>/pause/', views.pause_scraping_crawl, name='pause_scraping_crawl'),
+    path('import/scraping/<str:crawl_id>/resume/', views.resume_scraping_crawl, name='resume_scraping_crawl'),
     path('export/', views.export_products, name='export_products'),
+    path('tasks/<str:task_id>/progress/', views.task_progress, name='task_progress'),
 ] 
\ No newline at end of file
@@ -1,407 +1,2069 @@
+import codecs
 import csv
+import hashlib
+import io
+import itertools
 import json
+import math
+import re
+import shutil
+import textwrap
 import xml.etree.ElementTree as ET
+from decimal import Decimal, InvalidOperation
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction, IntegrityError, DataError
+from django.db.models import Prefetch, Min, Max, Count
+from django.utils import timezone
 from django.utils.text import slugify
 import yaml
-import requests
+import redis
 from requests.exceptions import RequestException
 import time
 import logging
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from bs4 import BeautifulSoup
-from .models import Product, Category, Attribute, AttributeValue, ProductAttribute
+from apps.core.utils.browser_pool import browser_pool, BrowserPoolError
+from apps.core.utils.crawl_frontier import CrawlFrontier, normalize_url
+from apps.core.utils.http_session import get_http_session, http_session_manager
+from apps.core.utils.redis_connection import get_redis_client
+from .models import Product, ProductImage, Category, Attribute, AttributeValue, ProductAttribute
 
 logger = logging.getLogger(__name__)
 
-def export_products_to_csv(products, filename):
+# Размер порции, которой экспорт читает товары серверным курсором
+EXPORT_CHUNK_SIZE = getattr(settings, 'PRODUCT_EXPORT_CHUNK_SIZE', 2000)
+
+# Минимальный объем данных (в символах), отдаваемый в сокет за раз
+EXPORT_STREAM_BUFFER_SIZE = 64 * 1024
+
+CSV_EXPORT_FIELDS = [
+    'id', 'name', 'slug', 'description', 'price', 'stock',
+    'category', 'sku', 'is_active', 'featured'
+]
+
+def _iter_export_products(products, chunk_size=None, with_related=False, on_progress=None):
+    """
+    Итерация по товарам серверным курсором порциями по chunk_size
+
+    При with_related атрибуты (вместе со значениями и их атрибутами) и
+    изображения подгружаются через Prefetch одним запросом на порцию, так что
+    число запросов зависит от количества порций, а не товаров.
+    on_progress, если передан, вызывается с числом выгруженных товаров
+    после каждой порции и в конце.
+
+    Товары выгружаются по возрастанию id, как и при шардированном экспорте
+    (см. export_product_shard), поэтому оба пути дают одинаковый файл.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    products = products.select_related('category').order_by('id')
+    if with_related:
+        products = products.prefetch_related(
+            Prefetch(
+                'product_attributes',
+                queryset=ProductAttribute.objects.select_related('attribute_value__attribute')
+            ),
+            Prefetch('images', queryset=ProductImage.objects.all()),
+        )
+    iterator = products.iterator(chunk_size=chunk_size)
+    if on_progress is None:
+        return iterator
+    return _count_exported(iterator, chunk_size, on_progress)
+
+def _count_exported(products, chunk_size, on_progress):
+    count = 0
+    for product in products:
+        yield product
+        count += 1
+        if count % chunk_size == 0:
+            on_progress(count)
+    on_progress(count)
+
+def _product_csv_row(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'price': product.price,
+        'stock': product.stock,
+        'category': product.category.name,
+        'sku': product.sku,
+        'is_active': product.is_active,
+        'featured': product.featured
+    }
+
+def export_products_to_csv(products, filename, on_progress=None):
     """Экспорт товаров в CSV формат"""
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'id', 'name', 'slug', 'description', 'price', 'stock', 
-            'category', 'sku', 'is_active', 'featured'
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_EXPORT_FIELDS)
         writer.writeheader()
         
-        for product in products:
-            writer.writerow({
-                'id': product.id,
-                'name': product.name,
-                'slug': product.slug,
-                'description': product.description,
-                'price': product.price,
-                'stock': product.stock,
-                'category': product.category.name,
-                'sku': product.sku,
-                'is_active': product.is_active,
-                'featured': product.featured
-            })
+        for product in _iter_export_products(products, on_progress=on_progress):
+            writer.writerow(_product_csv_row(product))
     return filename
 
-def export_products_to_json(products, filename):
-    """Экспорт товаров в JSON формат"""
-    products_data = []
+class _EchoBuffer:
+    """Псевдо-файл для csv.writer: возвращает записанную строку вместо буферизации"""
+    def write(self, value):
+        return value
+
+def _csv_header():
+    return csv.DictWriter(_EchoBuffer(), fieldnames=CSV_EXPORT_FIELDS).writeheader()
+
+def _iter_csv_body(products, chunk_size=None, on_progress=None):
+    """Строки CSV без заголовка"""
+    writer = csv.DictWriter(_EchoBuffer(), fieldnames=CSV_EXPORT_FIELDS)
+    for product in _iter_export_products(products, chunk_size, on_progress=on_progress):
+        yield writer.writerow(_product_csv_row(product))
+
+def _buffered(pieces, buffer_size=EXPORT_STREAM_BUFFER_SIZE):
+    """Склеивает мелкие фрагменты вывода, чтобы не писать в сокет по строке"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def iter_products_csv(products, chunk_size=None):
+    """
+    Потоковый экспорт товаров в CSV для StreamingHttpResponse
+
+    Товары читаются серверным курсором порциями по chunk_size, строки CSV
+    отдаются по мере формирования, поэтому время до первого байта и память
+    на запрос не зависят от размера каталога.
+
+    Args:
+        products (QuerySet): Товары для экспорта
+        chunk_size (int, optional): Размер порции чтения из БД
+
+    Yields:
+        str: Фрагменты CSV-документа
+    """
+    return _buffered(itertools.chain([_csv_header()], _iter_csv_body(products, chunk_size)))
+
+def _product_export_dict(product):
+    """Полное представление товара для JSON экспорта"""
+    attributes = []
+    for attr in product.product_attributes.all():
+        attributes.append({
+            'name': attr.attribute_value.attribute.name,
+            'value': attr.attribute_value.value
+        })
     
-    for product in products:
-        attributes = []
-        for attr in product.product_attributes.all():
-            attributes.append({
-                'name': attr.attribute_value.attribute.name,
-                'value': attr.attribute_value.value
-            })
-        
-        images = []
-        for img in product.images.all():
-            images.append({
-                'url': img.image.url if img.image else '',
-                'alt_text': img.alt_text,
-                'is_featured': img.is_featured
-            })
-        
-        product_data = {
-            'id': product.id,
-            'name': product.name,
-            'slug': product.slug,
-            'description': product.description,
-            'price': float(product.price),
-            'stock': product.stock,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-                'slug': product.category.slug
-            },
-            'sku': product.sku,
-            'is_active': product.is_active,
-            'featured': product.featured,
-            'attributes': attributes,
-            'images': images
-        }
-        products_data.append(product_data)
+    images = []
+    for img in product.images.all():
+        images.append({
+            'url': img.image.url if img.image else '',
+            'alt_text': img.alt_text,
+            'is_featured': img.is_featured
+        })
     
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'price': float(product.price),
+        'stock': product.stock,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+            'slug': product.category.slug
+        },
+        'sku': product.sku,
+        'is_active': product.is_active,
+        'featured': product.featured,
+        'attributes': attributes,
+        'images': images
+    }
+
+def iter_products_json(products, chunk_size=None, on_progress=None):
+    """
+    Потоковый экспорт товаров в JSON-массив
+
+    Товары читаются порциями с предзагрузкой связей, каждый элемент массива
+    сериализуется отдельно. Результат совпадает с json.dump(..., indent=4)
+    для всего списка, но в памяти находится только текущая порция.
+
+    Args:
+        products (QuerySet): Товары для экспорта
+        chunk_size (int, optional): Размер порции чтения из БД
+        on_progress (callable, optional): Получает число выгруженных товаров
+
+    Yields:
+        str: Фрагменты JSON-документа
+    """
+    def pieces():
+        separator = '[\n'
+        for item in _iter_json_items(products, chunk_size, on_progress):
+            yield separator + item
+            separator = ',\n'
+        yield '[]' if separator == '[\n' else '\n]'
+
+    return _buffered(pieces())
+
+def _iter_json_items(products, chunk_size=None, on_progress=None):
+    """Элементы JSON-массива с отступом, без разделителей и скобок"""
+    for product in _iter_export_products(products, chunk_size, with_related=True, on_progress=on_progress):
+        item = json.dumps(_product_export_dict(product), ensure_ascii=False, indent=4)
+        yield textwrap.indent(item, '    ')
+
+def export_products_to_json(products, filename, on_progress=None):
+    """Экспорт товаров в JSON формат"""
     with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(products_data, f, ensure_ascii=False, indent=4)
+        for piece in iter_products_json(products, on_progress=on_progress):
+            f.write(piece)
     
     return filename
 
-def export_products_to_xml(products, filename):
-    """Экспорт товаров в XML формат"""
-    root = ET.Element('products')
+def _iter_ndjson_body(products, chunk_size=None, on_progress=None):
+    """Строки NDJSON: по одному товару в формате JSON экспорта на строку"""
+    for product in _iter_export_products(products, chunk_size, with_related=True, on_progress=on_progress):
+        yield json.dumps(_product_export_dict(product), ensure_ascii=False) + '\n'
+
+def iter_products_ndjson(products, chunk_size=None, on_progress=None):
+    """
+    Потоковый экспорт товаров в NDJSON (JSON Lines)
+
+    Yields:
+        str: Фрагменты файла, по строке на товар
+    """
+    return _buffered(_iter_ndjson_body(products, chunk_size, on_progress))
+
+def export_products_to_ndjson(products, filename, on_progress=None):
+    """Экспорт товаров в NDJSON формат"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        for piece in iter_products_ndjson(products, on_progress=on_progress):
+            f.write(piece)
     
-    for product in products:
-        product_elem = ET.SubElement(root, 'product')
-        ET.SubElement(product_elem, 'id').text = str(product.id)
-        ET.SubElement(product_elem, 'name').text = product.name
-        ET.SubElement(product_elem, 'slug').text = product.slug
-        ET.SubElement(product_elem, 'description').text = product.description
-        ET.SubElement(product_elem, 'price').text = str(product.price)
-        ET.SubElement(product_elem, 'stock').text = str(product.stock)
-        
-        category = ET.SubElement(product_elem, 'category')
-        ET.SubElement(category, 'id').text = str(product.category.id)
-        ET.SubElement(category, 'name').text = product.category.name
-        ET.SubElement(category, 'slug').text = product.category.slug
-        
-        ET.SubElement(product_elem, 'sku').text = product.sku
-        ET.SubElement(product_elem, 'is_active').text = str(product.is_active)
-        ET.SubElement(product_elem, 'featured').text = str(product.featured)
-        
-        # Атрибуты
-        attributes_elem = ET.SubElement(product_elem, 'attributes')
-        for attr in product.product_attributes.all():
-            attr_elem = ET.SubElement(attributes_elem, 'attribute')
-            ET.SubElement(attr_elem, 'name').text = attr.attribute_value.attribute.name
-            ET.SubElement(attr_elem, 'value').text = attr.attribute_value.value
-        
-        # Изображения
-        images_elem = ET.SubElement(product_elem, 'images')
-        for img in product.images.all():
-            img_elem = ET.SubElement(images_elem, 'image')
-            ET.SubElement(img_elem, 'url').text = img.image.url if img.image else ''
-            ET.SubElement(img_elem, 'alt_text').text = img.alt_text
-            ET.SubElement(img_elem, 'is_featured').text = str(img.is_featured)
+    return filename
+
+def _product_xml_element(product):
+    """Элемент <product> для XML экспорта"""
+    product_elem = ET.Element('product')
+    ET.SubElement(product_elem, 'id').text = str(product.id)
+    ET.SubElement(product_elem, 'name').text = product.name
+    ET.SubElement(product_elem, 'slug').text = product.slug
+    ET.SubElement(product_elem, 'description').text = product.description
+    ET.SubElement(product_elem, 'price').text = str(product.price)
+    ET.SubElement(product_elem, 'stock').text = str(product.stock)
+    
+    category = ET.SubElement(product_elem, 'category')
+    ET.SubElement(category, 'id').text = str(product.category.id)
+    ET.SubElement(category, 'name').text = product.category.name
+    ET.SubElement(category, 'slug').text = product.category.slug
+    
+    ET.SubElement(product_elem, 'sku').text = product.sku
+    ET.SubElement(product_elem, 'is_active').text = str(product.is_active)
+    ET.SubElement(product_elem, 'featured').text = str(product.featured)
     
-    tree = ET.ElementTree(root)
-    tree.write(filename, encoding='utf-8', xml_declaration=True)
+    # Атрибуты
+    attributes_elem = ET.SubElement(product_elem, 'attributes')
+    for attr in product.product_attributes.all():
+        attr_elem = ET.SubElement(attributes_elem, 'attribute')
+        ET.SubElement(attr_elem, 'name').text = attr.attribute_value.attribute.name
+        ET.SubElement(attr_elem, 'value').text = attr.attribute_value.value
+    
+    # Изображения
+    images_elem = ET.SubElement(product_elem, 'images')
+    for img in product.images.all():
+        img_elem = ET.SubElement(images_elem, 'image')
+        ET.SubElement(img_elem, 'url').text = img.image.url if img.image else ''
+        ET.SubElement(img_elem, 'alt_text').text = img.alt_text
+        ET.SubElement(img_elem, 'is_featured').text = str(img.is_featured)
+    
+    return product_elem
+
+XML_EXPORT_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<products>"
+XML_EXPORT_FOOTER = "</products>"
+
+def iter_products_xml(products, chunk_size=None, on_progress=None):
+    """
+    Потоковый экспорт товаров в XML
+
+    Каждый <product> сериализуется сразу после построения и не копится в
+    общем дереве, поэтому память не растет с размером каталога.
+
+    Args:
+        products (QuerySet): Товары для экспорта
+        chunk_size (int, optional): Размер порции чтения из БД
+        on_progress (callable, optional): Получает число выгруженных товаров
+
+    Yields:
+        str: Фрагменты XML-документа
+    """
+    return _buffered(itertools.chain(
+        [XML_EXPORT_HEADER], _iter_xml_body(products, chunk_size, on_progress), [XML_EXPORT_FOOTER]
+    ))
+
+def _iter_xml_body(products, chunk_size=None, on_progress=None):
+    """Элементы <product> без заголовка документа и корневого элемента"""
+    for product in _iter_export_products(products, chunk_size, with_related=True, on_progress=on_progress):
+        yield ET.tostring(_product_xml_element(product), encoding='unicode')
+
+def export_products_to_xml(products, filename, on_progress=None):
+    """Экспорт товаров в XML формат"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        for piece in iter_products_xml(products, on_progress=on_progress):
+            f.write(piece)
     
     return filename
 
-def import_products_from_csv(file):
-    """Импорт товаров из CSV файла"""
+# Схема колоночного экспорта: типизированные колонки вместо строк CSV
+PARQUET_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('name', pa.string()),
+    ('slug', pa.string()),
+    ('description', pa.string()),
+    ('price', pa.decimal128(10, 2)),
+    ('stock', pa.int64()),
+    ('category', pa.string()),
+    ('category_slug', pa.string()),
+    ('sku', pa.string()),
+    ('is_active', pa.bool_()),
+    ('featured', pa.bool_()),
+    ('attributes', pa.list_(pa.struct([('name', pa.string()), ('value', pa.string())]))),
+])
+
+def _product_parquet_row(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'price': product.price,
+        'stock': product.stock,
+        'category': product.category.name,
+        'category_slug': product.category.slug,
+        'sku': product.sku,
+        'is_active': product.is_active,
+        'featured': product.featured,
+        'attributes': [
+            {'name': attr.attribute_value.attribute.name, 'value': attr.attribute_value.value}
+            for attr in product.product_attributes.all()
+        ],
+    }
+
+def _iter_parquet_row_groups(products, chunk_size=None, on_progress=None):
+    """Таблицы Arrow по chunk_size товаров, каждая пишется отдельной row group"""
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    rows = []
+    for product in _iter_export_products(products, chunk_size, with_related=True, on_progress=on_progress):
+        rows.append(_product_parquet_row(product))
+        if len(rows) >= chunk_size:
+            yield pa.Table.from_pylist(rows, schema=PARQUET_SCHEMA)
+            rows = []
+    if rows:
+        yield pa.Table.from_pylist(rows, schema=PARQUET_SCHEMA)
+
+def export_products_to_parquet(products, filename, chunk_size=None, on_progress=None):
+    """Экспорт товаров в Parquet формат"""
+    with pq.ParquetWriter(filename, PARQUET_SCHEMA, compression='snappy') as writer:
+        for table in _iter_parquet_row_groups(products, chunk_size, on_progress):
+            writer.write_table(table)
+    
+    return filename
+
+class _ChunkSink:
+    """Файлоподобный приемник, из которого можно забирать уже записанные байты"""
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_products_parquet(products, chunk_size=None):
+    """
+    Потоковый экспорт товаров в Parquet для StreamingHttpResponse
+
+    Каждая порция товаров записывается отдельной row group и сразу
+    отдается клиенту; метаданные файла уходят последним фрагментом.
+
+    Yields:
+        bytes: Фрагменты Parquet-файла
+    """
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, PARQUET_SCHEMA, compression='snappy') as writer:
+        for table in _iter_parquet_row_groups(products, chunk_size):
+            writer.write_table(table)
+            yield sink.drain()
+    yield sink.drain()
+
+# ----- Шардированный экспорт -----
+
+def split_id_ranges(products, shard_size):
+    """
+    Делит товары на полуинтервалы первичных ключей [start, end)
+
+    Интервалы одинаковой ширины, их количество рассчитано так, чтобы в
+    среднем на интервал приходилось около shard_size товаров.
+
+    Returns:
+        list: Пары (start, end) по возрастанию
+    """
+    stats = products.aggregate(min_id=Min('id'), max_id=Max('id'), count=Count('id'))
+    if not stats['count']:
+        return []
+
+    shards = max(1, math.ceil(stats['count'] / shard_size))
+    width = max(1, math.ceil((stats['max_id'] - stats['min_id'] + 1) / shards))
+    end_id = stats['max_id'] + 1
+    return [
+        (start, min(start + width, end_id))
+        for start in range(stats['min_id'], end_id, width)
+    ]
+
+def export_products_part(products, file_format, filename, chunk_size=None, on_progress=None):
+    """
+    Пишет одну часть шардированного экспорта
+
+    Для текстовых форматов часть содержит только тело документа (строки
+    CSV/NDJSON, элементы JSON-массива, элементы <product>); заголовок и
+    обрамление добавляет concatenate_export_parts. Часть Parquet является
+    самостоятельным файлом.
+
+    Returns:
+        str: Путь к файлу части
+    """
+    if file_format == 'parquet':
+        return export_products_to_parquet(products, filename, chunk_size, on_progress)
+
+    if file_format == 'csv':
+        pieces = _iter_csv_body(products, chunk_size, on_progress)
+    elif file_format == 'ndjson':
+        pieces = _iter_ndjson_body(products, chunk_size, on_progress)
+    elif file_format == 'json':
+        pieces = _join_pieces(_iter_json_items(products, chunk_size, on_progress), ',\n')
+    elif file_format == 'xml':
+        pieces = _iter_xml_body(products, chunk_size, on_progress)
+    else:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        for piece in _buffered(pieces):
+            f.write(piece)
+
+    return filename
+
+def _join_pieces(pieces, separator):
+    first = True
+    for piece in pieces:
+        yield piece if first else separator + piece
+        first = False
+
+def concatenate_export_parts(part_paths, file_format, filename):
+    """
+    Собирает итоговый файл экспорта из частей export_products_part
+
+    CSV и NDJSON склеиваются побайтно (CSV с одним общим заголовком),
+    JSON и XML дополнительно оборачиваются в скобки массива/корневой
+    элемент, для Parquet копируются row group каждой части.
+
+    Returns:
+        str: Путь к итоговому файлу
+    """
+    if file_format == 'parquet':
+        with pq.ParquetWriter(filename, PARQUET_SCHEMA, compression='snappy') as writer:
+            for path in part_paths:
+                part = pq.ParquetFile(path)
+                for index in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(index))
+        return filename
+
+    header, separator, footer = {
+        'csv': (_csv_header(), '', ''),
+        'ndjson': ('', '', ''),
+        'json': ('[\n', ',\n', '\n]'),
+        'xml': (XML_EXPORT_HEADER, '', XML_EXPORT_FOOTER),
+    }[file_format]
+
+    non_empty = [path for path in part_paths if os.path.getsize(path) > 0]
+    if file_format == 'json' and not non_empty:
+        header, footer = '[]', ''
+
+    with open(filename, 'wb') as output:
+        output.write(header.encode('utf-8'))
+        for index, path in enumerate(non_empty):
+            if index:
+                output.write(separator.encode('utf-8'))
+            with open(path, 'rb') as part:
+                shutil.copyfileobj(part, output, 1024 * 1024)
+        output.write(footer.encode('utf-8'))
+
+    return filename
+
+# ----- Батчевая запись товаров -----
+
+# Размер пачки, которой импортеры пишут товары в БД
+IMPORT_BATCH_SIZE = getattr(settings, 'PRODUCT_IMPORT_BATCH_SIZE', 1000)
+
+# Максимальный размер in-memory карт категорий/атрибутов между пачками
+IMPORT_CACHE_LIMIT = 100000
+
+PRODUCT_UPDATE_FIELDS = [
+    'name', 'slug', 'description', 'price', 'stock',
+    'category', 'is_active', 'featured', 'content_hash', 'updated_at'
+]
+
+def _is_blank(value):
+    """Проверяет, что значение отсутствует (None, пустая строка или NaN)"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, float):
+        return value != value
+    return False
+
+def _to_bool(value, default):
+    """Приводит значение из файла импорта к bool"""
+    if _is_blank(value):
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'y', 'да')
+    return bool(value)
+
+def build_product_record(sku, name, price, category, description='', stock=0, slug=None,
+                         category_slug=None, is_active=True, featured=False, attributes=None):
+    """
+    Нормализует данные товара для ProductBulkWriter
+
+    Args:
+        sku: Артикул товара
+        name: Название товара
+        price: Цена (число или строка)
+        category (str): Название категории
+        description (str, optional): Описание
+        stock (int, optional): Количество на складе
+        slug (str, optional): Slug товара, по умолчанию строится из названия
+        category_slug (str, optional): Slug категории для новых категорий
+        is_active (bool, optional): Активен ли товар
+        featured (bool, optional): Рекомендуемый ли товар
+        attributes (iterable, optional): Пары (имя атрибута, значение)
+
+    Returns:
+        dict: Нормализованная запись товара
+
+    Raises:
+        ValueError: Если обязательные поля отсутствуют или некорректны
+    """
+    if _is_blank(sku):
+        raise ValueError("Отсутствует обязательное поле 'sku'")
+    if _is_blank(name):
+        raise ValueError("Отсутствует обязательное поле 'name'")
+    if _is_blank(category):
+        raise ValueError("Отсутствует категория")
+
     try:
-        df = pd.read_csv(file)
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        for _, row in df.iterrows():
-            try:
-                # Получаем или создаем категорию
-                category_name = row['category']
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    defaults={'slug': slugify(category_name)}
+        price = Decimal(str(price).strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Некорректная цена: {price}")
+
+    try:
+        stock = 0 if _is_blank(stock) else int(Decimal(str(stock).strip()))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Некорректное количество: {stock}")
+    if stock < 0:
+        raise ValueError(f"Некорректное количество: {stock}")
+
+    name = str(name).strip()
+    category = str(category).strip()
+
+    return {
+        'sku': str(sku).strip(),
+        'name': name,
+        'slug': slugify(name) if _is_blank(slug) else str(slug).strip(),
+        'description': '' if _is_blank(description) else str(description),
+        'price': price,
+        'stock': stock,
+        'category': category,
+        'category_slug': slugify(category) if _is_blank(category_slug) else str(category_slug).strip(),
+        'is_active': _to_bool(is_active, True),
+        'featured': _to_bool(featured, False),
+        'attributes': [
+            (str(attr_name).strip(), str(attr_value))
+            for attr_name, attr_value in (attributes or [])
+            if not _is_blank(attr_name) and not _is_blank(attr_value)
+        ],
+    }
+
+def product_record_fingerprint(record):
+    """
+    Компактный отпечаток содержимого нормализованной записи товара
+
+    Учитывает все поля, которые импорт записывает в товар, включая
+    атрибуты (без учета порядка и повторов). 128-битный BLAKE2b в hex.
+    """
+    content = [
+        record['name'],
+        record['slug'],
+        record['description'],
+        str(record['price']),
+        record['stock'],
+        record['category'],
+        record['is_active'],
+        record['featured'],
+        sorted(set(record['attributes'])),
+    ]
+    payload = json.dumps(content, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+class ProductBulkWriter:
+    """
+    Батчевая запись товаров в БД
+
+    Копит нормализованные записи (см. build_product_record) и сбрасывает их
+    пачками. Категории, атрибуты и значения атрибутов разрешаются через
+    in-memory карты одним запросом на пачку, товары пишутся одним
+    bulk_create(update_conflicts=True) по sku. Если пачка не проходит
+    ограничения БД, она повторяется построчно, чтобы ошибка попала только
+    в отчет о проблемной строке.
+
+    on_progress, если передан, вызывается со словарем результатов после
+    каждой записанной пачки.
+
+    checkpoint, если передан, получает checkpoint.save(number, results)
+    после каждой зафиксированной пачки: все строки с номером до number
+    включительно уже записаны в БД или учтены как ошибки. Результаты
+    продолжаются с checkpoint.results, если импорт возобновлен.
+
+    Вместе с товаром сохраняется отпечаток его содержимого
+    (product_record_fingerprint). В режиме delta записи, отпечаток которых
+    совпадает с сохраненным, не пишутся и учитываются как unchanged.
+    Отпечаток обновляет только импорт, поэтому изменения, внесенные в обход
+    него, режим delta не заметит: для полной синхронизации нужен обычный
+    импорт.
+    """
+
+    def __init__(self, batch_size=None, row_label='записи', on_progress=None, checkpoint=None,
+                 delta=False):
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        self.row_label = row_label
+        self.on_progress = on_progress
+        self.checkpoint = checkpoint
+        self.delta = delta
+        if checkpoint is not None and checkpoint.results:
+            self.results = checkpoint.results
+        else:
+            self.results = {
+                'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'total': 0, 'errors': []
+            }
+        self._last_number = None
+        self._batch = {}
+        self._categories = {}
+        self._attributes = {}
+        self._attribute_values = {}
+
+    def add(self, number, record):
+        """Добавляет запись в текущую пачку, сбрасывая ее при заполнении"""
+        self.results['total'] += 1
+        record['content_hash'] = product_record_fingerprint(record)
+
+        # Повтор sku внутри пачки: сначала пишем предыдущую версию,
+        # как это делал бы построчный update_or_create
+        if record['sku'] in self._batch:
+            self.flush()
+
+        self._batch[record['sku']] = (number, record)
+        self._last_number = number
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def add_error(self, number, error):
+        """Регистрирует строку, которую не удалось разобрать"""
+        self.results['total'] += 1
+        self._last_number = number
+        self._record_error(number, error)
+
+    def flush(self):
+        """Записывает накопленную пачку в БД"""
+        if not self._batch:
+            return
+
+        batch = list(self._batch.values())
+        self._batch = {}
+
+        existing = None
+        if self.delta:
+            batch, existing = self._skip_unchanged(batch)
+
+        try:
+            with transaction.atomic():
+                created = self._write_batch([record for _, record in batch], existing) if batch else 0
+        except (IntegrityError, DataError) as e:
+            logger.warning(f"Пачка из {len(batch)} товаров отклонена БД ({str(e)}), повторяем построчно")
+            # Объекты, созданные в откаченной транзакции, больше не существуют
+            self._reset_caches()
+            self._write_rows(batch)
+        else:
+            self.results['created'] += created
+            self.results['updated'] += len(batch) - created
+
+            if len(self._attribute_values) > IMPORT_CACHE_LIMIT:
+                self._reset_caches()
+
+        if self.checkpoint is not None:
+            self.checkpoint.save(self._last_number, self.results)
+        self._report_progress()
+
+    def close(self):
+        """Сбрасывает остаток пачки и возвращает результаты импорта"""
+        self.flush()
+        self._report_progress()
+        return self.results
+
+    def _report_progress(self):
+        if self.on_progress:
+            self.on_progress(self.results)
+
+    def _record_error(self, number, error):
+        self.results['failed'] += 1
+        self.results['errors'].append(f"Ошибка в {self.row_label} {number}: {str(error)}")
+
+    def _reset_caches(self):
+        self._categories.clear()
+        self._attributes.clear()
+        self._attribute_values.clear()
+
+    def _skip_unchanged(self, batch):
+        """
+        Отбрасывает записи пачки, содержимое которых не изменилось
+
+        Отпечатки товаров пачки загружаются одним запросом.
+
+        Returns:
+            tuple: (измененные и новые записи, множество уже существующих sku)
+        """
+        stored = dict(
+            Product.objects.filter(sku__in=[record['sku'] for _, record in batch])
+            .values_list('sku', 'content_hash')
+        )
+
+        changed = [
+            (number, record) for number, record in batch
+            if stored.get(record['sku']) != record['content_hash']
+        ]
+        self.results['unchanged'] += len(batch) - len(changed)
+        return changed, set(stored)
+
+    def _write_batch(self, records, existing=None):
+        """Пишет пачку товаров и возвращает количество созданных"""
+        categories = self._resolve_categories(records)
+
+        if existing is None:
+            skus = [record['sku'] for record in records]
+            existing = set(Product.objects.filter(sku__in=skus).values_list('sku', flat=True))
+
+        Product.objects.bulk_create(
+            [
+                Product(
+                    sku=record['sku'],
+                    name=record['name'],
+                    slug=record['slug'],
+                    description=record['description'],
+                    price=record['price'],
+                    stock=record['stock'],
+                    category=categories[record['category']],
+                    is_active=record['is_active'],
+                    featured=record['featured'],
+                    content_hash=record['content_hash'],
                 )
-                
-                # Формируем slug если отсутствует
-                slug = row.get('slug') or slugify(row['name'])
-                
-                # Получаем или создаем товар
-                product, created = Product.objects.update_or_create(
-                    sku=row['sku'],
-                    defaults={
-                        'name': row['name'],
-                        'slug': slug,
-                        'description': row['description'],
-                        'price': row['price'],
-                        'stock': row['stock'],
-                        'category': category,
-                        'is_active': row.get('is_active', True),
-                        'featured': row.get('featured', False)
-                    }
+                for record in records
+            ],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=PRODUCT_UPDATE_FIELDS,
+        )
+
+        if any(record['attributes'] for record in records):
+            self._write_attributes(records)
+
+        return sum(1 for record in records if record['sku'] not in existing)
+
+    def _resolve_categories(self, records):
+        """Возвращает карту название -> Category, создавая недостающие категории"""
+        missing = {
+            record['category']: record['category_slug']
+            for record in records
+            if record['category'] not in self._categories
+        }
+
+        if missing:
+            for category in Category.objects.filter(name__in=missing.keys()):
+                self._categories.setdefault(category.name, category)
+
+            to_create = [
+                Category(name=name, slug=slug)
+                for name, slug in missing.items()
+                if name not in self._categories
+            ]
+            if to_create:
+                Category.objects.bulk_create(to_create)
+                for category in Category.objects.filter(name__in=[c.name for c in to_create]):
+                    self._categories.setdefault(category.name, category)
+
+        return self._categories
+
+    def _resolve_attributes(self, names):
+        """Заполняет карту название -> Attribute, создавая недостающие атрибуты"""
+        missing = [name for name in names if name not in self._attributes]
+        if not missing:
+            return
+
+        for attribute in Attribute.objects.filter(name__in=missing):
+            self._attributes.setdefault(attribute.name, attribute)
+
+        to_create = [
+            Attribute(name=name, slug=slugify(name))
+            for name in missing
+            if name not in self._attributes
+        ]
+        if to_create:
+            Attribute.objects.bulk_create(to_create)
+            for attribute in Attribute.objects.filter(name__in=[a.name for a in to_create]):
+                self._attributes.setdefault(attribute.name, attribute)
+
+    def _resolve_attribute_values(self, pairs):
+        """Заполняет карту (атрибут, значение) -> AttributeValue"""
+        missing = [pair for pair in pairs if pair not in self._attribute_values]
+        if not missing:
+            return
+
+        self._resolve_attributes({name for name, _ in missing})
+
+        def load():
+            attribute_ids = {self._attributes[name].id for name, _ in missing}
+            values = {value for _, value in missing}
+            queryset = AttributeValue.objects.filter(
+                attribute_id__in=attribute_ids, value__in=values
+            ).select_related('attribute')
+            for attr_value in queryset:
+                self._attribute_values.setdefault((attr_value.attribute.name, attr_value.value), attr_value)
+
+        load()
+        to_create = [
+            AttributeValue(attribute=self._attributes[name], value=value)
+            for name, value in missing
+            if (name, value) not in self._attribute_values
+        ]
+        if to_create:
+            AttributeValue.objects.bulk_create(to_create, ignore_conflicts=True)
+            load()
+
+    def _write_attributes(self, records):
+        """Связывает товары пачки с их атрибутами"""
+        records = [record for record in records if record['attributes']]
+        self._resolve_attribute_values({pair for record in records for pair in record['attributes']})
+
+        product_ids = dict(
+            Product.objects.filter(sku__in=[record['sku'] for record in records]).values_list('sku', 'id')
+        )
+
+        ProductAttribute.objects.bulk_create(
+            [
+                ProductAttribute(
+                    product_id=product_ids[record['sku']],
+                    attribute_value=self._attribute_values[pair]
                 )
-                
-                if created:
-                    results['created'] += 1
-                else:
-                    results['updated'] += 1
-                    
+                for record in records
+                for pair in dict.fromkeys(record['attributes'])
+            ],
+            ignore_conflicts=True,
+        )
+
+    def _write_rows(self, batch):
+        """Построчная запись пачки с изоляцией ошибок каждой строки"""
+        for number, record in batch:
+            try:
+                with transaction.atomic():
+                    created = self._write_row(record)
             except Exception as e:
-                results['errors'].append(f"Ошибка в строке {_+1}: {str(e)}")
-        
-        return results
+                self._record_error(number, e)
+                continue
+
+            if created:
+                self.results['created'] += 1
+            else:
+                self.results['updated'] += 1
+
+    def _write_row(self, record):
+        category, _ = Category.objects.get_or_create(
+            name=record['category'],
+            defaults={'slug': record['category_slug']}
+        )
+
+        product, created = Product.objects.update_or_create(
+            sku=record['sku'],
+            defaults={
+                'name': record['name'],
+                'slug': record['slug'],
+                'description': record['description'],
+                'price': record['price'],
+                'stock': record['stock'],
+                'category': category,
+                'is_active': record['is_active'],
+                'featured': record['featured'],
+                'content_hash': record['content_hash'],
+            }
+        )
+
+        for attr_name, attr_value in record['attributes']:
+            attribute, _ = Attribute.objects.get_or_create(
+                name=attr_name,
+                defaults={'slug': slugify(attr_name)}
+            )
+
+            attr_value_obj, _ = AttributeValue.objects.get_or_create(
+                attribute=attribute,
+                value=attr_value
+            )
+
+            ProductAttribute.objects.get_or_create(
+                product=product,
+                attribute_value=attr_value_obj
+            )
+
+        return created
+
+# ----- Быстрая загрузка через промежуточную таблицу -----
+
+# Размер пачки быстрой загрузки: одна команда COPY и один набор MERGE-запросов
+IMPORT_COPY_BATCH_SIZE = getattr(settings, 'PRODUCT_IMPORT_COPY_BATCH_SIZE', 20000)
+
+STAGING_PRODUCTS_TABLE = 'product_import_staging'
+STAGING_ATTRIBUTES_TABLE = 'product_import_staging_attributes'
+
+STAGING_PRODUCT_COLUMNS = [
+    ('sku', 'text'),
+    ('name', 'text'),
+    ('slug', 'text'),
+    ('description', 'text'),
+    ('price', 'numeric'),
+    ('stock', 'integer'),
+    ('category', 'text'),
+    ('category_slug', 'text'),
+    ('is_active', 'boolean'),
+    ('featured', 'boolean'),
+    ('content_hash', 'text'),
+]
+
+STAGING_ATTRIBUTE_COLUMNS = [
+    ('sku', 'text'),
+    ('name', 'text'),
+    ('slug', 'text'),
+    ('value', 'text'),
+]
+
+class ProductCopyWriter(ProductBulkWriter):
+    """
+    Быстрая загрузка товаров для первичной загрузки и полного обновления каталога
+
+    Каждая пачка загружается во временную промежуточную таблицу (в PostgreSQL
+    командой COPY FROM STDIN, в остальных СУБД, например SQLite, через
+    executemany), после чего категории, товары, атрибуты, их значения и связи
+    сливаются в основные таблицы несколькими запросами INSERT ... SELECT
+    ... ON CONFLICT, независимо от размера пачки.
+
+    Разбор, режим delta, контрольные точки и построчный повтор пачки,
+    отклоненной ограничениями БД, наследуются от ProductBulkWriter.
+    """
+
+    def __init__(self, batch_size=None, **kwargs):
+        super().__init__(batch_size=batch_size or IMPORT_COPY_BATCH_SIZE, **kwargs)
+
+    def _write_batch(self, records, existing=None):
+        """Загружает пачку в промежуточные таблицы и сливает ее с основными"""
+        with connection.cursor() as cursor:
+            self._prepare_staging(cursor)
+            self._load_staging(cursor, STAGING_PRODUCTS_TABLE, STAGING_PRODUCT_COLUMNS, [
+                (
+                    record['sku'], record['name'], record['slug'], record['description'],
+                    record['price'], record['stock'], record['category'], record['category_slug'],
+                    record['is_active'], record['featured'], record['content_hash'],
+                )
+                for record in records
+            ])
+            self._load_staging(cursor, STAGING_ATTRIBUTES_TABLE, STAGING_ATTRIBUTE_COLUMNS, [
+                (record['sku'], name, slugify(name), value)
+                for record in records
+                for name, value in dict.fromkeys(record['attributes'])
+            ])
+            return self._merge_staging(cursor)
+
+    def _prepare_staging(self, cursor):
+        """Создает временные таблицы сеанса при первом обращении и очищает их"""
+        for table, columns in (
+            (STAGING_PRODUCTS_TABLE, STAGING_PRODUCT_COLUMNS),
+            (STAGING_ATTRIBUTES_TABLE, STAGING_ATTRIBUTE_COLUMNS),
+        ):
+            definition = ', '.join(f'{name} {column_type} NOT NULL' for name, column_type in columns)
+            cursor.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS {table} ({definition})')
+            cursor.execute(f'DELETE FROM {table}')
+
+    def _load_staging(self, cursor, table, columns, rows):
+        if not rows:
+            return
+
+        names = ', '.join(name for name, _ in columns)
+        if connection.vendor == 'postgresql':
+            # Значения всегда в кавычках: пустая строка не превращается в NULL
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            cursor.executemany(f'INSERT INTO {table} ({names}) VALUES ({placeholders})', rows)
+
+    def _merge_staging(self, cursor):
+        """
+        Сливает промежуточные таблицы с основными
+
+        Returns:
+            int: Количество созданных товаров
+        """
+        quote = connection.ops.quote_name
+        category = quote(Category._meta.db_table)
+        product = quote(Product._meta.db_table)
+        attribute = quote(Attribute._meta.db_table)
+        attribute_value = quote(AttributeValue._meta.db_table)
+        product_attribute = quote(ProductAttribute._meta.db_table)
+        now = timezone.now()
+
+        # Категории ищутся по названию, как и при обычной записи
+        cursor.execute(f"""
+            INSERT INTO {category} (name, slug, description, is_active, created_at, updated_at)
+            SELECT s.category, MIN(s.category_slug), '', %s, %s, %s
+            FROM {STAGING_PRODUCTS_TABLE} s
+            WHERE NOT EXISTS (SELECT 1 FROM {category} c WHERE c.name = s.category)
+            GROUP BY s.category
+        """, [True, now, now])
+
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM {STAGING_PRODUCTS_TABLE} s
+            WHERE NOT EXISTS (SELECT 1 FROM {product} p WHERE p.sku = s.sku)
+        """)
+        created = cursor.fetchone()[0]
+
+        # WHERE 1 = 1 снимает неоднозначность ON в INSERT ... SELECT для SQLite
+        update = ', '.join(
+            f'{column} = EXCLUDED.{column}'
+            for column in ('name', 'slug', 'description', 'price', 'stock', 'category_id',
+                           'is_active', 'featured', 'content_hash', 'updated_at')
+        )
+        cursor.execute(f"""
+            INSERT INTO {product} (
+                sku, name, slug, description, price, stock, category_id,
+                is_active, featured, content_hash, created_at, updated_at
+            )
+            SELECT s.sku, s.name, s.slug, s.description, s.price, s.stock,
+                   (SELECT MIN(c.id) FROM {category} c WHERE c.name = s.category),
+                   s.is_active, s.featured, s.content_hash, %s, %s
+            FROM {STAGING_PRODUCTS_TABLE} s
+            WHERE 1 = 1
+            ON CONFLICT (sku) DO UPDATE SET {update}
+        """, [now, now])
+
+        cursor.execute(f"""
+            INSERT INTO {attribute} (name, slug, description, created_at, updated_at)
+            SELECT a.name, MIN(a.slug), '', %s, %s
+            FROM {STAGING_ATTRIBUTES_TABLE} a
+            WHERE NOT EXISTS (SELECT 1 FROM {attribute} t WHERE t.name = a.name)
+            GROUP BY a.name
+        """, [now, now])
+
+        attribute_id = f'(SELECT MIN(t.id) FROM {attribute} t WHERE t.name = a.name)'
+        cursor.execute(f"""
+            INSERT INTO {attribute_value} (attribute_id, value, created_at, updated_at)
+            SELECT DISTINCT {attribute_id}, a.value, %s, %s
+            FROM {STAGING_ATTRIBUTES_TABLE} a
+            WHERE 1 = 1
+            ON CONFLICT (attribute_id, value) DO NOTHING
+        """, [now, now])
+
+        cursor.execute(f"""
+            INSERT INTO {product_attribute} (product_id, attribute_value_id, created_at, updated_at)
+            SELECT DISTINCT p.id, v.id, %s, %s
+            FROM {STAGING_ATTRIBUTES_TABLE} a
+            JOIN {product} p ON p.sku = a.sku
+            JOIN {attribute_value} v ON v.attribute_id = {attribute_id} AND v.value = a.value
+            WHERE 1 = 1
+            ON CONFLICT (product_id, attribute_value_id) DO NOTHING
+        """, [now, now])
+
+        return created
+
+def bulk_import_products(rows, parse_row, batch_size=None, row_label='записи', on_progress=None,
+                         checkpoint=None, delta=False, fast=False):
+    """
+    Общий движок импорта: разбирает записи через parse_row и пишет их пачками
+
+    Args:
+        rows (iterable): Источник "сырых" записей в формате файла
+        parse_row (callable): Превращает сырую запись в build_product_record(...)
+        batch_size (int, optional): Размер пачки записи в БД
+        row_label (str, optional): Как называть запись в сообщениях об ошибках
+        on_progress (callable, optional): Получает словарь результатов после каждой пачки
+        checkpoint (optional): Контрольная точка (offset, results, save) для
+            возобновления: записи с номером до checkpoint.offset включительно
+            пропускаются без разбора и записи в БД
+        delta (bool, optional): Писать только новые и изменившиеся товары
+        fast (bool, optional): Быстрая загрузка через промежуточную таблицу (ProductCopyWriter)
+
+    Returns:
+        dict: Количество созданных/обновленных/неизмененных/ошибочных записей и список ошибок
+    """
+    writer_class = ProductCopyWriter if fast else ProductBulkWriter
+    writer = writer_class(
+        batch_size=batch_size, row_label=row_label, on_progress=on_progress, checkpoint=checkpoint,
+        delta=delta
+    )
+    offset = checkpoint.offset if checkpoint is not None else 0
+
+    for number, row in enumerate(rows, start=1):
+        if number <= offset:
+            continue
+        try:
+            record = parse_row(row)
+        except Exception as e:
+            writer.add_error(number, e)
+            continue
+        writer.add(number, record)
+
+    return writer.close()
+
+# ----- Импорт из файлов -----
+
+def _parse_csv_row(row):
+    """Разбор строки CSV"""
+    return build_product_record(
+        sku=row['sku'],
+        name=row['name'],
+        slug=row.get('slug'),
+        description=row['description'],
+        price=row['price'],
+        stock=row['stock'],
+        category=row['category'],
+        is_active=row.get('is_active', True),
+        featured=row.get('featured', False)
+    )
+
+def iter_csv_rows(file, chunk_size=None):
+    """
+    Потоковое чтение CSV кусками фиксированного размера
+
+    В памяти одновременно находится только один кусок файла, поэтому
+    потребление памяти не зависит от размера файла. Все значения читаются
+    как строки, приведение типов выполняет build_product_record.
+
+    Args:
+        file: Файловый объект (бинарный или текстовый)
+        chunk_size (int, optional): Количество строк в куске
+
+    Yields:
+        dict: Строка CSV в виде словаря колонка -> значение
+    """
+    reader = pd.read_csv(
+        file,
+        chunksize=chunk_size or IMPORT_BATCH_SIZE,
+        dtype=str,
+        keep_default_na=False,
+    )
+    with reader:
+        for chunk in reader:
+            yield from chunk.to_dict('records')
+
+def import_products_from_csv(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                             fast=False):
+    """Импорт товаров из CSV файла"""
+    try:
+        return bulk_import_products(
+            iter_csv_rows(file, chunk_size=batch_size), _parse_csv_row,
+            batch_size=batch_size, row_label='строке',
+            on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
     except Exception as e:
         raise ValidationError(f"Ошибка импорта CSV: {str(e)}")
 
-def import_products_from_json(file):
+def _parse_json_product(product_data):
+    """Разбор товара из JSON (формат export_products_to_json)"""
+    category_data = product_data['category']
+
+    return build_product_record(
+        sku=product_data['sku'],
+        name=product_data['name'],
+        slug=product_data.get('slug'),
+        description=product_data['description'],
+        price=product_data['price'],
+        stock=product_data['stock'],
+        category=category_data['name'],
+        category_slug=category_data.get('slug'),
+        is_active=product_data.get('is_active', True),
+        featured=product_data.get('featured', False),
+        attributes=[
+            (attr_data['name'], attr_data['value'])
+            for attr_data in product_data.get('attributes') or []
+        ]
+    )
+
+def _text_stream(file):
+    """Текстовый поток поверх бинарного или текстового файла"""
+    if isinstance(file.read(0), str):
+        return file
+    return codecs.getreader('utf-8-sig')(file)
+
+_JSON_WHITESPACE = re.compile(r'\s*')
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    """
+    Инкрементальный разбор JSON-массива верхнего уровня
+
+    Файл читается кусками, элементы массива декодируются по одному через
+    JSONDecoder.raw_decode, поэтому в памяти держится только текущий кусок,
+    а не весь документ.
+
+    Args:
+        file: Файловый объект с JSON-массивом
+        chunk_size (int, optional): Размер читаемого куска в символах
+
+    Yields:
+        Элементы массива
+    """
+    stream = _text_stream(file)
+    decoder = json.JSONDecoder()
+    buffer = ''
+    # Что ожидается дальше: '[', первый элемент или ']', элемент после ',' или разделитель
+    expect = '['
+
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        pos = 0
+
+        while True:
+            pos = _JSON_WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+
+            char = buffer[pos]
+            if expect == '[':
+                if char != '[':
+                    raise ValueError("Ожидался JSON-массив товаров")
+                expect = 'first'
+                pos += 1
+                continue
+
+            if expect == 'separator':
+                if char == ']':
+                    return
+                if char != ',':
+                    raise ValueError(f"Ожидалась ',' или ']' между элементами JSON-массива, получено {char!r}")
+                expect = 'item'
+                pos += 1
+                continue
+
+            if char == ']':
+                if expect == 'item':
+                    raise ValueError("Лишняя ',' в конце JSON-массива")
+                return
+            if char == ',':
+                raise ValueError("Пропущен элемент JSON-массива перед ','")
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                # Элемент еще не дочитан до конца
+                break
+
+            # Число в конце буфера может быть обрезано на границе куска
+            if end == len(buffer) and chunk:
+                break
+
+            yield item
+            pos = end
+            expect = 'separator'
+
+        buffer = buffer[pos:]
+        if not chunk:
+            raise ValueError("Неожиданный конец JSON-массива")
+
+def iter_ndjson_lines(file):
+    """
+    Построчное чтение NDJSON (один JSON-объект на строку)
+
+    Yields:
+        str: Непустые строки файла; декодирование выполняется при разборе
+        записи, чтобы битая строка считалась ошибкой только этой записи
+    """
+    for line in _text_stream(file):
+        line = line.strip()
+        if line:
+            yield line
+
+def import_products_from_json(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                              fast=False):
     """Импорт товаров из JSON файла"""
     try:
-        data = json.load(file)
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        for i, product_data in enumerate(data):
-            try:
-                # Получаем или создаем категорию
-                category_name = product_data['category']['name']
-                category_slug = product_data['category'].get('slug') or slugify(category_name)
-                
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    defaults={'slug': category_slug}
-                )
-                
-                # Формируем slug если отсутствует
-                slug = product_data.get('slug') or slugify(product_data['name'])
-                
-                # Получаем или создаем товар
-                product, created = Product.objects.update_or_create(
-                    sku=product_data['sku'],
-                    defaults={
-                        'name': product_data['name'],
-                        'slug': slug,
-                        'description': product_data['description'],
-                        'price': product_data['price'],
-                        'stock': product_data['stock'],
-                        'category': category,
-                        'is_active': product_data.get('is_active', True),
-                        'featured': product_data.get('featured', False)
-                    }
-                )
-                
-                # Добавляем атрибуты
-                if 'attributes' in product_data:
-                    for attr_data in product_data['attributes']:
-                        attribute, _ = Attribute.objects.get_or_create(
-                            name=attr_data['name'],
-                            defaults={'slug': slugify(attr_data['name'])}
-                        )
-                        
-                        attr_value, _ = AttributeValue.objects.get_or_create(
-                            attribute=attribute,
-                            value=attr_data['value']
-                        )
-                        
-                        ProductAttribute.objects.get_or_create(
-                            product=product,
-                            attribute_value=attr_value
-                        )
-                
-                if created:
-                    results['created'] += 1
-                else:
-                    results['updated'] += 1
-                    
-            except Exception as e:
-                results['errors'].append(f"Ошибка в записи {i+1}: {str(e)}")
-        
-        return results
+        return bulk_import_products(
+            iter_json_array(file), _parse_json_product,
+            batch_size=batch_size, on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
     except Exception as e:
         raise ValidationError(f"Ошибка импорта JSON: {str(e)}")
 
-def import_products_from_xml(file):
-    """Импорт товаров из XML файла"""
-    try:
-        tree = ET.parse(file)
-        root = tree.getroot()
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        for i, product_elem in enumerate(root.findall('product')):
-            try:
-                # Получаем данные из XML
-                name = product_elem.find('name').text
-                description = product_elem.find('description').text
-                price = float(product_elem.find('price').text)
-                stock = int(product_elem.find('stock').text)
-                sku = product_elem.find('sku').text
-                
-                slug_elem = product_elem.find('slug')
-                slug = slug_elem.text if slug_elem is not None else slugify(name)
-                
-                is_active_elem = product_elem.find('is_active')
-                is_active = is_active_elem.text.lower() == 'true' if is_active_elem is not None else True
-                
-                featured_elem = product_elem.find('featured')
-                featured = featured_elem.text.lower() == 'true' if featured_elem is not None else False
-                
-                # Категория
-                category_elem = product_elem.find('category')
-                category_name = category_elem.find('name').text
-                
-                category_slug_elem = category_elem.find('slug')
-                category_slug = category_slug_elem.text if category_slug_elem is not None else slugify(category_name)
-                
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    defaults={'slug': category_slug}
-                )
-                
-                # Создаем или обновляем товар
-                product, created = Product.objects.update_or_create(
-                    sku=sku,
-                    defaults={
-                        'name': name,
-                        'slug': slug,
-                        'description': description,
-                        'price': price,
-                        'stock': stock,
-                        'category': category,
-                        'is_active': is_active,
-                        'featured': featured
-                    }
-                )
-                
-                # Атрибуты
-                attributes_elem = product_elem.find('attributes')
-                if attributes_elem is not None:
-                    for attr_elem in attributes_elem.findall('attribute'):
-                        attr_name = attr_elem.find('name').text
-                        attr_value = attr_elem.find('value').text
-                        
-                        attribute, _ = Attribute.objects.get_or_create(
-                            name=attr_name,
-                            defaults={'slug': slugify(attr_name)}
-                        )
-                        
-                        attr_value_obj, _ = AttributeValue.objects.get_or_create(
-                            attribute=attribute,
-                            value=attr_value
-                        )
-                        
-                        ProductAttribute.objects.get_or_create(
-                            product=product,
-                            attribute_value=attr_value_obj
-                        )
-                
-                if created:
-                    results['created'] += 1
-                else:
-                    results['updated'] += 1
-                    
-            except Exception as e:
-                results['errors'].append(f"Ошибка в записи {i+1}: {str(e)}")
-        
-        return results
-    except Exception as e:
-        raise ValidationError(f"Ошибка импорта XML: {str(e)}")
+def _parse_ndjson_line(line):
+    """Разбор строки NDJSON"""
+    return _parse_json_product(json.loads(line))
+
+def import_products_from_ndjson(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                                fast=False):
+    """Импорт товаров из NDJSON файла (JSON Lines)"""
+    try:
+        return bulk_import_products(
+            iter_ndjson_lines(file), _parse_ndjson_line,
+            batch_size=batch_size, on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
+    except Exception as e:
+        raise ValidationError(f"Ошибка импорта NDJSON: {str(e)}")
+
+def _xml_text(elem, tag, default=None):
+    """Текст дочернего элемента или default, если элемента нет"""
+    child = elem.find(tag)
+    if child is None:
+        return default
+    return child.text
+
+def _parse_xml_product(product_elem):
+    """Разбор элемента <product> (формат export_products_to_xml)"""
+    category_elem = product_elem.find('category')
+
+    attributes = []
+    attributes_elem = product_elem.find('attributes')
+    if attributes_elem is not None:
+        for attr_elem in attributes_elem.findall('attribute'):
+            attributes.append((attr_elem.find('name').text, attr_elem.find('value').text))
+
+    return build_product_record(
+        sku=product_elem.find('sku').text,
+        name=product_elem.find('name').text,
+        slug=_xml_text(product_elem, 'slug'),
+        description=product_elem.find('description').text,
+        price=product_elem.find('price').text,
+        stock=product_elem.find('stock').text,
+        category=category_elem.find('name').text,
+        category_slug=_xml_text(category_elem, 'slug'),
+        is_active=_xml_text(product_elem, 'is_active', True),
+        featured=_xml_text(product_elem, 'featured', False),
+        attributes=attributes
+    )
+
+def iter_xml_products(file, tag='product'):
+    """
+    Инкрементальный разбор XML через iterparse
+
+    Отдает элементы <product> верхнего уровня по мере чтения документа.
+    После обработки элемент очищается вместе с уже прочитанными соседями,
+    поэтому дерево документа целиком в памяти не строится.
+
+    Args:
+        file: Файловый объект или путь к файлу
+        tag (str, optional): Тег элемента товара
+
+    Yields:
+        Element: Полностью прочитанный элемент товара
+    """
+    root = None
+    depth = 0
+
+    for event, elem in ET.iterparse(file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1 and elem.tag == tag:
+            yield elem
+            # Освобождаем обработанный товар и уже прочитанных соседей
+            elem.clear()
+            root.clear()
+
+def import_products_from_xml(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                             fast=False):
+    """Импорт товаров из XML файла"""
+    try:
+        return bulk_import_products(
+            iter_xml_products(file), _parse_xml_product,
+            batch_size=batch_size, on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
+    except Exception as e:
+        raise ValidationError(f"Ошибка импорта XML: {str(e)}")
+
+def _parse_yaml_product(product_data):
+    """Разбор товара из YAML"""
+    return build_product_record(
+        sku=product_data['sku'],
+        name=product_data['name'],
+        slug=product_data.get('slug'),
+        description=product_data.get('description', ''),
+        price=product_data['price'],
+        stock=product_data.get('stock', 0),
+        category=product_data['category'],
+        is_active=product_data.get('is_active', True),
+        featured=product_data.get('featured', False),
+        attributes=(product_data.get('attributes') or {}).items()
+    )
+
+def import_products_from_yaml(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                              fast=False):
+    """Импорт товаров из YAML файла"""
+    try:
+        data = yaml.safe_load(file)
+        return bulk_import_products(
+            data['products'], _parse_yaml_product,
+            batch_size=batch_size, on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
+    except yaml.YAMLError as e:
+        raise ValidationError(f"Ошибка парсинга YAML: {str(e)}")
+    except Exception as e:
+        raise ValidationError(f"Ошибка импорта YAML: {str(e)}")
+
+def iter_parquet_rows(file, batch_size=None):
+    """
+    Чтение Parquet по пачкам записей (record batches)
+
+    Args:
+        file: Путь или файловый объект с поддержкой seek
+        batch_size (int, optional): Количество строк в пачке
+
+    Yields:
+        dict: Строка файла
+    """
+    parquet_file = pq.ParquetFile(file)
+    for batch in parquet_file.iter_batches(batch_size=batch_size or IMPORT_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+def _parse_parquet_row(row):
+    """Разбор строки Parquet (формат export_products_to_parquet)"""
+    return build_product_record(
+        sku=row['sku'],
+        name=row['name'],
+        slug=row.get('slug'),
+        description=row.get('description'),
+        price=row['price'],
+        stock=row.get('stock'),
+        category=row['category'],
+        category_slug=row.get('category_slug'),
+        is_active=row.get('is_active', True),
+        featured=row.get('featured', False),
+        attributes=[(attr['name'], attr['value']) for attr in row.get('attributes') or []]
+    )
+
+def import_products_from_parquet(file, batch_size=None, on_progress=None, checkpoint=None, delta=False,
+                                 fast=False):
+    """Импорт товаров из Parquet файла"""
+    try:
+        return bulk_import_products(
+            iter_parquet_rows(file, batch_size=batch_size), _parse_parquet_row,
+            batch_size=batch_size, row_label='строке',
+            on_progress=on_progress, checkpoint=checkpoint, delta=delta,
+            fast=fast
+        )
+    except Exception as e:
+        raise ValidationError(f"Ошибка импорта Parquet: {str(e)}")
+
+def _iter_yaml_products(file):
+    return yaml.safe_load(file)['products']
+
+# Читатель, разборщик записи и подпись строки в ошибках для форматов файлов
+FILE_IMPORT_FORMATS = {
+    'csv': (iter_csv_rows, _parse_csv_row, 'строке'),
+    'json': (iter_json_array, _parse_json_product, 'записи'),
+    'ndjson': (iter_ndjson_lines, _parse_ndjson_line, 'записи'),
+    'xml': (iter_xml_products, _parse_xml_product, 'записи'),
+    'yaml': (_iter_yaml_products, _parse_yaml_product, 'записи'),
+    'parquet': (iter_parquet_rows, _parse_parquet_row, 'строке'),
+}
+
+# ----- Параллельный импорт частями -----
+
+# Количество записей в одной части при параллельном импорте
+IMPORT_CHUNK_ROWS = getattr(settings, 'PRODUCT_IMPORT_CHUNK_ROWS', 50000)
+
+def write_import_chunks(file, file_format, directory, chunk_rows=None):
+    """
+    Делит файл импорта на части по chunk_rows записей
+
+    Файл читается потоково, записи разбираются в нормализованный вид
+    (см. build_product_record) и пишутся в NDJSON-части вместе с исходным
+    номером строки. Части можно импортировать независимо и параллельно
+    через import_products_from_chunk.
+
+    Args:
+        file: Файловый объект импорта
+        file_format (str): Формат файла (ключ FILE_IMPORT_FORMATS)
+        directory (str): Каталог для частей
+        chunk_rows (int, optional): Количество записей в части
+
+    Returns:
+        list: Пути к файлам частей по порядку
+    """
+    reader, parse_row, _ = FILE_IMPORT_FORMATS[file_format]
+    chunk_rows = chunk_rows or IMPORT_CHUNK_ROWS
+
+    paths = []
+    part = None
+    rows_in_part = 0
+
+    try:
+        for number, row in enumerate(reader(file), start=1):
+            if part is None or rows_in_part >= chunk_rows:
+                if part is not None:
+                    part.close()
+                path = os.path.join(directory, f'part_{len(paths):05d}.ndjson')
+                part = open(path, 'w', encoding='utf-8')
+                paths.append(path)
+                rows_in_part = 0
+
+            try:
+                item = {'number': number, 'record': parse_row(row)}
+            except Exception as e:
+                item = {'number': number, 'error': str(e)}
+
+            part.write(json.dumps(item, ensure_ascii=False, default=str) + '\n')
+            rows_in_part += 1
+    finally:
+        if part is not None:
+            part.close()
+
+    return paths
+
+def import_products_from_chunk(path, row_label='записи', batch_size=None, on_progress=None, delta=False,
+                               fast=False):
+    """
+    Импорт одной части, подготовленной write_import_chunks
+
+    Args:
+        path (str): Путь к файлу части
+        row_label (str, optional): Как называть запись в сообщениях об ошибках
+        batch_size (int, optional): Размер пачки записи в БД
+        on_progress (callable, optional): Получает словарь результатов после каждой пачки
+        delta (bool, optional): Писать только новые и изменившиеся товары
+        fast (bool, optional): Быстрая загрузка через промежуточную таблицу
+
+    Returns:
+        dict: Результаты импорта части
+    """
+    writer_class = ProductCopyWriter if fast else ProductBulkWriter
+    writer = writer_class(
+        batch_size=batch_size, row_label=row_label, on_progress=on_progress, delta=delta
+    )
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            item = json.loads(line)
+            if 'error' in item:
+                writer.add_error(item['number'], item['error'])
+                continue
+
+            record = item['record']
+            record['price'] = Decimal(record['price'])
+            record['attributes'] = [tuple(pair) for pair in record['attributes']]
+            writer.add(item['number'], record)
+
+    return writer.close()
+
+# ----- Импорт через API -----
+
+API_PAGE_SIZE = getattr(settings, 'PRODUCT_API_PAGE_SIZE', 100)
+API_CONCURRENCY = getattr(settings, 'PRODUCT_API_CONCURRENCY', 8)
+API_TIMEOUT = getattr(settings, 'PRODUCT_API_TIMEOUT', 30)
+# Защита от API, которые игнорируют параметры пагинации и отдают одно и то же
+API_MAX_PAGES = getattr(settings, 'PRODUCT_API_MAX_PAGES', 10000)
+# Сколько хранятся ETag/Last-Modified страниц API для условных запросов
+API_CACHE_TTL = getattr(settings, 'PRODUCT_API_CACHE_TTL', 7 * 24 * 3600)
+
+API_ITEMS_FIELDS = ('products', 'items', 'results', 'data')
+API_TOTAL_FIELDS = ('total', 'count', 'total_count', 'meta.total', 'meta.total_count', 'pagination.total')
+API_NEXT_LINK_FIELDS = ('next', 'next_page_url', 'links.next', 'paging.next')
+API_NEXT_CURSOR_FIELDS = ('next_cursor', 'meta.next_cursor', 'pagination.next_cursor', 'cursor.next')
+
+def _parse_api_product(product_data):
+    """Разбор товара из ответа стороннего API с эвристикой по названиям полей"""
+    # Получаем необходимые поля из API-ответа
+    name = product_data.get('name') or product_data.get('title')
+    if not name:
+        raise ValueError("Отсутствует обязательное поле 'name'")
+
+    sku = product_data.get('sku') or product_data.get('id') or product_data.get('code')
+    if not sku:
+        raise ValueError("Отсутствует обязательное поле 'sku'")
+
+    description = product_data.get('description') or product_data.get('desc') or ''
+
+    # Обрабатываем цену, которая может быть в разных форматах и полях
+    price = None
+    for price_field in ['price', 'price_amount', 'cost', 'amount']:
+        if price_field in product_data:
+            price_value = product_data[price_field]
+            if isinstance(price_value, (int, float)):
+                price = price_value
+                break
+            elif isinstance(price_value, dict) and 'value' in price_value:
+                price = float(price_value['value'])
+                break
+            elif isinstance(price_value, str) and price_value.replace('.', '', 1).isdigit():
+                price = float(price_value)
+                break
+
+    if price is None:
+        raise ValueError("Невозможно определить цену")
+
+    # Определяем категорию
+    category_name = None
+    for cat_field in ['category', 'category_name', 'cat', 'group']:
+        if cat_field in product_data:
+            cat_value = product_data[cat_field]
+            if isinstance(cat_value, str):
+                category_name = cat_value
+                break
+            elif isinstance(cat_value, dict) and 'name' in cat_value:
+                category_name = cat_value['name']
+                break
+
+    if not category_name:
+        category_name = "Без категории"
+
+    # Определяем количество на складе
+    stock = 0
+    for stock_field in ['stock', 'quantity', 'inventory', 'available']:
+        if stock_field in product_data:
+            stock_value = product_data[stock_field]
+            if isinstance(stock_value, (int, float)):
+                stock = int(stock_value)
+                break
+            elif isinstance(stock_value, str) and stock_value.isdigit():
+                stock = int(stock_value)
+                break
+
+    attributes = product_data.get('attributes')
+
+    return build_product_record(
+        sku=sku,
+        name=name,
+        slug=product_data.get('slug'),
+        description=description,
+        price=price,
+        stock=stock,
+        category=category_name,
+        attributes=attributes.items() if isinstance(attributes, dict) else None
+    )
+
+def _api_field(payload, paths):
+    """Первое непустое значение по списку путей вида 'meta.total'"""
+    if not isinstance(payload, dict):
+        return None
+    for path in paths:
+        value = payload
+        for key in path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value not in (None, ''):
+            return value
+    return None
+
+def _api_items(payload):
+    """Список товаров из ответа API: сам ответ или вложенный список"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for field in API_ITEMS_FIELDS:
+            if isinstance(payload.get(field), list):
+                return payload[field]
+    raise ValidationError("Неподдерживаемый формат ответа API")
+
+def _api_total(payload):
+    """Общее количество товаров, если API его сообщает"""
+    total = _api_field(payload, API_TOTAL_FIELDS)
+    try:
+        return int(total) if total is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _api_next_link(payload, response):
+    """Ссылка на следующую страницу из тела ответа или заголовка Link"""
+    link = _api_field(payload, API_NEXT_LINK_FIELDS)
+    if isinstance(link, dict):
+        link = link.get('href') or link.get('url')
+    if not isinstance(link, str):
+        link = response.links.get('next', {}).get('url')
+    return urljoin(response.url, link) if link else None
+
+class APIPage:
+    """
+    Страница ответа API
+
+    Для страницы, не изменившейся с прошлого импорта (304 Not Modified),
+    товаров нет, а размер и данные для перехода к следующей странице берутся
+    из кеша условных запросов.
+    """
+    __slots__ = ('items', 'size', 'total', 'next_link', 'next_cursor', 'not_modified')
+
+    def __init__(self, items, size, total=None, next_link=None, next_cursor=None, not_modified=False):
+        self.items = items
+        self.size = size
+        self.total = total
+        self.next_link = next_link
+        self.next_cursor = next_cursor
+        self.not_modified = not_modified
+
+    @classmethod
+    def from_response(cls, response):
+        payload = response.json()
+        items = _api_items(payload)
+        cursor = _api_field(payload, API_NEXT_CURSOR_FIELDS)
+        return cls(
+            items, len(items),
+            total=_api_total(payload),
+            next_link=_api_next_link(payload, response),
+            next_cursor=str(cursor) if cursor is not None else None
+        )
+
+class APIResponseCache:
+    """
+    Кеш валидаторов ответов API (ETag/Last-Modified) в Redis
+
+    Ключ - хеш метода, URL, параметров, тела и заголовков запроса. Вместе
+    с валидаторами хранится размер страницы и ссылка/курсор на следующую,
+    чтобы пагинация могла продолжиться после ответа 304 без тела.
+    """
+    KEY_PREFIX = 'api_cache'
+    FIELDS = ('etag', 'last_modified', 'size', 'total', 'next_link', 'next_cursor')
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or API_CACHE_TTL
+        self._client = get_redis_client()
+
+    def key(self, method, url, params, data, headers):
+        raw = json.dumps([method.upper(), url, params, data, headers], sort_keys=True, default=str)
+        return f"{self.KEY_PREFIX}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        try:
+            values = self._client.hmget(key, *self.FIELDS)
+        except redis.RedisError as e:
+            logger.warning(f"Кеш API недоступен: {str(e)}")
+            return None
+        entry = {
+            field: value.decode() if isinstance(value, bytes) else value
+            for field, value in zip(self.FIELDS, values)
+        }
+        if not entry['etag'] and not entry['last_modified']:
+            return None
+        return entry
+
+    def save(self, entries):
+        """Сохраняет валидаторы нескольких страниц одним pipeline"""
+        if not entries:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, entry in entries.items():
+                pipe.delete(key)
+                pipe.hset(key, mapping={field: entry.get(field) or '' for field in self.FIELDS})
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Не удалось сохранить кеш API: {str(e)}")
+
+class APIPageFetcher:
+    """
+    Загрузка страниц API через общие сессии HTTPSessionManager
+
+    Сессия хоста с пулом keep-alive соединений разделяется между потоками,
+    поэтому параллельные запросы переиспользуют соединения вместо установки
+    нового TCP/TLS-соединения на каждую страницу. Повторы при 429/5xx
+    выполняет адаптер сессии.
+
+    С кешем запросы отправляются с If-None-Match/If-Modified-Since, а
+    новые валидаторы копятся до save_cache(): их можно сохранять только после
+    успешного импорта, иначе неудачный импорт пропустился бы при следующем
+    запуске.
+    """
+
+    def __init__(self, api_url, api_key=None, method='GET', params=None, headers=None, data=None,
+                 concurrency=None, timeout=None, cache=None, use_cache=True):
+        self.api_url = api_url
+        self.method = method
+        self.params = params or {}
+        self.data = data
+        self.concurrency = concurrency or API_CONCURRENCY
+        self.timeout = timeout or API_TIMEOUT
+        self.cache = cache
+        self.use_cache = use_cache
+
+        # Сессия общая для всех импортов с этого хоста, поэтому заголовки
+        # (в том числе ключ API) передаются с каждым запросом
+        self.headers = dict(headers or {})
+        if api_key:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+
+        self.pages = 0
+        self.pages_not_modified = 0
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, page_params=None, url=None):
+        """
+        Загружает одну страницу
+
+        Args:
+            page_params (dict, optional): Параметры пагинации поверх базовых параметров
+            url (str, optional): Готовая ссылка на страницу (параметры уже в ней)
+
+        Returns:
+            APIPage: Товары страницы и данные для перехода к следующей
+        """
+        if url is not None:
+            params = None
+        else:
+            url = self.api_url
+            params = {**self.params, **(page_params or {})}
+
+        request_headers = dict(self.headers)
+        cache_key = entry = None
+        if self.cache is not None:
+            cache_key = self.cache.key(self.method, url, params, self.data, self.headers)
+            if self.use_cache:
+                entry = self.cache.get(cache_key)
+            if entry and entry['etag']:
+                request_headers['If-None-Match'] = entry['etag']
+            if entry and entry['last_modified']:
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = get_http_session(url).request(
+            method=self.method,
+            url=url,
+            params=params,
+            headers=request_headers,
+            json=self.data,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        if response.status_code == 304 and entry:
+            page = APIPage(
+                [], int(entry['size'] or 0),
+                total=int(entry['total']) if entry['total'] else None,
+                next_link=entry['next_link'] or None,
+                next_cursor=entry['next_cursor'] or None,
+                not_modified=True
+            )
+        else:
+            page = APIPage.from_response(response)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            entry = None
+            if cache_key and (etag or last_modified):
+                entry = {
+                    'etag': etag, 'last_modified': last_modified, 'size': page.size,
+                    'total': page.total, 'next_link': page.next_link, 'next_cursor': page.next_cursor,
+                }
+
+        with self._lock:
+            self.pages += 1
+            if page.not_modified:
+                self.pages_not_modified += 1
+            if entry:
+                self._validators[cache_key] = entry
+        return page
+
+    @property
+    def not_modified(self):
+        """Все загруженные страницы не изменились с прошлого импорта"""
+        return self.pages > 0 and self.pages_not_modified == self.pages
+
+    def save_cache(self):
+        """Сохраняет валидаторы страниц после успешного импорта"""
+        if self.cache is not None:
+            self.cache.save(self._validators)
+
+def _api_page_params(pagination, index, page_size):
+    """Параметры запроса для страницы с номером index (с нуля)"""
+    if pagination['type'] == 'offset':
+        return {
+            pagination.get('offset_param', 'offset'): index * page_size,
+            pagination.get('limit_param', 'limit'): page_size,
+        }
+    return {
+        pagination.get('page_param', 'page'): pagination.get('first_page', 1) + index,
+        pagination.get('size_param', 'per_page'): page_size,
+    }
+
+def _iter_numbered_pages(fetcher, executor, pagination, page_size, max_pages):
+    """
+    Пагинация offset/limit и по номеру страницы
+
+    Первая страница загружается отдельно: из нее берутся общее количество
+    товаров и фактический размер страницы (сервер может урезать limit).
+    Дальше в работе одновременно держится до concurrency страниц, а товары
+    отдаются строго по порядку страниц. Если общее количество неизвестно,
+    загрузка заканчивается на первой неполной странице.
+    """
+    page = fetcher.fetch(_api_page_params(pagination, 0, page_size))
+    yield from page.items
+
+    total = page.total
+    if not page.size or (total is not None and page.size >= total):
+        return
+    if total is not None and page.size < page_size:
+        # Сервер урезал размер страницы - для offset считаем смещения по нему
+        if pagination['type'] == 'offset':
+            page_size = page.size
+        page_count = math.ceil(total / page.size)
+    elif page.size < page_size:
+        return
+    else:
+        page_count = math.ceil(total / page_size) if total is not None else None
+    expected_size = page.size
+
+    last_index = min(page_count, max_pages) if page_count is not None else max_pages
+    next_index = 1
+    pending = deque()
+
+    while True:
+        while len(pending) < fetcher.concurrency and next_index < last_index:
+            pending.append(executor.submit(
+                fetcher.fetch, _api_page_params(pagination, next_index, page_size)
+            ))
+            next_index += 1
+        if not pending:
+            return
+
+        page = pending.popleft().result()
+        yield from page.items
+        if page_count is None and page.size < expected_size:
+            return
+
+def _iter_linked_pages(fetcher, executor, pagination, max_pages):
+    """
+    Пагинация по ссылке next или курсору
+
+    Следующая страница известна только из текущей, поэтому страницы идут
+    последовательно, но загрузка следующей начинается до того, как товары
+    текущей уйдут на запись в БД.
+    """
+    kind = pagination['type']
+    cursor_param = pagination.get('cursor_param', 'cursor')
+    page = fetcher.fetch()
+    seen = set()
+
+    for _ in range(max_pages):
+        next_future = None
+        if kind in ('auto', 'link') and page.next_link and page.next_link not in seen:
+            seen.add(page.next_link)
+            next_future = executor.submit(fetcher.fetch, url=page.next_link)
+        if next_future is None and kind in ('auto', 'cursor') and page.next_cursor \
+                and page.next_cursor not in seen:
+            seen.add(page.next_cursor)
+            kind = 'cursor'
+            next_future = executor.submit(fetcher.fetch, {cursor_param: page.next_cursor})
+
+        yield from page.items
+        if next_future is None:
+            return
+        page = next_future.result()
+
+def iter_api_products(fetcher, pagination=None):
+    """
+    Потоковое чтение товаров из API со всех страниц
+
+    Args:
+        fetcher (APIPageFetcher): Загрузчик страниц
+        pagination (dict, optional): Настройки пагинации:
+            type - 'auto' (ссылка next или курсор, если они есть в ответе),
+            'none', 'offset', 'page', 'cursor' или 'link';
+            page_size - размер страницы для offset/page;
+            offset_param, limit_param, page_param, size_param, first_page,
+            cursor_param - имена параметров, если они отличаются от стандартных;
+            max_pages - ограничение числа страниц
+
+    Yields:
+        dict: Товар в формате ответа API
+    """
+    pagination = dict(pagination or {})
+    pagination.setdefault('type', 'auto')
+    page_size = pagination.get('page_size') or API_PAGE_SIZE
+    max_pages = pagination.get('max_pages') or API_MAX_PAGES
 
-def import_products_from_yaml(file):
-    """Импорт товаров из YAML файла"""
+    executor = ThreadPoolExecutor(max_workers=fetcher.concurrency)
     try:
-        data = yaml.safe_load(file)
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        for i, product_data in enumerate(data['products']):
-            try:
-                # Получаем или создаем категорию
-                category_name = product_data['category']
-                category_slug = slugify(category_name)
-                
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    defaults={'slug': category_slug}
-                )
-                
-                # Формируем slug если отсутствует
-                slug = product_data.get('slug') or slugify(product_data['name'])
-                
-                # Получаем или создаем товар
-                product, created = Product.objects.update_or_create(
-                    sku=product_data['sku'],
-                    defaults={
-                        'name': product_data['name'],
-                        'slug': slug,
-                        'description': product_data.get('description', ''),
-                        'price': product_data['price'],
-                        'stock': product_data.get('stock', 0),
-                        'category': category,
-                        'is_active': product_data.get('is_active', True),
-                        'featured': product_data.get('featured', False)
-                    }
-                )
-                
-                # Добавляем атрибуты
-                if 'attributes' in product_data:
-                    for attr_name, attr_value in product_data['attributes'].items():
-                        attribute, _ = Attribute.objects.get_or_create(
-                            name=attr_name,
-                            defaults={'slug': slugify(attr_name)}
-                        )
-                        
-                        attr_value_obj, _ = AttributeValue.objects.get_or_create(
-                            attribute=attribute,
-                            value=str(attr_value)
-                        )
-                        
-                        ProductAttribute.objects.get_or_create(
-                            product=product,
-                            attribute_value=attr_value_obj
-                        )
-                
-                if created:
-                    results['created'] += 1
-                else:
-                    results['updated'] += 1
-                    
-            except Exception as e:
-                results['errors'].append(f"Ошибка в записи {i+1}: {str(e)}")
-        
-        return results
-    except yaml.YAMLError as e:
-        raise ValidationError(f"Ошибка парсинга YAML: {str(e)}")
-    except Exception as e:
-        raise ValidationError(f"Ошибка импорта YAML: {str(e)}")
+        if pagination['type'] == 'none':
+            yield from fetcher.fetch().items
+        elif pagination['type'] in ('offset', 'page'):
+            yield from _iter_numbered_pages(fetcher, executor, pagination, page_size, max_pages)
+        elif pagination['type'] in ('auto', 'cursor', 'link'):
+            yield from _iter_linked_pages(fetcher, executor, pagination, max_pages)
+        else:
+            raise ValidationError(f"Неподдерживаемый тип пагинации: {pagination['type']}")
+    finally:
+        # Досрочный выход (ошибка или последняя страница) - лишние запросы не нужны
+        executor.shutdown(wait=False, cancel_futures=True)
 
-def import_products_from_api(api_url, api_key=None, method='GET', params=None, headers=None, data=None):
+def import_products_from_api(api_url, api_key=None, method='GET', params=None, headers=None, data=None,
+                             batch_size=None, pagination=None, concurrency=None, use_cache=True,
+                             on_progress=None):
     """
     Импорт товаров через API
-    
+
+    Страницы загружаются параллельно через общий пул соединений, а товары
+    по мере загрузки передаются в пакетную запись, не дожидаясь конца выгрузки.
+    Запросы условные (ETag/Last-Modified): товары страниц, на которые API
+    ответил 304, не загружаются и не записываются повторно.
+
     Args:
         api_url (str): URL API-эндпоинта
         api_key (str, optional): API ключ для авторизации
@@ -409,153 +2071,28 @@ def import_products_from_api(api_url, api_key=None, method='GET', params=None, h
         params (dict, optional): Параметры запроса
         headers (dict, optional): HTTP заголовки
         data (dict, optional): Данные для отправки в теле запроса
+        batch_size (int, optional): Размер пачки записи в БД
+        pagination (dict, optional): Настройки пагинации (см. iter_api_products)
+        concurrency (int, optional): Число одновременных запросов к API
+        use_cache (bool, optional): Отправлять условные запросы; при False
+            все страницы загружаются заново, а кеш только обновляется
+        on_progress (callable, optional): Получает словарь результатов после каждой пачки
+
+    Returns:
+        dict: Результаты bulk_import_products и not_modified - True, если
+            ни одна страница не изменилась с прошлого импорта
     """
+    fetcher = APIPageFetcher(
+        api_url, api_key=api_key, method=method, params=params, headers=headers, data=data,
+        concurrency=concurrency, cache=APIResponseCache(), use_cache=use_cache
+    )
     try:
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        # Формируем заголовки
-        request_headers = headers or {}
-        if api_key:
-            request_headers['Authorization'] = f'Bearer {api_key}'
-        
-        # Выполняем запрос
-        response = requests.request(
-            method=method, 
-            url=api_url,
-            params=params,
-            headers=request_headers,
-            json=data,
-            timeout=30
+        results = bulk_import_products(
+            iter_api_products(fetcher, pagination), _parse_api_product,
+            batch_size=batch_size, on_progress=on_progress
         )
-        
-        response.raise_for_status()  # Проверяем успешность запроса
-        
-        # Обрабатываем ответ
-        products_data = response.json()
-        
-        # Определяем, является ли ответ списком или объектом с вложенным списком
-        if isinstance(products_data, dict) and 'products' in products_data:
-            products_list = products_data['products']
-        elif isinstance(products_data, dict) and 'items' in products_data:
-            products_list = products_data['items']
-        elif isinstance(products_data, dict) and 'results' in products_data:
-            products_list = products_data['results']
-        elif isinstance(products_data, list):
-            products_list = products_data
-        else:
-            raise ValidationError("Неподдерживаемый формат ответа API")
-        
-        # Обрабатываем каждый товар
-        for i, product_data in enumerate(products_list):
-            try:
-                # Получаем необходимые поля из API-ответа
-                name = product_data.get('name') or product_data.get('title')
-                if not name:
-                    results['errors'].append(f"Запись {i+1}: Отсутствует обязательное поле 'name'")
-                    continue
-                    
-                sku = product_data.get('sku') or product_data.get('id') or product_data.get('code')
-                if not sku:
-                    results['errors'].append(f"Запись {i+1}: Отсутствует обязательное поле 'sku'")
-                    continue
-                    
-                description = product_data.get('description') or product_data.get('desc') or ''
-                
-                # Обрабатываем цену, которая может быть в разных форматах и полях
-                price = None
-                for price_field in ['price', 'price_amount', 'cost', 'amount']:
-                    if price_field in product_data:
-                        price_value = product_data[price_field]
-                        if isinstance(price_value, (int, float)):
-                            price = price_value
-                            break
-                        elif isinstance(price_value, dict) and 'value' in price_value:
-                            price = float(price_value['value'])
-                            break
-                        elif isinstance(price_value, str) and price_value.replace('.', '', 1).isdigit():
-                            price = float(price_value)
-                            break
-                
-                if price is None:
-                    results['errors'].append(f"Запись {i+1}: Невозможно определить цену")
-                    continue
-                
-                # Получаем или создаем категорию
-                category_name = None
-                for cat_field in ['category', 'category_name', 'cat', 'group']:
-                    if cat_field in product_data:
-                        cat_value = product_data[cat_field]
-                        if isinstance(cat_value, str):
-                            category_name = cat_value
-                            break
-                        elif isinstance(cat_value, dict) and 'name' in cat_value:
-                            category_name = cat_value['name']
-                            break
-                
-                if not category_name:
-                    category_name = "Без категории"
-                
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    defaults={'slug': slugify(category_name)}
-                )
-                
-                # Формируем slug если отсутствует
-                slug = product_data.get('slug') or slugify(name)
-                
-                # Определяем количество на складе
-                stock = 0
-                for stock_field in ['stock', 'quantity', 'inventory', 'available']:
-                    if stock_field in product_data:
-                        stock_value = product_data[stock_field]
-                        if isinstance(stock_value, (int, float)):
-                            stock = int(stock_value)
-                            break
-                        elif isinstance(stock_value, str) and stock_value.isdigit():
-                            stock = int(stock_value)
-                            break
-                
-                # Получаем или создаем товар
-                product, created = Product.objects.update_or_create(
-                    sku=sku,
-                    defaults={
-                        'name': name,
-                        'slug': slug,
-                        'description': description,
-                        'price': price,
-                        'stock': stock,
-                        'category': category,
-                        'is_active': True,
-                        'featured': False
-                    }
-                )
-                
-                # Добавляем атрибуты
-                if 'attributes' in product_data and isinstance(product_data['attributes'], dict):
-                    for attr_name, attr_value in product_data['attributes'].items():
-                        attribute, _ = Attribute.objects.get_or_create(
-                            name=attr_name,
-                            defaults={'slug': slugify(attr_name)}
-                        )
-                        
-                        attr_value_obj, _ = AttributeValue.objects.get_or_create(
-                            attribute=attribute,
-                            value=str(attr_value)
-                        )
-                        
-                        ProductAttribute.objects.get_or_create(
-                            product=product,
-                            attribute_value=attr_value_obj
-                        )
-                
-                if created:
-                    results['created'] += 1
-                else:
-                    results['updated'] += 1
-                    
-            except Exception as e:
-                results['errors'].append(f"Ошибка в записи {i+1}: {str(e)}")
-        
+        fetcher.save_cache()
+        results['not_modified'] = fetcher.not_modified
         return results
     except RequestException as e:
         raise ValidationError(f"Ошибка HTTP запроса: {str(e)}")
@@ -563,286 +2100,986 @@ def import_products_from_api(api_url, api_key=None, method='GET', params=None, h
         raise ValidationError(f"Ошибка декодирования JSON: {str(e)}")
     except Exception as e:
         raise ValidationError(f"Ошибка импорта через API: {str(e)}")
+    finally:
+        logger.info(f"Пул HTTP-соединений после импорта из {api_url}: {http_session_manager.get_metrics()}")
+
+# ----- Импорт через скрапинг -----
+
+SCRAPE_TIMEOUT = getattr(settings, 'PRODUCT_SCRAPE_TIMEOUT', 30)
+# Ограничение для пагинации по кнопке "Следующая", у которой нет числа страниц
+SCRAPE_MAX_PAGES = getattr(settings, 'PRODUCT_SCRAPE_MAX_PAGES', 999)
+SCRAPE_USER_AGENT = getattr(
+    settings, 'PRODUCT_SCRAPE_USER_AGENT',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+)
+
+# Детальные страницы: всего потоков, одновременных запросов к одному хосту
+# и минимальная пауза между началом запросов к нему
+SCRAPE_DETAIL_CONCURRENCY = getattr(settings, 'PRODUCT_SCRAPE_DETAIL_CONCURRENCY', 8)
+SCRAPE_HOST_CONCURRENCY = getattr(settings, 'PRODUCT_SCRAPE_HOST_CONCURRENCY', 4)
+SCRAPE_HOST_DELAY = getattr(settings, 'PRODUCT_SCRAPE_HOST_DELAY', 0.2)
+
+# Ожидание загрузки страниц в браузере: предельное время, частота проверок и
+# сколько DOM и сетевые запросы должны не меняться, чтобы страница считалась готовой
+SCRAPE_WAIT_TIMEOUT = getattr(settings, 'PRODUCT_SCRAPE_WAIT_TIMEOUT', 10)
+SCRAPE_POLL_INTERVAL = 0.1
+SCRAPE_DOM_QUIET_PERIOD = 0.3
+
+# Кеш результатов скрапинга: сколько хранятся хеши страниц списка и
+# сколько данные детальных страниц используются без повторной загрузки
+SCRAPE_CACHE_TTL = getattr(settings, 'PRODUCT_SCRAPE_CACHE_TTL', 7 * 24 * 3600)
+SCRAPE_DETAILS_CACHE_TTL = getattr(settings, 'PRODUCT_SCRAPE_DETAILS_CACHE_TTL', 24 * 3600)
+
+# Поля товара на странице списка и ключи их CSS-селекторов в конфигурации
+SCRAPE_LISTING_FIELDS = ('name', 'price', 'description', 'sku', 'category')
+
+def _scrape_selectors(config):
+    """CSS-селекторы полей товара, заданные в конфигурации"""
+    return {
+        field: config[f'{field}_selector']
+        for field in SCRAPE_LISTING_FIELDS
+        if config.get(f'{field}_selector')
+    }
+
+def _parse_scraped_product(item, config):
+    """Разбор товара, собранного со страницы сайта"""
+    page = item.get('page')
+    if not item.get('name'):
+        raise ValueError(f"Не найдено название товара (страница {page})")
+
+    # Удаляем символы валюты и разделители тысяч
+    price = ''.join(c for c in (item.get('price') or '') if c.isdigit() or c == '.')
+    if not price:
+        raise ValueError(f"Некорректная цена (страница {page})")
+
+    sku = item.get('sku')
+    if not sku:
+        # Артикул должен совпадать между запусками, поэтому hash() не подходит
+        digest = hashlib.md5(f"{item['name']}{float(price)}".encode('utf-8')).hexdigest()[:16]
+        sku = f"SCRAPE-{digest}"
+
+    return build_product_record(
+        sku=sku,
+        name=item['name'],
+        description=item.get('description') or '',
+        price=price,
+        stock=0,
+        category=item.get('category') or config.get('default_category', 'Скрапинг'),
+        attributes=item.get('attributes')
+    )
+
+# Состояние страницы для ожидания: готовность документа, число загруженных
+# ресурсов (замена network idle) и число элементов по селектору
+PAGE_STATE_SCRIPT = """
+return [
+    document.readyState,
+    performance.getEntriesByType('resource').length,
+    arguments[0] ? document.querySelectorAll(arguments[0]).length
+                 : document.getElementsByTagName('*').length
+];
+"""
+
+# Извлечение товаров страницы списка за один вызов execute_script:
+# arguments - селектор карточки, {поле: селектор}, селектор ссылки
+EXTRACT_PRODUCTS_SCRIPT = """
+const [productSelector, fields, linkSelector] = arguments;
+const text = (root, selector) => {
+    const element = root.querySelector(selector);
+    return element ? element.innerText.trim() : null;
+};
+return Array.from(document.querySelectorAll(productSelector), (product) => {
+    const item = {};
+    for (const [field, selector] of Object.entries(fields)) {
+        item[field] = text(product, selector);
+    }
+    if (linkSelector) {
+        const link = product.querySelector(linkSelector);
+        const href = link && link.getAttribute('href');
+        item.link = href ? new URL(href, document.baseURI).href : null;
+    }
+    return item;
+});
+"""
+
+# Детальная страница за один вызов: arguments - селекторы описания,
+# строк атрибутов, имени и значения атрибута
+EXTRACT_DETAILS_SCRIPT = """
+const [descriptionSelector, attributesSelector, nameSelector, valueSelector] = arguments;
+const details = {};
+if (descriptionSelector) {
+    const element = document.querySelector(descriptionSelector);
+    details.description = element ? element.innerText.trim() : null;
+}
+if (attributesSelector) {
+    details.attributes = [];
+    for (const row of document.querySelectorAll(attributesSelector)) {
+        const name = nameSelector && row.querySelector(nameSelector);
+        const value = valueSelector && row.querySelector(valueSelector);
+        if (name && value) {
+            details.attributes.push([name.innerText.trim(), value.innerText.trim()]);
+        }
+    }
+}
+return details;
+"""
 
-def import_products_via_scraping(url, config):
+class _PageSettled:
     """
-    Импорт товаров через веб-скрапинг с использованием Selenium
-    
+    Условие WebDriverWait: документ загружен, по селектору есть элементы,
+    а число элементов и загруженных ресурсов не меняется quiet_period секунд
+    """
+
+    def __init__(self, selector=None, quiet_period=SCRAPE_DOM_QUIET_PERIOD):
+        self.selector = selector
+        self.quiet_period = quiet_period
+        self._state = None
+        self._since = None
+
+    def __call__(self, driver):
+        ready_state, resources, elements = driver.execute_script(PAGE_STATE_SCRIPT, self.selector)
+        if ready_state != 'complete' or (self.selector and not elements):
+            self._state = None
+            return False
+
+        now = time.monotonic()
+        state = (resources, elements)
+        if state != self._state:
+            self._state, self._since = state, now
+            return False
+        return now - self._since >= self.quiet_period
+
+def wait_for_page(driver, selector=None, timeout=None):
+    """
+    Ждет готовности страницы по ее состоянию, а не фиксированной паузой
+
+    Проверки идут каждые SCRAPE_POLL_INTERVAL секунд, поэтому быстрая
+    страница ждется доли секунды, а медленная - до timeout.
+
     Args:
-        url (str): URL-адрес страницы, с которой нужно собрать данные
-        config (dict): Конфигурация для скрапинга, содержащая селекторы элементов
+        driver: WebDriver
+        selector (str, optional): CSS-селектор элементов, которые должны появиться
+        timeout (float, optional): Предельное время ожидания
+
+    Returns:
+        bool: False, если страница не успокоилась за timeout
     """
     try:
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        
-        # Настройка Chrome в headless режиме
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        # Настройка и запуск драйвера
+        WebDriverWait(driver, timeout or SCRAPE_WAIT_TIMEOUT, poll_frequency=SCRAPE_POLL_INTERVAL).until(
+            _PageSettled(selector)
+        )
+        return True
+    except TimeoutException:
+        return False
+
+class ScrapeResultCache:
+    """
+    Кеш результатов скрапинга в Redis
+
+    Для страницы списка хранятся хеш ее содержимого и хеш извлеченных
+    товаров: если не изменилось содержимое, страница не разбирается, если
+    не изменились товары - они не записываются в БД и их детальные страницы
+    не загружаются. Для детальной страницы хранятся извлеченные описание и
+    атрибуты, которые используются без загрузки до истечения details_ttl.
+    Ключ - нормализованный URL и селекторы конфигурации, поэтому смена
+    селекторов сбрасывает кеш.
+
+    Вместе с хешами страницы списка хранится время последней проверки
+    детальных страниц ее товаров: после details_ttl страница обрабатывается
+    как измененная, иначе детальные страницы за неизменившимся списком не
+    загружались бы никогда.
+
+    Хеши страниц списка копятся до save(), как валидаторы APIPageFetcher:
+    их можно сохранять только после успешного импорта. Страница, у товара
+    которой не загрузилась детальная страница, не сохраняется вовсе.
+    Товары, измененные или удаленные в обход импорта, кеш не заметит: для
+    полной синхронизации импорт запускается с use_cache=False.
+    """
+    KEY_PREFIX = 'scrape_cache'
+    PAGE_FIELDS = ('content_hash', 'records_hash')
+
+    def __init__(self, config, use_cache=True, ttl=None, details_ttl=None):
+        self.use_cache = use_cache
+        self.ttl = ttl or SCRAPE_CACHE_TTL
+        self.details_ttl = details_ttl or SCRAPE_DETAILS_CACHE_TTL
+        self._client = get_redis_client()
+
+        selectors = {
+            key: value for key, value in config.items()
+            if key.endswith('_selector') or key == 'details_page'
+        }
+        self._config_hash = hashlib.sha1(json.dumps(selectors, sort_keys=True).encode('utf-8')).hexdigest()
+
+        self.pages = 0
+        self.pages_unchanged = 0
+        self._pages = {}
+        self._failed_pages = set()
+        self._details = {}
+        self._lock = threading.Lock()
+
+    def _key(self, kind, url):
+        raw = json.dumps([normalize_url(url), self._config_hash])
+        return f"{self.KEY_PREFIX}:{kind}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def records_hash(products):
+        """Хеш товаров, извлеченных со страницы"""
+        raw = json.dumps(products, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_page(self, url):
+        """Хеши страницы списка с прошлого импорта или None"""
+        if not self.use_cache:
+            return None
         try:
-            driver_path = ChromeDriverManager().install()
-            service = Service(driver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        except Exception as e:
-            logger.error(f"Ошибка инициализации Chrome драйвера: {str(e)}")
+            values = self._client.hmget(self._key('page', url), *self.PAGE_FIELDS, 'details_checked_at')
+        except redis.RedisError as e:
+            logger.warning(f"Кеш скрапинга недоступен: {str(e)}")
+            return None
+        if not all(values[:len(self.PAGE_FIELDS)]):
+            return None
+        cached = {field: value.decode() for field, value in zip(self.PAGE_FIELDS, values)}
+        # Записи без времени проверки остались от прежних версий кеша
+        checked_at = values[len(self.PAGE_FIELDS)]
+        cached['details_checked_at'] = float(checked_at) if checked_at else 0.0
+        return cached
+
+    def details_expired(self, cached):
+        """Детальные страницы товаров страницы списка пора загрузить заново"""
+        return time.time() - cached['details_checked_at'] >= self.details_ttl
+
+    def record_page(self, url, content_hash, records_hash, unchanged=False, details_checked_at=None):
+        """
+        Запоминает хеши обработанной страницы списка до save()
+
+        Args:
+            details_checked_at (float, optional): Время проверки детальных
+                страниц из get_page(); по умолчанию - текущее
+        """
+        with self._lock:
+            self.pages += 1
+            if unchanged:
+                self.pages_unchanged += 1
+            self._pages[self._key('page', url)] = {
+                'content_hash': content_hash,
+                'records_hash': records_hash,
+                'details_checked_at': details_checked_at or time.time(),
+            }
+
+    def discard_page(self, url):
+        """Не сохранять страницу: следующий импорт обработает ее заново"""
+        with self._lock:
+            self._failed_pages.add(self._key('page', url))
+
+    def get_details(self, url):
+        """Данные детальной страницы, если они еще не устарели"""
+        if not self.use_cache:
+            return None
+        try:
+            value = self._client.get(self._key('details', url))
+        except redis.RedisError as e:
+            logger.warning(f"Кеш скрапинга недоступен: {str(e)}")
+            return None
+        return json.loads(value) if value is not None else None
+
+    def record_details(self, url, details):
+        with self._lock:
+            self._details[self._key('details', url)] = details
+
+    @property
+    def not_modified(self):
+        """Все страницы списка не изменились с прошлого импорта"""
+        return self.pages > 0 and self.pages_unchanged == self.pages
+
+    def save(self, pages=True):
+        """
+        Сохраняет хеши страниц и данные детальных страниц одним pipeline
+
+        Args:
+            pages (bool, optional): False - сохранить только детальные страницы
+        """
+        with self._lock:
+            details = dict(self._details)
+            if pages:
+                pages = {key: value for key, value in self._pages.items() if key not in self._failed_pages}
+            else:
+                pages = {}
+        if not pages and not details:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, mapping in pages.items():
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+            for key, value in details.items():
+                pipe.set(key, json.dumps(value, ensure_ascii=False), ex=self.details_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Не удалось сохранить кеш скрапинга: {str(e)}")
+
+class HostThrottle:
+    """
+    Вежливость к сайту: не больше max_concurrent одновременных запросов
+    к одному хосту и не чаще одного начала запроса в min_interval секунд
+    """
+
+    def __init__(self, max_concurrent=None, min_interval=None):
+        self.max_concurrent = max_concurrent or SCRAPE_HOST_CONCURRENCY
+        self.min_interval = SCRAPE_HOST_DELAY if min_interval is None else min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+        semaphore.acquire()
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, url):
+        self._semaphores[urlsplit(url).netloc].release()
+
+class StaticPageScraper:
+    """
+    Скрапинг статического HTML: requests + BeautifulSoup
+
+    Применяет те же CSS-селекторы, что и браузер, но без запуска Chrome:
+    страница загружается одним HTTP-запросом через общий пул соединений.
+    Детальные страницы не зависят от состояния движка, поэтому их можно
+    загружать параллельно.
+    """
+    detail_workers = SCRAPE_DETAIL_CONCURRENCY
+
+    def __init__(self, config):
+        self.config = config
+        self.url = None
+        self._response = None
+        self._soup = None
+        self._products = None
+
+    def _fetch(self, url):
+        response = get_http_session(url).get(
+            url, headers={'User-Agent': SCRAPE_USER_AGENT}, timeout=SCRAPE_TIMEOUT
+        )
+        response.raise_for_status()
+        return response
+
+    def open(self, url):
+        """Загружает страницу списка товаров"""
+        self._response = self._fetch(url)
+        self.url = self._response.url
+        self._soup = None
+        self._products = None
+
+    @property
+    def soup(self):
+        # HTML разбирается только при обращении: страницу, которая не
+        # изменилась с прошлого импорта, разбирать не нужно
+        if self._soup is None:
+            self._soup = BeautifulSoup(self._response.text, 'html.parser')
+        return self._soup
+
+    def content_hash(self):
+        """Хеш HTML текущей страницы"""
+        return hashlib.sha1(self._response.content).hexdigest()
+
+    def extract_products(self):
+        """Товары текущей страницы: словари с текстом полей и ссылкой на детальную страницу"""
+        if self._products is not None:
+            return self._products
+
+        selectors = _scrape_selectors(self.config)
+        link_selector = (self.config.get('details_page') or {}).get('link_selector')
+
+        self._products = []
+        for element in self.soup.select(self.config['product_selector']):
+            item = {}
+            for field, selector in selectors.items():
+                found = element.select_one(selector)
+                item[field] = found.get_text(' ', strip=True) if found is not None else None
+            if link_selector:
+                link = element.select_one(link_selector)
+                href = link.get('href') if link is not None else None
+                item['link'] = urljoin(self.url, href) if href else None
+            self._products.append(item)
+        return self._products
+
+    def page_count(self):
+        """Номер последней страницы из элемента пагинации"""
+        element = self.soup.select_one(self.config['pagination']['selector'])
+        if element is None:
+            return None
+        return int(element.get_text(strip=True))
+
+    def _next_link(self):
+        button = self.soup.select_one(self.config['pagination']['next_button_selector'])
+        if button is None:
+            return None, False
+        href = button.get('href')
+        return (urljoin(self.url, href) if href else None), True
+
+    def can_paginate(self):
+        """Можно ли пройти пагинацию без браузера (у кнопки "Следующая" есть ссылка)"""
+        pagination = self.config.get('pagination')
+        if not pagination or pagination['type'] != 'next_button':
+            return True
+        link, found = self._next_link()
+        return link is not None or not found
+
+    def next_page_url(self):
+        """Ссылка кнопки "Следующая" или None"""
+        return self._next_link()[0]
+
+    def next_page(self):
+        """Переходит по ссылке кнопки "Следующая"; False, если ее нет"""
+        link, _ = self._next_link()
+        if link is None:
+            return False
+        self.open(link)
+        return True
+
+    def extract_details(self, url):
+        """Детальное описание и атрибуты со страницы товара"""
+        details_config = self.config['details_page']
+        soup = BeautifulSoup(self._fetch(url).text, 'html.parser')
+        details = {}
+
+        if details_config.get('detailed_description_selector'):
+            element = soup.select_one(details_config['detailed_description_selector'])
+            if element is not None:
+                details['description'] = element.get_text(' ', strip=True)
+
+        if details_config.get('attributes_selector'):
+            attributes = []
+            for element in soup.select(details_config['attributes_selector']):
+                name = element.select_one(details_config['attribute_name_selector'])
+                value = element.select_one(details_config['attribute_value_selector'])
+                if name is not None and value is not None:
+                    attributes.append((name.get_text(strip=True), value.get_text(strip=True)))
+            details['attributes'] = attributes
+
+        return details
+
+    def close(self):
+        pass
+
+class BrowserPageScraper:
+    """
+    Скрапинг через headless Chrome для страниц, которые строятся JavaScript
+
+    Браузер берется из пула воркера (browser_pool) и возвращается в него
+    при close(). Если в пуле больше двух браузеров, детальные страницы
+    загружаются параллельно в других браузерах пула, иначе - по очереди
+    во вкладке браузера списка.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        try:
+            self.browser = browser_pool.acquire()
+        except BrowserPoolError as e:
             raise ValidationError(f"Ошибка запуска браузера: {str(e)}")
-        
+        self.driver = self.browser.driver
+        # Один драйвер нельзя использовать из нескольких потоков, поэтому
+        # параллельно загружать детальные страницы можно только в других браузерах
+        self.detail_workers = max(browser_pool.max_size - 1, 1)
+
+    def open(self, url):
+        """Загружает страницу списка товаров и ждет, пока товары отрисуются"""
+        self.browser.get(url)
+        wait_for_page(self.driver, self.config['product_selector'])
+
+    @property
+    def url(self):
+        return self.driver.current_url
+
+    def content_hash(self):
+        """Хеш отрисованного DOM текущей страницы"""
+        return hashlib.sha1(self.driver.page_source.encode('utf-8')).hexdigest()
+
+    def extract_products(self):
+        """
+        Товары текущей страницы: словари с текстом полей и ссылкой на детальную страницу
+
+        Все селекторы применяются в браузере одним execute_script, а не
+        отдельным запросом к WebDriver на каждое поле каждого товара.
+        """
+        link_selector = (self.config.get('details_page') or {}).get('link_selector')
+        return self.driver.execute_script(
+            EXTRACT_PRODUCTS_SCRIPT,
+            self.config['product_selector'], _scrape_selectors(self.config), link_selector
+        )
+
+    def page_count(self):
+        """Номер последней страницы из элемента пагинации"""
+        # Страница уже дождалась стабильного DOM в open(), ждать повторно незачем
+        elements = self.driver.find_elements(By.CSS_SELECTOR, self.config['pagination']['selector'])
+        if not elements:
+            return None
+        return int(elements[0].text.strip())
+
+    def can_paginate(self):
+        return True
+
+    def next_page_url(self):
+        """Ссылка кнопки "Следующая" или None, если кнопки нет или она работает через JavaScript"""
+        buttons = self.driver.find_elements(By.CSS_SELECTOR, self.config['pagination']['next_button_selector'])
+        if not buttons:
+            return None
+        href = buttons[0].get_attribute('href')
+        if not href or href.startswith('javascript:'):
+            logger.warning("У кнопки \"Следующая\" нет ссылки, следующие страницы не добавлены в обход")
+            return None
+        return href
+
+    def next_page(self):
+        """
+        Нажимает кнопку "Следующая"; False, если ее нет
+
+        После нажатия ждет, пока старые карточки товаров исчезнут (переход
+        или замена списка через JavaScript) и новая страница успокоится.
+        """
+        selector = self.config['pagination']['next_button_selector']
+        if not self.driver.find_elements(By.CSS_SELECTOR, selector):
+            return False
+        try:
+            next_button = WebDriverWait(self.driver, SCRAPE_WAIT_TIMEOUT, poll_frequency=SCRAPE_POLL_INTERVAL).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+            )
+        except TimeoutException:
+            return False
+
+        old_products = self.driver.find_elements(By.CSS_SELECTOR, self.config['product_selector'])
+        next_button.click()
+        self.browser.pages += 1
+
+        if old_products:
+            try:
+                WebDriverWait(self.driver, SCRAPE_WAIT_TIMEOUT, poll_frequency=SCRAPE_POLL_INTERVAL).until(
+                    EC.staleness_of(old_products[0])
+                )
+            except TimeoutException:
+                logger.warning("Список товаров не обновился после перехода на следующую страницу")
+        wait_for_page(self.driver, self.config['product_selector'])
+        return True
+
+    def _extract_details_from(self, driver, url):
+        details_config = self.config['details_page']
+        details = {}
+
+        wait_for_page(
+            driver,
+            details_config.get('detailed_description_selector') or details_config.get('attributes_selector')
+        )
+
+        extracted = driver.execute_script(
+            EXTRACT_DETAILS_SCRIPT,
+            details_config.get('detailed_description_selector'),
+            details_config.get('attributes_selector'),
+            details_config.get('attribute_name_selector'),
+            details_config.get('attribute_value_selector')
+        )
+
+        if extracted.get('description') is not None:
+            details['description'] = extracted['description']
+        elif details_config.get('detailed_description_selector'):
+            logger.warning(f"Детальное описание не найдено: {url}")
+
+        if 'attributes' in extracted:
+            details['attributes'] = [tuple(pair) for pair in extracted['attributes']]
+
+        return details
+
+    def extract_details(self, url):
+        """Детальное описание и атрибуты со страницы товара"""
+        if self.detail_workers > 1:
+            # Вызывается из потоков iter_scraped_products: отдельный браузер из пула
+            browser = browser_pool.acquire()
+            broken = False
+            try:
+                browser.get(url)
+                return self._extract_details_from(browser.driver, url)
+            except WebDriverException:
+                broken = True
+                raise
+            finally:
+                browser_pool.release(browser, discard=broken)
+
+        # Отдельная вкладка браузера списка
+        driver = self.driver
+        original_window = driver.current_window_handle
+        driver.execute_script("window.open('');")
+        driver.switch_to.window(driver.window_handles[-1])
+        try:
+            self.browser.get(url)
+            return self._extract_details_from(driver, url)
+        finally:
+            # Закрываем вкладку и возвращаемся к списку товаров
+            driver.close()
+            driver.switch_to.window(original_window)
+
+    def close(self):
+        """Возвращает браузер в пул"""
+        browser_pool.release(self.browser)
+
+def open_scraper(url, config):
+    """
+    Открывает первую страницу подходящим движком
+
+    Режим config['render_mode']:
+        'static' - только requests + BeautifulSoup;
+        'browser' - только headless Chrome;
+        'auto' (по умолчанию) - статический HTML, а браузер только если
+            селекторы не нашли товаров, сайт не отдал страницу или кнопка
+            "Следующая" работает без ссылки (через JavaScript).
+
+    Returns:
+        StaticPageScraper | BrowserPageScraper: Движок, открытый на первой странице
+    """
+    mode = config.get('render_mode', 'auto')
+
+    if mode != 'browser':
+        scraper = StaticPageScraper(config)
+        if mode == 'static':
+            scraper.open(url)
+            return scraper
+        try:
+            scraper.open(url)
+            if any(item.get('name') for item in scraper.extract_products()) and scraper.can_paginate():
+                return scraper
+            logger.info(f"Статический HTML {url} не подходит для селекторов, запускаем браузер")
+        except RequestException as e:
+            logger.info(f"Не удалось загрузить {url} без браузера ({str(e)}), запускаем браузер")
+
+    scraper = BrowserPageScraper(config)
+    try:
+        scraper.open(url)
+    except Exception:
+        scraper.close()
+        raise
+    return scraper
+
+def scraping_frontier(crawl_id):
+    """Очередь обхода (CrawlFrontier) с ограничениями скрапинга для каждого хоста"""
+    return CrawlFrontier(crawl_id, max_concurrent=SCRAPE_HOST_CONCURRENCY, min_interval=SCRAPE_HOST_DELAY)
+
+def _open_crawl_scraper(url, config, frontier):
+    """
+    Движок для воркера обхода
+
+    Движок выбирается по первой странице один раз на весь обход (см.
+    open_scraper), остальные воркеры создают его без пробной загрузки.
+    Страницы открываются уже из очереди обхода.
+    """
+    engine = frontier.get('engine')
+    if engine is None and config.get('render_mode') in ('static', 'browser'):
+        engine = config['render_mode']
+    if engine is None:
+        scraper = open_scraper(url, config)
+        frontier.set('engine', 'browser' if isinstance(scraper, BrowserPageScraper) else 'static')
+        return scraper
+    return BrowserPageScraper(config) if engine == 'browser' else StaticPageScraper(config)
+
+def _scraped_item_with_details(item, future, page_errors, cache=None):
+    """Дополняет товар данными детальной страницы, когда они загружены"""
+    if future is not None:
+        try:
+            item.update(future.result())
+        except Exception as e:
+            logger.error(f"Ошибка при обработке детальной страницы товара: {str(e)}")
+            page_errors.append(f"Ошибка при обработке детальной страницы для товара {item.get('name')}")
+            if cache is not None:
+                cache.discard_page(item['page_url'])
+    return item
+
+def _wait_between_pages(delay_between_pages, page_started):
+    """
+    Вежливость: между началом загрузки страниц списка проходит не меньше
+    delay_between_pages секунд; время разбора страницы входит в эту паузу
+    """
+    if page_started is not None:
+        remaining = delay_between_pages - (time.monotonic() - page_started)
+        if remaining > 0:
+            time.sleep(remaining)
+    return time.monotonic()
+
+def _iter_listing_pages(scraper, config):
+    """Страницы списка по порядку: открывает очередную страницу и отдает {'page': номер}"""
+    pagination = config.get('pagination')
+
+    # Определяем количество страниц для обработки
+    page_count = 1
+    if pagination:
+        if pagination['type'] == 'last_page_number':
+            try:
+                page_count = scraper.page_count() or 1
+            except ValueError:
+                logger.warning("Элемент пагинации не содержит номер страницы, обрабатываем только первую страницу")
+        elif pagination['type'] == 'next_button':
+            page_count = SCRAPE_MAX_PAGES
+
+    delay_between_pages = config.get('delay_between_pages', 2)
+    page_started = time.monotonic()
+
+    for page in range(1, page_count + 1):
+        if page > 1:
+            page_started = _wait_between_pages(delay_between_pages, page_started)
+
+            if pagination['type'] == 'last_page_number':
+                scraper.open(pagination['url_template'].format(page=page))
+            elif not scraper.next_page():
+                logger.info(f"Кнопка следующей страницы не найдена. Обработано страниц: {page - 1}")
+                return
+        yield {'page': page}
+
+def _iter_frontier_pages(scraper, config, frontier, page_errors):
+    """
+    Страницы списка из очереди обхода (CrawlFrontier)
+
+    Ссылки на другие страницы списка, найденные на открытой странице,
+    добавляются в очередь, откуда их берут все воркеры обхода; уже
+    виденные страницы очередь отбрасывает. Страница отмечается
+    обработанной, когда с нее забраны товары.
+    """
+    pagination = config.get('pagination')
+    delay_between_pages = config.get('delay_between_pages', 2)
+    page_started = None
+
+    while True:
+        entry = frontier.pop()
+        if entry is None:
+            return
+        page_started = _wait_between_pages(delay_between_pages, page_started)
+
+        page, url = entry['page'], entry['url']
         try:
-            # Загрузка страницы
-            driver.get(url)
-            
-            # Ожидание загрузки страницы
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            frontier.acquire(url)
+            try:
+                scraper.open(url)
+            finally:
+                frontier.release(url)
+        except (RequestException, WebDriverException) as e:
+            logger.error(f"Не удалось загрузить страницу {page} ({url}): {str(e)}")
+            page_errors.append(f"Ошибка на странице {page}: {str(e)}")
+            frontier.done(entry, failed=True)
+            continue
+
+        if pagination and pagination['type'] == 'last_page_number' and page == 1:
+            try:
+                page_count = min(scraper.page_count() or 1, SCRAPE_MAX_PAGES)
+            except ValueError:
+                logger.warning("Элемент пагинации не содержит номер страницы, обрабатываем только первую страницу")
+                page_count = 1
+            frontier.add_many(
+                (pagination['url_template'].format(page=number), {'page': number})
+                for number in range(2, page_count + 1)
             )
-            
-            # Проверяем необходимость пагинации
-            page_count = 1
-            if config.get('pagination'):
-                try:
-                    # Ожидаем загрузки элемента пагинации
-                    WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, config['pagination']['selector']))
-                    )
-                    
-                    # Определяем количество страниц для обработки
-                    if config['pagination']['type'] == 'last_page_number':
-                        # Получаем номер последней страницы
-                        pagination_element = driver.find_element(By.CSS_SELECTOR, config['pagination']['selector'])
-                        page_count = int(pagination_element.text.strip())
-                    elif config['pagination']['type'] == 'next_button':
-                        # Будем переходить по кнопке "Следующая" пока она существует
-                        page_count = 999  # Устанавливаем высокое значение, чтобы использовать цикл
-                except (TimeoutException, NoSuchElementException):
-                    logger.warning("Элемент пагинации не найден, обрабатываем только первую страницу")
-            
-            # Обрабатываем каждую страницу
-            for page in range(1, page_count + 1):
-                if page > 1:
-                    # Переходим на следующую страницу
-                    if config['pagination']['type'] == 'last_page_number':
-                        # Строим URL следующей страницы
-                        next_page_url = config['pagination']['url_template'].format(page=page)
-                        driver.get(next_page_url)
-                    elif config['pagination']['type'] == 'next_button':
-                        try:
-                            # Пытаемся найти и нажать кнопку "Следующая"
-                            next_button = WebDriverWait(driver, 5).until(
-                                EC.element_to_be_clickable((By.CSS_SELECTOR, config['pagination']['next_button_selector']))
-                            )
-                            next_button.click()
-                        except (TimeoutException, NoSuchElementException):
-                            logger.info(f"Кнопка следующей страницы не найдена. Обработано страниц: {page-1}")
-                            break
-                    
-                    # Ожидание загрузки страницы
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
-                    time.sleep(2)  # Дополнительная задержка для надежности
-                
-                # Находим все элементы товаров на странице
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, config['product_selector']))
-                    )
-                    product_elements = driver.find_elements(By.CSS_SELECTOR, config['product_selector'])
-                except (TimeoutException, NoSuchElementException) as e:
-                    logger.error(f"Элементы товаров не найдены на странице {page}: {str(e)}")
-                    results['errors'].append(f"Ошибка на странице {page}: Элементы товаров не найдены")
+        elif pagination and pagination['type'] == 'next_button' and page < SCRAPE_MAX_PAGES:
+            next_url = scraper.next_page_url()
+            if next_url:
+                frontier.add(next_url, page=page + 1)
+
+        yield entry
+        frontier.done(entry)
+
+def iter_scraped_products(scraper, config, page_errors, frontier=None, cache=None):
+    """
+    Обходит страницы списка и отдает найденные товары
+
+    Детальные страницы загружаются параллельно (до scraper.detail_workers
+    потоков, с ограничениями HostThrottle для каждого хоста). Пока
+    дозагружаются товары одной страницы списка, уже загружается следующая;
+    товары отдаются в порядке страниц.
+
+    С очередью обхода страницы берутся из нее, ограничения для хостов
+    общие для всех воркеров обхода, а товар, ссылка которого уже
+    встречалась в обходе, пропускается вместе с детальной страницей.
+
+    С кешем (ScrapeResultCache) товары страниц, которые не изменились с
+    прошлого импорта, не отдаются, а детальные страницы берутся из кеша.
+
+    Args:
+        scraper: Движок, открытый на первой странице (см. open_scraper)
+        config (dict): Конфигурация скрапинга
+        page_errors (list): Сюда добавляются ошибки страниц и детальных страниц
+        frontier (CrawlFrontier, optional): Очередь обхода, общая для воркеров
+        cache (ScrapeResultCache, optional): Кеш результатов скрапинга
+
+    Yields:
+        dict: Поля товара (текст), номер страницы и данные детальной страницы
+    """
+    details_config = config.get('details_page')
+
+    if frontier is not None:
+        pages = _iter_frontier_pages(scraper, config, frontier, page_errors)
+        throttle = frontier
+    else:
+        pages = _iter_listing_pages(scraper, config)
+        throttle = HostThrottle()
+
+    executor = None
+    if details_config and scraper.detail_workers > 1:
+        executor = ThreadPoolExecutor(max_workers=scraper.detail_workers)
+    # Сколько товаров может ждать детальной страницы, не задерживая чтение списка
+    window = scraper.detail_workers * 2
+    pending = deque()
+
+    def fetch_details(url, use_cached=True):
+        if cache is not None and use_cached:
+            details = cache.get_details(url)
+            if details is not None:
+                return details
+        throttle.acquire(url)
+        try:
+            details = scraper.extract_details(url)
+        finally:
+            throttle.release(url)
+        if cache is not None:
+            cache.record_details(url, details)
+        return details
+
+    def submit_details(url, use_cached=True):
+        if executor is not None:
+            return executor.submit(fetch_details, url, use_cached)
+        # Без пула детальная страница загружается сразу, в этом же потоке
+        future = Future()
+        try:
+            future.set_result(fetch_details(url, use_cached))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    try:
+        for entry in pages:
+            page = entry['page']
+            details_expired = False
+            if cache is not None:
+                page_url = scraper.url
+                cached = cache.get_page(page_url)
+                content_hash = scraper.content_hash()
+                if cached and details_config and cache.details_expired(cached):
+                    # Список тот же, но детальные страницы могли измениться
+                    details_expired = True
+                    logger.info(f"Детальные страницы товаров страницы {page} устарели")
+                elif cached and cached['content_hash'] == content_hash:
+                    cache.record_page(page_url, content_hash, cached['records_hash'], unchanged=True,
+                                      details_checked_at=cached['details_checked_at'])
+                    logger.info(f"Страница {page} не изменилась с прошлого импорта")
                     continue
-                
-                logger.info(f"Найдено {len(product_elements)} товаров на странице {page}")
-                
-                # Обрабатываем каждый элемент товара
-                for i, product_element in enumerate(product_elements):
-                    try:
-                        # Извлекаем данные о товаре
-                        product_data = {}
-                        
-                        # Название товара
-                        try:
-                            name_element = product_element.find_element(By.CSS_SELECTOR, config['name_selector'])
-                            product_data['name'] = name_element.text.strip()
-                        except NoSuchElementException:
-                            results['errors'].append(f"Товар {i+1} на странице {page}: Не найдено название товара")
-                            continue
-                        
-                        # Цена товара
-                        try:
-                            price_element = product_element.find_element(By.CSS_SELECTOR, config['price_selector'])
-                            price_text = price_element.text.strip()
-                            # Удаляем символы валюты и разделители тысяч
-                            price_numeric = ''.join(c for c in price_text if c.isdigit() or c == '.')
-                            product_data['price'] = float(price_numeric)
-                        except (NoSuchElementException, ValueError):
-                            results['errors'].append(f"Товар {i+1} на странице {page}: Некорректная цена")
-                            continue
-                        
-                        # Описание товара (если есть)
-                        if 'description_selector' in config:
-                            try:
-                                desc_element = product_element.find_element(By.CSS_SELECTOR, config['description_selector'])
-                                product_data['description'] = desc_element.text.strip()
-                            except NoSuchElementException:
-                                product_data['description'] = ""
-                        else:
-                            product_data['description'] = ""
-                        
-                        # SKU товара (если есть)
-                        if 'sku_selector' in config:
-                            try:
-                                sku_element = product_element.find_element(By.CSS_SELECTOR, config['sku_selector'])
-                                product_data['sku'] = sku_element.text.strip()
-                            except NoSuchElementException:
-                                # Если SKU не найден, используем хеш от имени и цены
-                                product_data['sku'] = f"SCRAPE-{hash(product_data['name'] + str(product_data['price']))}"
-                        else:
-                            # Если SKU селектор не определен, создаем уникальный SKU
-                            product_data['sku'] = f"SCRAPE-{hash(product_data['name'] + str(product_data['price']))}"
-                        
-                        # Категория товара (если есть)
-                        if 'category_selector' in config:
-                            try:
-                                category_element = product_element.find_element(By.CSS_SELECTOR, config['category_selector'])
-                                category_name = category_element.text.strip()
-                            except NoSuchElementException:
-                                category_name = config.get('default_category', 'Скрапинг')
-                        else:
-                            category_name = config.get('default_category', 'Скрапинг')
-                        
-                        # Создаем или получаем категорию
-                        category, _ = Category.objects.get_or_create(
-                            name=category_name,
-                            defaults={'slug': slugify(category_name)}
-                        )
-                        
-                        # Получаем или создаем товар
-                        product, created = Product.objects.update_or_create(
-                            sku=product_data['sku'],
-                            defaults={
-                                'name': product_data['name'],
-                                'slug': slugify(product_data['name']),
-                                'description': product_data['description'],
-                                'price': product_data['price'],
-                                'stock': 0,  # По умолчанию 0
-                                'category': category,
-                                'is_active': True,
-                                'featured': False
-                            }
-                        )
-                        
-                        # Если необходимо извлечь детальную информацию, открываем страницу товара
-                        if config.get('details_page'):
-                            try:
-                                # Находим ссылку на страницу товара
-                                link_element = product_element.find_element(By.CSS_SELECTOR, config['details_page']['link_selector'])
-                                product_url = link_element.get_attribute('href')
-                                
-                                # Сохраняем текущее окно
-                                original_window = driver.current_window_handle
-                                
-                                # Открываем новую вкладку для деталей товара
-                                driver.execute_script("window.open('');")
-                                driver.switch_to.window(driver.window_handles[1])
-                                driver.get(product_url)
-                                
-                                # Ожидание загрузки страницы
-                                WebDriverWait(driver, 10).until(
-                                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                                )
-                                time.sleep(1)  # Дополнительная задержка
-                                
-                                # Извлекаем более детальное описание
-                                if 'detailed_description_selector' in config['details_page']:
-                                    try:
-                                        detailed_desc_element = driver.find_element(
-                                            By.CSS_SELECTOR, config['details_page']['detailed_description_selector']
-                                        )
-                                        detailed_description = detailed_desc_element.text.strip()
-                                        
-                                        # Обновляем описание товара
-                                        product.description = detailed_description
-                                        product.save()
-                                    except NoSuchElementException:
-                                        logger.warning(f"Детальное описание не найдено для товара {product_data['name']}")
-                                
-                                # Извлекаем атрибуты товара
-                                if 'attributes_selector' in config['details_page']:
-                                    try:
-                                        attributes_elements = driver.find_elements(
-                                            By.CSS_SELECTOR, config['details_page']['attributes_selector']
-                                        )
-                                        
-                                        for attr_element in attributes_elements:
-                                            try:
-                                                # Извлекаем имя и значение атрибута
-                                                attr_name_element = attr_element.find_element(
-                                                    By.CSS_SELECTOR, config['details_page']['attribute_name_selector']
-                                                )
-                                                attr_value_element = attr_element.find_element(
-                                                    By.CSS_SELECTOR, config['details_page']['attribute_value_selector']
-                                                )
-                                                
-                                                attr_name = attr_name_element.text.strip()
-                                                attr_value = attr_value_element.text.strip()
-                                                
-                                                if attr_name and attr_value:
-                                                    # Создаем или получаем атрибут
-                                                    attribute, _ = Attribute.objects.get_or_create(
-                                                        name=attr_name,
-                                                        defaults={'slug': slugify(attr_name)}
-                                                    )
-                                                    
-                                                    # Создаем или получаем значение атрибута
-                                                    attr_value_obj, _ = AttributeValue.objects.get_or_create(
-                                                        attribute=attribute,
-                                                        value=attr_value
-                                                    )
-                                                    
-                                                    # Связываем атрибут с товаром
-                                                    ProductAttribute.objects.get_or_create(
-                                                        product=product,
-                                                        attribute_value=attr_value_obj
-                                                    )
-                                            except NoSuchElementException:
-                                                continue
-                                    except NoSuchElementException:
-                                        logger.warning(f"Атрибуты не найдены для товара {product_data['name']}")
-                                
-                                # Закрываем вкладку и возвращаемся к списку товаров
-                                driver.close()
-                                driver.switch_to.window(original_window)
-                            except Exception as e:
-                                logger.error(f"Ошибка при обработке детальной страницы товара: {str(e)}")
-                                results['errors'].append(f"Ошибка при обработке детальной страницы для товара {product_data['name']}")
-                                
-                                # Закрываем лишние вкладки и возвращаемся к основной, если произошла ошибка
-                                if len(driver.window_handles) > 1:
-                                    driver.close()
-                                    driver.switch_to.window(driver.window_handles[0])
-                        
-                        if created:
-                            results['created'] += 1
-                        else:
-                            results['updated'] += 1
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке товара на странице {page}: {str(e)}")
-                        results['errors'].append(f"Ошибка в товаре {i+1} на странице {page}: {str(e)}")
-                
-                # Задержка между страницами для избежания блокировки
-                time.sleep(config.get('delay_between_pages', 2))
-        
+
+            products = scraper.extract_products()
+            if not products:
+                logger.error(f"Элементы товаров не найдены на странице {page}")
+                page_errors.append(f"Ошибка на странице {page}: Элементы товаров не найдены")
+                continue
+
+            if cache is not None:
+                # HTML мог измениться без изменения товаров (счетчики, токены, реклама)
+                records_hash = ScrapeResultCache.records_hash(products)
+                unchanged = cached is not None and not details_expired and cached['records_hash'] == records_hash
+                cache.record_page(page_url, content_hash, records_hash, unchanged=unchanged,
+                                  details_checked_at=cached['details_checked_at'] if unchanged else None)
+                if unchanged:
+                    logger.info(f"Товары страницы {page} не изменились с прошлого импорта")
+                    continue
+
+            logger.info(f"Найдено {len(products)} товаров на странице {page}")
+
+            for item in products:
+                item['page'] = page
+                if cache is not None:
+                    item['page_url'] = page_url
+                link = item.get('link') if details_config else None
+                # Страница, возвращенная в очередь после остановки воркера, могла
+                # успеть отметить свои ссылки, поэтому для нее повторы не отбрасываются
+                if link and frontier is not None and not frontier.mark_seen(link) and not entry.get('retry'):
+                    frontier.count('duplicates')
+                    continue
+                pending.append((item, submit_details(link, not details_expired) if link else None))
+
+            while len(pending) > window:
+                yield _scraped_item_with_details(*pending.popleft(), page_errors, cache)
+
+        while pending:
+            yield _scraped_item_with_details(*pending.popleft(), page_errors, cache)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def import_products_via_scraping(url, config, batch_size=None, on_progress=None, frontier=None, use_cache=True):
+    """
+    Импорт товаров через веб-скрапинг
+
+    Страницы по возможности разбираются как статический HTML, headless
+    Chrome запускается только когда без него не обойтись (см. open_scraper).
+    Товары записываются пачками через bulk_import_products.
+
+    С очередью обхода функция работает как один из воркеров обхода: берет
+    страницы из очереди, пока они не кончатся или обход не приостановят.
+
+    Страницы, которые не изменились с прошлого импорта, пропускаются (см.
+    ScrapeResultCache), а товары изменившихся страниц пишутся в режиме
+    delta: в БД попадают только новые и изменившиеся товары.
+
+    Args:
+        url (str): URL-адрес страницы, с которой нужно собрать данные
+        config (dict): Конфигурация для скрапинга, содержащая селекторы элементов
+        batch_size (int, optional): Размер пачки записи в БД
+        on_progress (callable, optional): Получает словарь результатов после каждой пачки
+        frontier (CrawlFrontier, optional): Очередь обхода (см. scraping_frontier)
+        use_cache (bool, optional): Пропускать неизменившиеся страницы и товары;
+            при False все страницы обрабатываются и записываются заново, а
+            кеш только обновляется
+
+    Returns:
+        dict: Результаты bulk_import_products; в errors также попадают
+            ошибки страниц, на которых не нашлось товаров; pages_unchanged -
+            число неизменившихся страниц, not_modified - True, если не
+            изменилась ни одна
+    """
+    try:
+        if frontier is not None:
+            # Первая страница попадает в очередь один раз, сколько бы воркеров ни запустилось
+            frontier.add(url, page=1)
+            scraper = _open_crawl_scraper(url, config, frontier)
+        else:
+            scraper = open_scraper(url, config)
+        page_errors = []
+        cache = ScrapeResultCache(config, use_cache=use_cache)
+        parse_failures = []
+
+        def parse_item(item):
+            try:
+                return _parse_scraped_product(item, config)
+            except Exception:
+                # Страница с неразобранным товаром обрабатывается заново при следующем импорте
+                parse_failures.append(item.get('page'))
+                cache.discard_page(item['page_url'])
+                raise
+
+        try:
+            results = bulk_import_products(
+                iter_scraped_products(scraper, config, page_errors, frontier=frontier, cache=cache),
+                parse_item, batch_size=batch_size, row_label='товаре', on_progress=on_progress,
+                delta=use_cache
+            )
         finally:
             # Закрываем браузер
-            driver.quit()
-        
+            scraper.close()
+
+        # Товары, которые не удалось записать в БД, не сопоставить со страницами,
+        # поэтому после таких ошибок хеши страниц не сохраняются
+        cache.save(pages=results['failed'] <= len(parse_failures))
+        results['errors'].extend(page_errors)
+        results['pages_unchanged'] = cache.pages_unchanged
+        results['not_modified'] = cache.not_modified
         return results
     except Exception as e:
         logger.error(f"Ошибка импорта через скрапинг: {str(e)}")
-        raise ValidationError(f"Ошибка импорта через скрапинг: {str(e)}") 
\ No newline at end of file
+        raise ValidationError(f"Ошибка импорта через скрапинг: {str(e)}")
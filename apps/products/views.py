@@ -1,28 +1,36 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, permission_required
+from django.views.decorators.http import require_POST
 from django.db.models import Q, Avg
 from django.core.paginator import Paginator
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse, FileResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
-import os
 import tempfile
 import json
 from datetime import datetime
 
+from apps.core.utils.redis_connection import get_redis_client
+
 from .models import Category, Product, AttributeValue, Review
 from .forms import (
     ProductImportForm, ProductExportForm, 
     ProductAPIImportForm, ProductScrapingForm
 )
 from .utils import (
-    export_products_to_csv, export_products_to_json, export_products_to_xml,
-    import_products_from_csv, import_products_from_json, import_products_from_xml,
-    import_products_from_yaml, import_products_from_api, import_products_via_scraping
+    iter_products_csv, iter_products_json, iter_products_ndjson, iter_products_xml, iter_products_parquet,
+    scraping_frontier,
+    import_products_from_csv, import_products_from_json, import_products_from_ndjson,
+    import_products_from_xml, import_products_from_yaml, import_products_from_parquet
+)
+from .tasks import (
+    process_product_import, process_product_import_parallel,
+    process_product_export, process_product_export_sharded,
+    process_api_import, process_scraping_import, process_scraping_crawl,
 )
-from .tasks import process_product_import, process_product_export
 
 def product_list(request, category_slug=None):
     """
@@ -214,6 +222,8 @@ def import_products(request):
         form = ProductImportForm(request.POST, request.FILES)
         if form.is_valid():
             file_format = form.cleaned_data['file_format']
+            delta = form.cleaned_data['delta']
+            fast = form.cleaned_data['fast']
             file = request.FILES['file']
             
             # Определяем, использовать ли асинхронную обработку
@@ -229,13 +239,22 @@ def import_products(request):
                             temp_file.write(chunk)
                         temp_path = temp_file.name
                     
-                    # Запускаем асинхронную задачу
-                    process_product_import.delay(temp_path, file_format, request.user.id)
+                    # Запускаем асинхронную задачу; очень большие файлы
+                    # делим на части и импортируем несколькими воркерами
+                    if file_size > settings.PRODUCT_IMPORT_PARALLEL_MIN_SIZE:
+                        task = process_product_import_parallel.delay(
+                            temp_path, file_format, request.user.id, delta=delta, fast=fast
+                        )
+                    else:
+                        task = process_product_import.delay(
+                            temp_path, file_format, request.user.id, delta=delta, fast=fast
+                        )
                     
                     messages.success(
                         request, 
                         _(f"Файл принят в обработку ({file_size/1024:.1f} КБ). "
-                          f"Результаты будут отправлены на ваш email: {request.user.email}")
+                          f"Результаты будут отправлены на ваш email: {request.user.email}. "
+                          f"Ход выполнения: {reverse('products:task_progress', args=[task.id])}")
                     )
                     return redirect('products:product_list')
                 except Exception as e:
@@ -244,17 +263,22 @@ def import_products(request):
                 # Для небольших файлов используем синхронную обработку
                 try:
                     if file_format == 'csv':
-                        results = import_products_from_csv(file)
+                        results = import_products_from_csv(file, delta=delta, fast=fast)
                     elif file_format == 'json':
-                        results = import_products_from_json(file)
+                        results = import_products_from_json(file, delta=delta, fast=fast)
+                    elif file_format == 'ndjson':
+                        results = import_products_from_ndjson(file, delta=delta, fast=fast)
                     elif file_format == 'xml':
-                        results = import_products_from_xml(file)
+                        results = import_products_from_xml(file, delta=delta, fast=fast)
                     elif file_format == 'yaml':
-                        results = import_products_from_yaml(file)
+                        results = import_products_from_yaml(file, delta=delta, fast=fast)
+                    elif file_format == 'parquet':
+                        results = import_products_from_parquet(file, delta=delta, fast=fast)
                     
                     messages.success(
                         request, 
-                        f"Импорт завершен. Создано: {results['created']}, обновлено: {results['updated']}"
+                        f"Импорт завершен. Создано: {results['created']}, обновлено: {results['updated']}, "
+                        f"без изменений: {results['unchanged']}"
                     )
                     
                     if results['errors']:
@@ -276,52 +300,43 @@ def import_products(request):
     
     return render(request, 'products/import.html', {'form': form})
 
+def _import_started_message(request, title, task_id):
+    """Сообщение о запуске фонового импорта со ссылкой на ход выполнения"""
+    message = f"{title}. Ход выполнения: {reverse('products:task_progress', args=[task_id])}"
+    if request.user.email:
+        message += f". Результаты будут отправлены на ваш email: {request.user.email}"
+    return _(message)
+
 @login_required
 @permission_required('products.add_product')
 def import_api(request):
     """
     Импорт товаров через API
+
+    Импорт выполняется в фоновой задаче, страница сразу возвращается
+    со ссылкой на ход выполнения.
     """
     if request.method == 'POST':
         form = ProductAPIImportForm(request.POST)
         if form.is_valid():
             try:
-                api_url = form.cleaned_data['api_url']
-                api_key = form.cleaned_data['api_key']
-                method = form.cleaned_data['method']
-                params = form.cleaned_data['params']
-                headers = form.cleaned_data['headers']
-                data = form.cleaned_data['data']
-                
-                # Запускаем импорт через API
-                results = import_products_from_api(
-                    api_url=api_url,
-                    api_key=api_key,
-                    method=method,
-                    params=params,
-                    headers=headers,
-                    data=data
+                task = process_api_import.delay(
+                    api_url=form.cleaned_data['api_url'],
+                    api_key=form.cleaned_data['api_key'],
+                    method=form.cleaned_data['method'],
+                    params=form.cleaned_data['params'],
+                    headers=form.cleaned_data['headers'],
+                    data=form.cleaned_data['data'],
+                    pagination=form.get_pagination(),
+                    use_cache=not form.cleaned_data['ignore_cache'],
+                    user_id=request.user.id
                 )
                 
-                messages.success(
-                    request, 
-                    f"Импорт через API завершен. Создано: {results['created']}, обновлено: {results['updated']}"
-                )
-                
-                if results['errors']:
-                    for error in results['errors'][:5]:  # Показываем только первые 5 ошибок
-                        messages.warning(request, error)
-                    
-                    if len(results['errors']) > 5:
-                        messages.warning(
-                            request, 
-                            f"И еще {len(results['errors']) - 5} ошибок. Проверьте логи для деталей."
-                        )
-                
+                messages.success(request, _import_started_message(request, "Импорт через API запущен", task.id))
                 return redirect('products:product_list')
                 
             except Exception as e:
-                messages.error(request, f"Ошибка при импорте через API: {str(e)}")
+                messages.error(request, f"Ошибка при запуске импорта через API: {str(e)}")
     else:
         form = ProductAPIImportForm()
     
@@ -332,47 +347,100 @@ def import_api(request):
 def import_scraping(request):
     """
     Импорт товаров через веб-скрапинг
+
+    Скрапинг с пагинацией и задержками длится минутами, поэтому он
+    выполняется в фоновой задаче и не занимает веб-воркер.
     """
     if request.method == 'POST':
         form = ProductScrapingForm(request.POST)
         if form.is_valid():
             try:
-                url = form.cleaned_data['url']
-                config = form.get_config()
-                
-                # Уведомляем пользователя, что процесс запущен
-                messages.info(request, _(
-                    "Начат процесс скрапинга данных. "
-                    "Это может занять некоторое время, особенно при использовании пагинации."
-                ))
-                
-                # Запускаем скрапинг
-                results = import_products_via_scraping(url, config)
-                
-                messages.success(
-                    request, 
-                    f"Импорт через скрапинг завершен. Создано: {results['created']}, обновлено: {results['updated']}"
-                )
-                
-                if results['errors']:
-                    for error in results['errors'][:5]:  # Показываем только первые 5 ошибок
-                        messages.warning(request, error)
-                    
-                    if len(results['errors']) > 5:
-                        messages.warning(
-                            request, 
-                            f"И еще {len(results['errors']) - 5} ошибок. Проверьте логи для деталей."
-                        )
+                workers = form.cleaned_data.get('crawl_workers') or 1
+                if workers > 1:
+                    # Страницы списка распределяются между воркерами через очередь обхода
+                    task = process_scraping_crawl.delay(
+                        url=form.cleaned_data['url'],
+                        config=form.get_config(),
+                        user_id=request.user.id,
+                        workers=workers,
+                        use_cache=not form.cleaned_data['ignore_cache']
+                    )
+                else:
+                    task = process_scraping_import.delay(
+                        url=form.cleaned_data['url'],
+                        config=form.get_config(),
+                        use_cache=not form.cleaned_data['ignore_cache'],
+                        user_id=request.user.id
+                    )
                 
+                messages.success(request, _import_started_message(request, "Скрапинг запущен", task.id))
                 return redirect('products:product_list')
                 
             except Exception as e:
-                messages.error(request, f"Ошибка при скрапинге: {str(e)}")
+                messages.error(request, f"Ошибка при запуске скрапинга: {str(e)}")
     else:
         form = ProductScrapingForm()
     
     return render(request, 'products/import_scraping.html', {'form': form})
 
+def _get_user_crawl(request, crawl_id):
+    """Очередь обхода пользователя или None, если ее нет или она чужая"""
+    frontier = scraping_frontier(crawl_id)
+    if not frontier.exists():
+        return None
+    if frontier.get('user_id') != str(request.user.id) and not request.user.is_staff:
+        return None
+    return frontier
+
+@login_required
+@permission_required('products.add_product')
+@require_POST
+def pause_scraping_crawl(request, crawl_id):
+    """
+    Приостановка параллельного скрапинга
+
+    Воркеры дообрабатывают текущие страницы и останавливаются; очередь
+    и список просмотренных страниц остаются в Redis до продолжения.
+    """
+    frontier = _get_user_crawl(request, crawl_id)
+    if frontier is None:
+        return JsonResponse({'error': _('Обход не найден')}, status=404)
+    
+    frontier.pause()
+    return JsonResponse(frontier.get_stats())
+
+@login_required
+@permission_required('products.add_product')
+@require_POST
+def resume_scraping_crawl(request, crawl_id):
+    """
+    Продолжение приостановленного скрапинга с того места, где он остановился
+
+    Новая фоновая задача получает ту же очередь обхода, поэтому уже
+    обработанные страницы повторно не загружаются.
+    """
+    frontier = _get_user_crawl(request, crawl_id)
+    if frontier is None:
+        return JsonResponse({'error': _('Обход не найден')}, status=404)
+    
+    # Продолжать можно, только когда все воркеры прошлого запуска остановились
+    last_status = get_redis_client().hget(f"task_status:{frontier.get('task_id')}", "status")
+    if last_status != b'paused':
+        return JsonResponse({'error': _('Обход еще выполняется или уже завершен')}, status=409)
+    
+    task = process_scraping_crawl.delay(
+        url=frontier.get('url'),
+        config=json.loads(frontier.get('config')),
+        user_id=request.user.id,
+        workers=int(frontier.get('workers')),
+        crawl_id=crawl_id,
+        use_cache=frontier.get('use_cache') != '0'
+    )
+    return JsonResponse({
+        'task_id': task.id,
+        'progress_url': reverse('products:task_progress', args=[task.id]),
+    })
+
 @login_required
 @permission_required('products.view_product')
 def export_products(request):
@@ -400,13 +468,24 @@ def export_products(request):
             if is_large_export and hasattr(request.user, 'email') and request.user.email:
                 # Для большого количества товаров используем асинхронную обработку
                 try:
+                    # Очень большие выгрузки делим на шарды по id и пишем параллельно
+                    if products_count > settings.PRODUCT_EXPORT_SHARD_SIZE:
+                        export_task = process_product_export_sharded
+                    else:
+                        export_task = process_product_export
+                    
                     # Запускаем асинхронную задачу
-                    process_product_export.delay(file_format, category_id, request.user.id)
+                    task = export_task.delay(
+                        category_id=category_id,
+                        file_format=file_format,
+                        user_id=request.user.id
+                    )
                     
                     messages.success(
                         request, 
                         _(f"Экспорт {products_count} товаров запущен. "
-                          f"Ссылка для скачивания будет отправлена на ваш email: {request.user.email}")
+                          f"Ссылка для скачивания будет отправлена на ваш email: {request.user.email}. "
+                          f"Ход выполнения: {reverse('products:task_progress', args=[task.id])}")
                     )
                     return redirect('products:product_list')
                 except Exception as e:
@@ -414,52 +493,88 @@ def export_products(request):
             else:
                 # Для небольшого количества товаров используем синхронную обработку
                 try:
-                    # Создаем временный файл
                     now = datetime.now().strftime('%Y%m%d_%H%M%S')
                     
+                    # Отдаем файл потоком прямо из курсора БД, без временного файла
                     if file_format == 'csv':
                         filename = f'products_export_{now}.csv'
-                        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as temp_file:
-                            filepath = export_products_to_csv(products, temp_file.name)
-                            response = FileResponse(
-                                open(filepath, 'rb'),
-                                content_type='text/csv'
-                            )
+                        response = StreamingHttpResponse(
+                            iter_products_csv(products),
+                            content_type='text/csv; charset=utf-8'
+                        )
+                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        return response
                     
-                    elif file_format == 'json':
+                    if file_format == 'json':
                         filename = f'products_export_{now}.json'
-                        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
-                            filepath = export_products_to_json(products, temp_file.name)
-                            response = FileResponse(
-                                open(filepath, 'rb'),
-                                content_type='application/json'
-                            )
-                    
-                    elif file_format == 'xml':
-                        filename = f'products_export_{now}.xml'
-                        with tempfile.NamedTemporaryFile(suffix='.xml', delete=False) as temp_file:
-                            filepath = export_products_to_xml(products, temp_file.name)
-                            response = FileResponse(
-                                open(filepath, 'rb'),
-                                content_type='application/xml'
-                            )
-                    
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        response = StreamingHttpResponse(
+                            iter_products_json(products),
+                            content_type='application/json'
+                        )
+                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        return response
                     
-                    # Отложенное удаление временного файла
-                    def del_file():
-                        try:
-                            os.unlink(filepath)
-                        except:
-                            pass
+                    if file_format == 'ndjson':
+                        filename = f'products_export_{now}.ndjson'
+                        response = StreamingHttpResponse(
+                            iter_products_ndjson(products),
+                            content_type='application/x-ndjson'
+                        )
+                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        return response
                     
-                    import threading
-                    threading.Timer(60, del_file).start()  # Удаляем через 60 секунд
+                    if file_format == 'xml':
+                        filename = f'products_export_{now}.xml'
+                        response = StreamingHttpResponse(
+                            iter_products_xml(products),
+                            content_type='application/xml'
+                        )
+                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        return response
                     
-                    return response
+                    if file_format == 'parquet':
+                        filename = f'products_export_{now}.parquet'
+                        response = StreamingHttpResponse(
+                            iter_products_parquet(products),
+                            content_type='application/vnd.apache.parquet'
+                        )
+                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                        return response
                 except Exception as e:
                     messages.error(request, f"Ошибка при экспорте: {str(e)}")
     else:
         form = ProductExportForm()
     
-    return render(request, 'products/export.html', {'form': form}) 
\ No newline at end of file
+    return render(request, 'products/export.html', {'form': form})
+
+# Поля статуса задачи, которые отдаются числами
+TASK_PROGRESS_INT_FIELDS = (
+    'processed', 'errors', 'total_rows', 'eta_seconds', 'chunks', 'shards',
+    'created', 'updated', 'unchanged', 'failed', 'total', 'count',
+    'workers', 'pages_done', 'pages_failed', 'pages_pending', 'duplicates', 'pages_unchanged',
+)
+TASK_PROGRESS_FLOAT_FIELDS = ('percent', 'rows_per_sec')
+
+@login_required
+def task_progress(request, task_id):
+    """
+    Статус и прогресс фоновой задачи импорта/экспорта для опроса из UI
+
+    Данные читаются только из хеша task_status в Redis, без запросов к
+    таблицам товаров. Пользователь видит только свои задачи.
+    """
+    status = get_redis_client().hgetall(f"task_status:{task_id}")
+    data = {key.decode(): value.decode() for key, value in status.items()}
+    
+    if not data or (data.get('user_id') != str(request.user.id) and not request.user.is_staff):
+        return JsonResponse({'error': _('Задача не найдена')}, status=404)
+    
+    for field in TASK_PROGRESS_INT_FIELDS:
+        if field in data:
+            data[field] = int(data[field])
+    for field in TASK_PROGRESS_FLOAT_FIELDS:
+        if field in data:
+            data[field] = float(data[field])
+    
+    data['task_id'] = task_id
+    return JsonResponse(data)
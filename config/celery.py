@@ -1,7 +1,10 @@
 import os
 import logging
+import threading
 from celery import Celery
-from celery.signals import task_failure, worker_ready, worker_shutdown
+from celery.signals import (
+    task_failure, worker_ready, worker_shutdown, worker_process_init, worker_process_shutdown
+)
 from django.conf import settings
 
 # Set up logging
@@ -81,6 +84,29 @@ def worker_shutdown_handler(**kwargs):
     """Log when a worker is shutting down"""
     logger.info("Celery worker is shutting down.")
 
+@worker_process_init.connect
+def warm_browser_pool(**kwargs):
+    """
+    Start scraping browsers in each worker process, if configured
+
+    Celery kills a child process that has not finished starting within
+    worker_proc_alive_timeout (4 seconds by default). Starting Chrome, and
+    resolving chromedriver on the first run, can take longer, so the pool
+    is warmed in a background thread instead of in this handler.
+    """
+    warm_size = getattr(settings, 'BROWSER_POOL_WARM_SIZE', 0)
+    if warm_size:
+        from apps.core.utils.browser_pool import browser_pool
+        threading.Thread(
+            target=browser_pool.warm, args=(warm_size,), name='browser-pool-warm', daemon=True
+        ).start()
+
+@worker_process_shutdown.connect
+def close_browser_pool(**kwargs):
+    """Quit the browsers of a worker process that is exiting"""
+    from apps.core.utils.browser_pool import browser_pool
+    browser_pool.close()
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     """Task for debugging Celery worker connectivity"""
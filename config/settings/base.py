@@ -144,6 +144,60 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Upper bound on progress writes to a task status hash per reporter
+TASK_PROGRESS_UPDATES_PER_SECOND = int(os.getenv('TASK_PROGRESS_UPDATES_PER_SECOND', 2))
+
+# Product import/export
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv('PRODUCT_IMPORT_BATCH_SIZE', 1000))
+# Rows per COPY into the staging table in fast-load mode
+PRODUCT_IMPORT_COPY_BATCH_SIZE = int(os.getenv('PRODUCT_IMPORT_COPY_BATCH_SIZE', 20000))
+PRODUCT_EXPORT_CHUNK_SIZE = int(os.getenv('PRODUCT_EXPORT_CHUNK_SIZE', 2000))
+# Files larger than this are split into chunks imported by several Celery workers
+PRODUCT_IMPORT_PARALLEL_MIN_SIZE = int(os.getenv('PRODUCT_IMPORT_PARALLEL_MIN_SIZE', 50 * 1024 * 1024))
+PRODUCT_IMPORT_CHUNK_ROWS = int(os.getenv('PRODUCT_IMPORT_CHUNK_ROWS', 50000))
+# Exports larger than this are split into primary-key shards written in parallel
+PRODUCT_EXPORT_SHARD_SIZE = int(os.getenv('PRODUCT_EXPORT_SHARD_SIZE', 100000))
+# API import: page size for offset/page pagination and concurrent page requests
+PRODUCT_API_PAGE_SIZE = int(os.getenv('PRODUCT_API_PAGE_SIZE', 100))
+PRODUCT_API_CONCURRENCY = int(os.getenv('PRODUCT_API_CONCURRENCY', 8))
+PRODUCT_API_TIMEOUT = int(os.getenv('PRODUCT_API_TIMEOUT', 30))
+PRODUCT_API_MAX_PAGES = int(os.getenv('PRODUCT_API_MAX_PAGES', 10000))
+# How long ETag/Last-Modified of API pages are kept for conditional requests
+PRODUCT_API_CACHE_TTL = int(os.getenv('PRODUCT_API_CACHE_TTL', 7 * 24 * 3600))
+
+# Outgoing HTTP: per-host keep-alive pool (keep it >= PRODUCT_API_CONCURRENCY)
+# and retries with exponential backoff on 429/5xx responses
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+HTTP_RETRY_TOTAL = int(os.getenv('HTTP_RETRY_TOTAL', 3))
+HTTP_RETRY_BACKOFF_FACTOR = float(os.getenv('HTTP_RETRY_BACKOFF_FACTOR', 0.5))
+
+# Scraping detail pages: worker threads, concurrent requests per host and the
+# minimum delay between request starts to one host
+PRODUCT_SCRAPE_DETAIL_CONCURRENCY = int(os.getenv('PRODUCT_SCRAPE_DETAIL_CONCURRENCY', 8))
+PRODUCT_SCRAPE_HOST_CONCURRENCY = int(os.getenv('PRODUCT_SCRAPE_HOST_CONCURRENCY', 4))
+PRODUCT_SCRAPE_HOST_DELAY = float(os.getenv('PRODUCT_SCRAPE_HOST_DELAY', 0.2))
+# Scrape result cache: how long listing page hashes are kept and how long
+# extracted detail pages are reused without downloading them again
+PRODUCT_SCRAPE_CACHE_TTL = int(os.getenv('PRODUCT_SCRAPE_CACHE_TTL', 7 * 24 * 3600))
+PRODUCT_SCRAPE_DETAILS_CACHE_TTL = int(os.getenv('PRODUCT_SCRAPE_DETAILS_CACHE_TTL', 24 * 3600))
+# Upper bound on waiting for a browser page to render and settle
+PRODUCT_SCRAPE_WAIT_TIMEOUT = int(os.getenv('PRODUCT_SCRAPE_WAIT_TIMEOUT', 10))
+
+# Crawl frontier of multi-worker scraping: how long a crawl can be resumed,
+# how long an idle worker waits for pages discovered by others, and after how
+# long a host slot held by a lost worker is freed
+CRAWL_FRONTIER_TTL = int(os.getenv('CRAWL_FRONTIER_TTL', 7 * 24 * 3600))
+CRAWL_FRONTIER_IDLE_TIMEOUT = int(os.getenv('CRAWL_FRONTIER_IDLE_TIMEOUT', 300))
+CRAWL_FRONTIER_LEASE_TIMEOUT = int(os.getenv('CRAWL_FRONTIER_LEASE_TIMEOUT', 600))
+
+# Headless Chrome pool of each Celery worker process: browsers kept per process
+# (with 3+ detail pages load in parallel), page loads before a browser is
+# restarted, wait for a free browser, and browsers started in the background
+# when a worker process starts
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))
+BROWSER_POOL_RECYCLE_PAGES = int(os.getenv('BROWSER_POOL_RECYCLE_PAGES', 200))
+BROWSER_POOL_LEASE_TIMEOUT = int(os.getenv('BROWSER_POOL_LEASE_TIMEOUT', 120))
+BROWSER_POOL_WARM_SIZE = int(os.getenv('BROWSER_POOL_WARM_SIZE', 0))
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'